@@ -0,0 +1,115 @@
+import threading
+from types import SimpleNamespace
+
+import requests
+from django.conf import settings
+from graphql import GraphQLError, execute, parse, validate
+from requests.adapters import HTTPAdapter
+
+from .views import CachedDocument, DocumentCache, query_hash
+
+
+class GraphQLClientError(Exception):
+    """An operation returned errors; `errors` holds their messages"""
+
+    def __init__(self, errors):
+        self.errors = [getattr(error, 'message', None) or str(error) for error in errors]
+        super().__init__('; '.join(self.errors))
+
+
+class SchemaClient:
+    """Run operations in this process against the project schema
+
+    Documents are parsed and validated once per client, and nothing goes over
+    HTTP, so scheduled jobs don't load the web workers.
+    """
+
+    def __init__(self, schema=None, cache_size=64):
+        if schema is None:
+            from .schema import schema
+        self.schema = schema.graphql_schema
+        self.documents = DocumentCache(cache_size)
+
+    def get_document(self, query):
+        key = query_hash(query)
+        entry = self.documents.get(key)
+        if entry is None:
+            try:
+                document = parse(query)
+            except GraphQLError as e:
+                entry = CachedDocument(None, [e])
+            else:
+                entry = CachedDocument(document, validate(self.schema, document))
+            self.documents.put(key, entry)
+        return entry
+
+    def execute(self, query, variables=None, operation_name=None):
+        """Return the operation's data, raising GraphQLClientError on errors"""
+        entry = self.get_document(query)
+        if entry.errors:
+            raise GraphQLClientError(entry.errors)
+        # Loaders and tracing keep per-operation state on the context
+        result = execute(
+            self.schema, entry.document, context_value=SimpleNamespace(),
+            variable_values=variables, operation_name=operation_name,
+        )
+        if result.errors:
+            raise GraphQLClientError(result.errors)
+        return result.data
+
+
+class HTTPClient:
+    """Send operations to a remote GraphQL endpoint over pooled keep-alive connections
+
+    Documents go out as automatic persisted queries: only their hash is sent
+    once the server has seen the text. No schema introspection is done.
+    """
+
+    def __init__(self, url, timeout=10, headers=None, pool_size=4):
+        self.url = url
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update(headers or {})
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def post(self, payload):
+        response = self.session.post(self.url, json=payload, timeout=self.timeout)
+        try:
+            body = response.json()
+        except ValueError:
+            response.raise_for_status()
+            raise GraphQLClientError([f"Invalid response from {self.url}"])
+        return body
+
+    def execute(self, query, variables=None, operation_name=None):
+        """Return the operation's data, raising GraphQLClientError on errors"""
+        payload = {
+            'variables': variables,
+            'operationName': operation_name,
+            'extensions': {'persistedQuery': {'version': 1, 'sha256Hash': query_hash(query)}},
+        }
+        body = self.post(payload)
+        if any(error.get('message') == 'PersistedQueryNotFound' for error in body.get('errors') or []):
+            body = self.post(dict(payload, query=query))
+        if body.get('errors'):
+            raise GraphQLClientError([error.get('message', str(error)) for error in body['errors']])
+        return body.get('data')
+
+    def close(self):
+        self.session.close()
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(url=None):
+    """Shared client for `url`, or the GRAPHQL_CLIENT_URL setting; in-process when neither is set"""
+    url = url or getattr(settings, 'GRAPHQL_CLIENT_URL', None)
+    with _clients_lock:
+        client = _clients.get(url)
+        if client is None:
+            client = _clients[url] = HTTPClient(url) if url else SchemaClient()
+        return client
@@ -0,0 +1,142 @@
+from django.conf import settings
+from graphene.relay import Connection
+from graphene_django.settings import graphene_settings
+from graphql import (
+    FieldNode, FragmentDefinitionNode, FragmentSpreadNode, GraphQLError, InlineFragmentNode,
+    get_named_type, get_nullable_type, is_leaf_type, is_list_type,
+)
+from graphql.execution.values import get_argument_values
+
+
+def query_cost_settings():
+    options = {
+        'ENABLED': True,
+        'MAX_COST': 20000,
+        'MAX_DEPTH': 12,
+        # Assumed size of lists and connections without first/last, None for the relay max limit
+        'DEFAULT_LIST_SIZE': None,
+        'FIELD_WEIGHTS': {},
+    }
+    options.update(getattr(settings, 'GRAPHQL_QUERY_COST', {}))
+    if options['DEFAULT_LIST_SIZE'] is None:
+        options['DEFAULT_LIST_SIZE'] = graphene_settings.RELAY_CONNECTION_MAX_LIMIT or 100
+    return options
+
+
+def is_connection(named_type):
+    graphene_type = getattr(named_type, 'graphene_type', None)
+    return isinstance(graphene_type, type) and issubclass(graphene_type, Connection)
+
+
+class QueryCost:
+    def __init__(self, cost, depth, options):
+        self.cost = cost
+        self.depth = depth
+        self.max_cost = options['MAX_COST']
+        self.max_depth = options['MAX_DEPTH']
+
+    def errors(self):
+        errors = []
+        if self.max_depth is not None and self.depth > self.max_depth:
+            errors.append(GraphQLError(
+                f"Query depth {self.depth} exceeds the maximum depth of {self.max_depth}."
+            ))
+        if self.max_cost is not None and self.cost > self.max_cost:
+            errors.append(GraphQLError(
+                f"Query cost {self.cost} exceeds the maximum cost of {self.max_cost}."
+            ))
+        return errors
+
+    def as_extension(self):
+        return {
+            'requestedQueryCost': self.cost,
+            'maximumAvailable': self.max_cost,
+            'depth': self.depth,
+            'maximumDepth': self.max_depth,
+        }
+
+
+class CostAnalyzer:
+    """Estimate what an operation will cost before it runs
+
+    Every field that returns an object costs its weight (default 1, leaves 0)
+    once per parent item. Connections and lists multiply the items below them
+    by their ``first``/``last`` argument, or by ``DEFAULT_LIST_SIZE``, so nested
+    unbounded relations grow geometrically. A connection's ``edges`` and
+    ``pageInfo`` are free; its nodes are what is counted.
+    """
+
+    def __init__(self, schema, document, variables=None, options=None):
+        self.schema = schema
+        self.variables = variables or {}
+        self.options = options or query_cost_settings()
+        self.weights = self.options['FIELD_WEIGHTS']
+        self.fragments = {
+            definition.name.value: definition
+            for definition in document.definitions
+            if isinstance(definition, FragmentDefinitionNode)
+        }
+
+    def analyze(self, operation):
+        root_type = self.schema.get_root_type(operation.operation)
+        cost, depth = self.selection_cost(root_type, operation.selection_set, 1, 0)
+        return QueryCost(cost, depth, self.options)
+
+    def collect_fields(self, parent_type, selection_set, visited=None):
+        """Yield (field node, type owning the field) through fragments"""
+        visited = set() if visited is None else visited
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                yield selection, parent_type
+            elif isinstance(selection, InlineFragmentNode):
+                fragment_type = parent_type
+                if selection.type_condition is not None:
+                    fragment_type = self.schema.get_type(selection.type_condition.name.value)
+                yield from self.collect_fields(fragment_type, selection.selection_set, visited)
+            elif isinstance(selection, FragmentSpreadNode) and selection.name.value not in visited:
+                visited.add(selection.name.value)
+                fragment = self.fragments[selection.name.value]
+                fragment_type = self.schema.get_type(fragment.type_condition.name.value)
+                yield from self.collect_fields(fragment_type, fragment.selection_set, visited)
+
+    def list_size(self, field_def, field_node, parent_type, named_type):
+        returns_list = is_list_type(get_nullable_type(field_def.type))
+        if not is_connection(named_type) and not (returns_list and not is_connection(parent_type)):
+            return 1
+        try:
+            args = get_argument_values(field_def, field_node, self.variables)
+        except GraphQLError:
+            args = {}
+        sizes = [args[name] for name in ('first', 'last') if isinstance(args.get(name), int)]
+        return max(min(sizes), 0) if sizes else self.options['DEFAULT_LIST_SIZE']
+
+    def selection_cost(self, parent_type, selection_set, multiplier, depth):
+        """Return (cost, depth) of a selection set resolved `multiplier` times"""
+        cost = 0
+        max_depth = depth
+        for field_node, owner in self.collect_fields(parent_type, selection_set):
+            name = field_node.name.value
+            field_def = getattr(owner, 'fields', {}).get(name)
+            if name.startswith('__') or field_def is None:
+                continue
+            named_type = get_named_type(field_def.type)
+            weight = self.weights.get(f'{owner.name}.{name}')
+            if is_leaf_type(named_type) or field_node.selection_set is None:
+                cost += (weight or 0) * multiplier
+                continue
+            if weight is None:
+                weight = 0 if is_connection(owner) else 1
+            cost += weight * multiplier
+            child_cost, child_depth = self.selection_cost(
+                named_type,
+                field_node.selection_set,
+                multiplier * self.list_size(field_def, field_node, owner, named_type),
+                depth + 1,
+            )
+            cost += child_cost
+            max_depth = max(max_depth, child_depth)
+        return cost, max_depth
+
+
+def analyze_query_cost(schema, document, operation, variables=None, options=None):
+    return CostAnalyzer(schema, document, variables, options).analyze(operation)
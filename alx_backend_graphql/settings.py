@@ -85,6 +85,18 @@ DATABASES = {
 }
 
 
+# Cache
+# Local memory stands in for Redis in development, e.g. in production:
+# "BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": "redis://localhost:6379/1"
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "crm-default",
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -128,9 +140,70 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 # Graphene settings
 GRAPHENE = {
-    "SCHEMA": "alx_backend_graphql.schema.schema"
+    "SCHEMA": "alx_backend_graphql.schema.schema",
+    "MIDDLEWARE": ["alx_backend_graphql.tracing.TracingMiddleware"],
+}
+
+# Per-operation timings and SQL counts feed the /metrics histograms;
+# EXTENSIONS also returns them to the client under extensions.tracing
+GRAPHQL_TRACING = {
+    "ENABLED": True,
+    "EXTENSIONS": False,
 }
 
+# Parsed/validated documents kept per process, keyed by query hash
+GRAPHQL_DOCUMENT_CACHE_SIZE = 256
+
+# Persisted queries are stored in this cache alias (None = never expire)
+GRAPHQL_PERSISTED_QUERY_CACHE = "default"
+GRAPHQL_PERSISTED_QUERY_TIMEOUT = None
+
+# Opt-in cache of query (not mutation) responses, invalidated per model on save/delete.
+# Root fields that don't return a model type list the models they read in FIELD_TAGS.
+GRAPHQL_RESPONSE_CACHE = {
+    "ENABLED": False,
+    "CACHE": "default",
+    "TIMEOUT": 300,
+    "FIELD_TAGS": {
+        "crmStats": ["crm.Customer", "crm.Order", "crm.OrderItem"],
+        "salesTimeSeries": ["crm.Order", "crm.OrderItem", "crm.DailyProductSales"],
+    },
+}
+
+# Query cost analysis, operations over either limit are rejected before execution
+GRAPHQL_QUERY_COST = {
+    "ENABLED": True,
+    "MAX_COST": 20000,
+    # Each relation hop through a connection adds three levels (field, edges, node)
+    "MAX_DEPTH": 12,
+    # Size assumed for lists and connections without first/last, None for the relay max limit
+    "DEFAULT_LIST_SIZE": None,
+    # "Type.field": cost per resolution; object fields default to 1 and scalars to 0
+    "FIELD_WEIGHTS": {
+        "Query.crmStats": 50,
+        "Query.salesTimeSeries": 20,
+        "Mutation.bulkCreateCustomers": 100,
+        "Mutation.updateLowStockProducts": 50,
+        "Mutation.createOrder": 10,
+    },
+}
+
+# CRM bulk mutations
+CRM_BULK_CREATE_BATCH_SIZE = 1000
+
+# Celery broker, also probed by the /health endpoint
+CELERY_BROKER_URL = "redis://localhost:6379/0"
+
+# Dependency probes of /health and the heartbeat cron job, see alx_backend_graphql.health
+HEALTH_CHECKS = {
+    # None probes CELERY_BROKER_URL; "memory://" stands in when no broker runs locally
+    "BROKER_URL": None,
+    "TIMEOUT": 1.0,
+}
+
+# GraphQL endpoint for scheduled jobs (crm.cron); None runs them in-process against the schema
+GRAPHQL_CLIENT_URL = None
+
 # Cron jobs
 CRONJOBS = [
     ('*/5 * * * *', 'crm.cron.log_crm_heartbeat'),
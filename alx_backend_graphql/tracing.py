@@ -0,0 +1,241 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import timedelta
+from inspect import isawaitable
+
+from django.conf import settings
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.utils import timezone
+
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+def tracing_settings():
+    options = {
+        'ENABLED': True,
+        # Add an extensions.tracing block with per-resolver timings to responses
+        'EXTENSIONS': False,
+        # Distinct operation names kept as metric labels, later ones are counted as "other"
+        'MAX_OPERATION_LABELS': 100,
+    }
+    options.update(getattr(settings, 'GRAPHQL_TRACING', {}))
+    return options
+
+
+class Histogram:
+    """Cumulative bucket counts, sum and count for one label set"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+
+
+class MetricsRegistry:
+    """Per-process histograms rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, help_text, buckets):
+        self._metrics[name] = (help_text, buckets, {})
+
+    def observe(self, name, labels, value):
+        help_text, buckets, series = self._metrics[name]
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def series_count(self, name):
+        return len(self._metrics[name][2])
+
+    def get(self, name, **labels):
+        return self._metrics[name][2].get(tuple(sorted(labels.items())))
+
+    def clear(self):
+        with self._lock:
+            for help_text, buckets, series in self._metrics.values():
+                series.clear()
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for name, (help_text, buckets, series) in self._metrics.items():
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} histogram')
+                for key, histogram in sorted(series.items()):
+                    labels = ','.join(f'{label}="{escape_label(value)}"' for label, value in key)
+                    prefix = labels + ',' if labels else ''
+                    for bound, count in zip(buckets, histogram.counts):
+                        lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {count}')
+                    lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {histogram.count}')
+                    lines.append(f'{name}_sum{{{labels}}} {histogram.sum}')
+                    lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+metrics = MetricsRegistry()
+metrics.register('graphql_field_duration_seconds', 'Resolver wall time per schema field', DURATION_BUCKETS)
+metrics.register('graphql_operation_duration_seconds', 'Execution wall time per operation', DURATION_BUCKETS)
+metrics.register('graphql_operation_sql_queries', 'SQL statements per operation', QUERY_COUNT_BUCKETS)
+metrics.register('graphql_operation_sql_duration_seconds', 'SQL time per operation', DURATION_BUCKETS)
+
+
+def field_coordinate(info):
+    """Schema coordinate of the resolved field, e.g. OrderType.customer
+
+    Response paths carry client-chosen aliases, so they would make the label set unbounded.
+    """
+    return f'{info.parent_type.name}.{info.field_name}'
+
+
+def operation_label(operation_name, limit):
+    """Client-supplied operation name, bounded to the first `limit` names seen per process"""
+    if not operation_name:
+        return 'anonymous'
+    name = 'graphql_operation_duration_seconds'
+    if metrics.get(name, operation=operation_name) is None and metrics.series_count(name) >= limit:
+        return 'other'
+    return operation_name
+
+
+class OperationTrace:
+    """Timings for one operation; also the execute wrapper counting its SQL"""
+
+    def __init__(self, operation_name, keep_resolvers=False, label=None):
+        self.operation_name = operation_name or 'anonymous'
+        self.label = label or self.operation_name
+        self.keep_resolvers = keep_resolvers
+        self.start_time = timezone.now()
+        self.start = time.perf_counter()
+        self.duration = None
+        self.query_count = 0
+        self.query_seconds = 0.0
+        self.resolvers = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.query_count += 1
+            self.query_seconds += time.perf_counter() - start
+
+    def add_resolver(self, info, start, duration):
+        self.resolvers.append({
+            'path': info.path.as_list(),
+            'parentType': info.parent_type.name,
+            'fieldName': info.field_name,
+            'returnType': str(info.return_type),
+            'startOffset': int((start - self.start) * 1e9),
+            'duration': int(duration * 1e9),
+        })
+
+    def finish(self):
+        self.duration = time.perf_counter() - self.start
+        labels = {'operation': self.label}
+        metrics.observe('graphql_operation_duration_seconds', labels, self.duration)
+        metrics.observe('graphql_operation_sql_queries', labels, self.query_count)
+        metrics.observe('graphql_operation_sql_duration_seconds', labels, self.query_seconds)
+
+    def as_extension(self):
+        """Apollo-style tracing block, durations in nanoseconds"""
+        return {
+            'version': 1,
+            'operationName': self.operation_name,
+            'startTime': self.start_time.isoformat(),
+            'endTime': (self.start_time + timedelta(seconds=self.duration)).isoformat(),
+            'duration': int(self.duration * 1e9),
+            'sql': {'count': self.query_count, 'duration': int(self.query_seconds * 1e9)},
+            'execution': {'resolvers': self.resolvers},
+        }
+
+
+# Operation being traced in this context. Async execution runs its queries on
+# worker threads' connections; sync_to_async copies the context over to them.
+current_trace = ContextVar('graphql_trace', default=None)
+
+
+def trace_sql(execute, sql, params, many, context):
+    """Execute wrapper on every connection, counting SQL into the current operation's trace"""
+    trace = current_trace.get()
+    if trace is None:
+        return execute(sql, params, many, context)
+    return trace(execute, sql, params, many, context)
+
+
+def install_sql_tracing(sender=None, connection=None, **kwargs):
+    if trace_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.append(trace_sql)
+
+
+connection_created.connect(install_sql_tracing)
+
+
+@contextmanager
+def trace_operation(context, operation_ast):
+    """Time one operation and count its SQL, on whichever thread's connection runs it"""
+    options = tracing_settings()
+    if not options['ENABLED']:
+        yield None
+        return
+    name = operation_ast.name.value if operation_ast is not None and operation_ast.name else None
+    label = operation_label(name, options['MAX_OPERATION_LABELS'])
+    trace = OperationTrace(name, keep_resolvers=options['EXTENSIONS'], label=label)
+    if context is not None:
+        context.graphql_trace = trace
+    # This thread's connection may have been opened before the signal was connected
+    install_sql_tracing(connection=connection)
+    token = current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        current_trace.reset(token)
+        trace.finish()
+
+
+class TracingMiddleware:
+    """Graphene middleware recording resolver wall time per schema field"""
+
+    def resolve(self, next, root, info, **args):
+        if info.field_name.startswith('__'):
+            return next(root, info, **args)
+        start = time.perf_counter()
+        result = next(root, info, **args)
+        if isawaitable(result):
+            return self.await_result(result, info, start)
+        self.record(info, start)
+        return result
+
+    async def await_result(self, result, info, start):
+        try:
+            return await result
+        finally:
+            self.record(info, start)
+
+    def record(self, info, start):
+        duration = time.perf_counter() - start
+        metrics.observe('graphql_field_duration_seconds', {'field': field_coordinate(info)}, duration)
+        trace = getattr(info.context, 'graphql_trace', None)
+        if trace is not None and trace.keep_resolvers:
+            trace.add_resolver(info, start, duration)
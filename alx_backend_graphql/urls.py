@@ -16,10 +16,18 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path
-from graphene_django.views import GraphQLView
 from django.views.decorators.csrf import csrf_exempt
+from crm.views import export_customers, export_orders
+from .views import AsyncGraphQLView, CachedGraphQLView, cache_stats, health_view, liveness_view, metrics_view
 
 urlpatterns = [
     path("admin/", admin.site.urls),
-    path("graphql", csrf_exempt(GraphQLView.as_view(graphiql=True))),
+    path("graphql", csrf_exempt(CachedGraphQLView.as_view(graphiql=True))),
+    path("graphql/async", csrf_exempt(AsyncGraphQLView.as_view(graphiql=True))),
+    path("graphql/cache-stats", cache_stats),
+    path("metrics", metrics_view),
+    path("health", health_view),
+    path("health/live", liveness_view),
+    path("export/orders", export_orders),
+    path("export/customers", export_customers),
 ]
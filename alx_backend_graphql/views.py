@@ -0,0 +1,475 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict, namedtuple
+from inspect import isawaitable
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseNotAllowed, JsonResponse
+from django.views import View
+from graphene.relay import Connection
+from graphene_django import DjangoObjectType
+from graphene_django.constants import MUTATION_ERRORS_FLAG
+from graphene_django.settings import graphene_settings
+from graphene_django.views import GraphQLView, HttpError, set_rollback
+from graphql import (
+    ExecutionResult, GraphQLError, OperationType, TypeInfo, TypeInfoVisitor, Visitor,
+    execute, get_named_type, is_leaf_type, parse, print_ast, validate, validate_schema, visit,
+)
+from graphql.utilities import get_operation_ast
+
+from crm.cache import (
+    model_tag, record, response_cache, response_cache_settings, response_cache_stats, tag_versions,
+)
+from .cost import analyze_query_cost, query_cost_settings
+from .health import check_health
+from .tracing import metrics, trace_operation
+
+PERSISTED_QUERY_PREFIX = 'graphql:pq:'
+RESPONSE_CACHE_PREFIX = 'graphql:response:'
+
+
+def query_hash(query):
+    return hashlib.sha256(query.encode('utf-8')).hexdigest()
+
+
+class CachedDocument:
+    """A parsed document with its validation errors and response cache metadata"""
+
+    def __init__(self, document, errors):
+        self.document = document
+        self.errors = errors
+        self.normalized_hash = query_hash(print_ast(document)) if document is not None else None
+        self._tags = {}
+
+    def cache_tags(self, schema, field_tags):
+        """Model tags the document's responses depend on, or None if it can't be cached"""
+        if schema not in self._tags:
+            self._tags[schema] = collect_cache_tags(schema, self.document, field_tags)
+        return self._tags[schema]
+
+
+def model_for_type(named_type):
+    graphene_type = getattr(named_type, 'graphene_type', None)
+    if graphene_type is None:
+        return None
+    if issubclass(graphene_type, Connection):
+        graphene_type = graphene_type._meta.node
+    if issubclass(graphene_type, DjangoObjectType):
+        return graphene_type._meta.model
+    return None
+
+
+def collect_cache_tags(schema, document, field_tags):
+    """Collect the model labels a document selects
+
+    Root fields must return model types, scalars or appear in ``field_tags``;
+    anything else is computed from data we can't attribute, so it isn't cached.
+    """
+    type_info = TypeInfo(schema)
+    tags = set()
+    cacheable = True
+
+    class TagCollector(Visitor):
+        def enter_field(self, node, *args):
+            nonlocal cacheable
+            parent = type_info.get_parent_type()
+            named_type = get_named_type(type_info.get_type())
+            if named_type is None:
+                return
+            model = model_for_type(named_type)
+            if model is not None:
+                tags.add(model_tag(model))
+            elif parent is schema.query_type and not node.name.value.startswith('__'):
+                if node.name.value in field_tags:
+                    tags.update(field_tags[node.name.value])
+                elif not is_leaf_type(named_type):
+                    cacheable = False
+
+    visit(document, TypeInfoVisitor(type_info, TagCollector()))
+    return tags if cacheable else None
+
+
+def response_cache_key(entry, operation_name, variables, versions):
+    payload = json.dumps(
+        [entry.normalized_hash, operation_name, variables or {}, sorted(versions.items())],
+        sort_keys=True, default=str,
+    )
+    return RESPONSE_CACHE_PREFIX + query_hash(payload)
+
+
+PreparedOperation = namedtuple(
+    'PreparedOperation', 'schema document operation_ast cache_key execute_options extensions'
+)
+
+
+class DocumentCache:
+    """Thread-safe LRU of parsed documents and their validation errors"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, entry):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+
+document_cache = DocumentCache(getattr(settings, 'GRAPHQL_DOCUMENT_CACHE_SIZE', 256))
+
+
+def persisted_query_cache():
+    return caches[getattr(settings, 'GRAPHQL_PERSISTED_QUERY_CACHE', 'default')]
+
+
+def persist_query(query):
+    """Store a document so clients can send only its SHA-256 hash"""
+    sha256_hash = query_hash(query)
+    persisted_query_cache().set(
+        PERSISTED_QUERY_PREFIX + sha256_hash, query,
+        timeout=getattr(settings, 'GRAPHQL_PERSISTED_QUERY_TIMEOUT', None),
+    )
+    return sha256_hash
+
+
+def get_persisted_query(sha256_hash):
+    return persisted_query_cache().get(PERSISTED_QUERY_PREFIX + sha256_hash)
+
+
+class CachedGraphQLView(GraphQLView):
+    """GraphQLView with a parse/validation cache and automatic persisted queries
+
+    Clients may send ``extensions.persistedQuery.sha256Hash`` instead of the query
+    text. Unknown hashes return a ``PersistedQueryNotFound`` error, after which the
+    client retries with both the query and the hash to register it.
+    """
+
+    @staticmethod
+    def get_extensions(request, data):
+        extensions = request.GET.get('extensions') or data.get('extensions') or {}
+        if isinstance(extensions, str):
+            try:
+                extensions = json.loads(extensions)
+            except ValueError:
+                raise HttpError(HttpResponseBadRequest("Extensions are invalid JSON."))
+        return extensions
+
+    def resolve_persisted_query(self, request, data, query):
+        persisted = self.get_extensions(request, data).get('persistedQuery')
+        if not persisted:
+            return query, None
+        sha256_hash = persisted.get('sha256Hash') if isinstance(persisted, dict) else None
+        if not sha256_hash:
+            return query, GraphQLError("PersistedQueryNotSupported")
+        if query:
+            if query_hash(query) != sha256_hash:
+                return query, GraphQLError("provided sha does not match query")
+            persist_query(query)
+            return query, None
+        query = get_persisted_query(sha256_hash)
+        if query is None:
+            return None, GraphQLError("PersistedQueryNotFound")
+        return query, None
+
+    def get_document(self, schema, query):
+        """Parse and validate a query, reusing earlier results for the same text"""
+        key = query_hash(query)
+        entry = document_cache.get(key)
+        if entry is None:
+            try:
+                document = parse(query)
+            except GraphQLError as e:
+                # Syntax errors are cached too, the text will never parse
+                entry = CachedDocument(None, [e])
+            else:
+                entry = CachedDocument(document, validate(
+                    schema,
+                    document,
+                    self.validation_rules,
+                    graphene_settings.MAX_VALIDATION_ERRORS,
+                ))
+            document_cache.put(key, entry)
+        return entry
+
+    def get_cached_response(self, schema, entry, operation_ast, variables, operation_name):
+        """Return (cache key, cached data) for cacheable query operations"""
+        options = response_cache_settings()
+        if not options['ENABLED'] or operation_ast is None or operation_ast.operation != OperationType.QUERY:
+            return None, None
+        tags = entry.cache_tags(schema, options['FIELD_TAGS'])
+        if tags is None:
+            return None, None
+        key = response_cache_key(entry, operation_name, variables, tag_versions(tags))
+        data = response_cache().get(key)
+        record('hits' if data is not None else 'misses')
+        return key, data
+
+    def get_response(self, request, data, show_graphiql=False):
+        query, variables, operation_name, id = self.get_graphql_params(request, data)
+
+        execution_result = self.execute_graphql_request(
+            request, data, query, variables, operation_name, show_graphiql
+        )
+
+        if getattr(request, MUTATION_ERRORS_FLAG, False) is True:
+            set_rollback()
+
+        return self.encode_result(request, execution_result, id, show_graphiql)
+
+    def encode_result(self, request, execution_result, id=None, show_graphiql=False):
+        """GraphQLView's response body, plus the result's ``extensions``"""
+        status_code = 200
+        if not execution_result:
+            return None, status_code
+
+        response = {}
+        if execution_result.errors:
+            set_rollback()
+            response["errors"] = [
+                self.format_error(e) for e in execution_result.errors
+            ]
+
+        if execution_result.errors and any(
+            not getattr(e, "path", None) for e in execution_result.errors
+        ):
+            status_code = 400
+        else:
+            response["data"] = execution_result.data
+
+        if execution_result.extensions:
+            response["extensions"] = execution_result.extensions
+
+        if self.batch:
+            response["id"] = id
+            response["status"] = status_code
+
+        return self.json_encode(request, response, pretty=show_graphiql), status_code
+
+    def prepare_operation(
+        self, request, data, query, variables, operation_name, show_graphiql=False
+    ):
+        """Resolve, parse and validate the operation and look it up in the response cache
+
+        Returns a PreparedOperation to execute, or the result (or None) to answer with.
+        """
+        query, persisted_error = self.resolve_persisted_query(request, data, query)
+        if persisted_error is not None:
+            return ExecutionResult(data=None, errors=[persisted_error])
+
+        if not query:
+            if show_graphiql:
+                return None
+            raise HttpError(HttpResponseBadRequest("Must provide query string."))
+
+        schema = self.schema.graphql_schema
+
+        schema_validation_errors = validate_schema(schema)
+        if schema_validation_errors:
+            return ExecutionResult(data=None, errors=schema_validation_errors)
+
+        entry = self.get_document(schema, query)
+        document, validation_errors = entry.document, entry.errors
+        if document is None:
+            return ExecutionResult(errors=validation_errors)
+
+        operation_ast = get_operation_ast(document, operation_name)
+
+        if (
+            request.method.lower() == "get"
+            and operation_ast is not None
+            and operation_ast.operation != OperationType.QUERY
+        ):
+            if show_graphiql:
+                return None
+
+            raise HttpError(
+                HttpResponseNotAllowed(
+                    ["POST"],
+                    "Can only perform a {} operation from a POST request.".format(
+                        operation_ast.operation.value
+                    ),
+                )
+            )
+
+        if validation_errors:
+            return ExecutionResult(data=None, errors=validation_errors)
+
+        extensions = {}
+        cost_options = query_cost_settings()
+        if cost_options['ENABLED'] and operation_ast is not None:
+            # Rejected before anything is resolved
+            cost = analyze_query_cost(schema, document, operation_ast, variables, cost_options)
+            extensions['cost'] = cost.as_extension()
+            cost_errors = cost.errors()
+            if cost_errors:
+                return ExecutionResult(data=None, errors=cost_errors, extensions=extensions)
+
+        cache_key, cached_data = self.get_cached_response(
+            schema, entry, operation_ast, variables, operation_name
+        )
+        if cached_data is not None:
+            return ExecutionResult(data=cached_data, extensions=extensions or None)
+
+        execute_options = {
+            "root_value": self.get_root_value(request),
+            "context_value": self.get_context(request),
+            "variable_values": variables,
+            "operation_name": operation_name,
+            "middleware": self.get_middleware(request),
+        }
+        if self.execution_context_class:
+            execute_options["execution_context_class"] = self.execution_context_class
+        return PreparedOperation(schema, document, operation_ast, cache_key, execute_options, extensions)
+
+    @staticmethod
+    def is_atomic_mutation(operation_ast):
+        return (
+            operation_ast is not None
+            and operation_ast.operation == OperationType.MUTATION
+            and (
+                graphene_settings.ATOMIC_MUTATIONS is True
+                or connection.settings_dict.get("ATOMIC_MUTATIONS", False) is True
+            )
+        )
+
+    def finish_result(self, prepared, result, trace=None):
+        """Store a cacheable result and add the request's extensions to it"""
+        if prepared.cache_key is not None and not result.errors:
+            response_cache().set(prepared.cache_key, result.data, timeout=response_cache_settings()['TIMEOUT'])
+        extensions = dict(prepared.extensions)
+        if trace is not None and trace.keep_resolvers:
+            extensions['tracing'] = trace.as_extension()
+        if extensions:
+            result.extensions = {**(result.extensions or {}), **extensions}
+        return result
+
+    def execute_prepared(self, request, prepared):
+        try:
+            with trace_operation(request, prepared.operation_ast) as trace:
+                if self.is_atomic_mutation(prepared.operation_ast):
+                    with transaction.atomic():
+                        result = execute(prepared.schema, prepared.document, **prepared.execute_options)
+                        if getattr(request, MUTATION_ERRORS_FLAG, False) is True:
+                            transaction.set_rollback(True)
+                else:
+                    result = execute(prepared.schema, prepared.document, **prepared.execute_options)
+            return self.finish_result(prepared, result, trace)
+        except Exception as e:
+            return ExecutionResult(errors=[e])
+
+    def execute_graphql_request(
+        self, request, data, query, variables, operation_name, show_graphiql=False
+    ):
+        prepared = self.prepare_operation(
+            request, data, query, variables, operation_name, show_graphiql
+        )
+        if not isinstance(prepared, PreparedOperation):
+            return prepared
+        return self.execute_prepared(request, prepared)
+
+
+class AsyncGraphQLView(CachedGraphQLView):
+    """CachedGraphQLView executing on the event loop, for ASGI deployments
+
+    Queries read through the async ORM and asyncio DataLoaders, so one worker
+    can serve many requests waiting on the database. Response cache I/O and
+    the transactional work of mutations run in a thread via ``sync_to_async``.
+    """
+
+    # Django routes to the async get/post handlers below
+    dispatch = View.dispatch
+
+    async def get(self, request, *args, **kwargs):
+        return await self.handle(request)
+
+    async def post(self, request, *args, **kwargs):
+        return await self.handle(request)
+
+    async def handle(self, request):
+        try:
+            data = self.parse_body(request)
+            if self.batch or (self.graphiql and self.can_display_graphiql(request, data)):
+                # Batches and the GraphiQL page take the synchronous path
+                return await sync_to_async(GraphQLView.dispatch)(self, request)
+
+            query, variables, operation_name, id = self.get_graphql_params(request, data)
+            execution_result = await self.aexecute_graphql_request(request, data, query, variables, operation_name)
+            result, status_code = self.encode_result(request, execution_result)
+            return HttpResponse(status=status_code, content=result, content_type="application/json")
+        except HttpError as e:
+            response = e.response
+            response["Content-Type"] = "application/json"
+            response.content = self.json_encode(
+                request, {"errors": [self.format_error(e)]}
+            )
+            return response
+
+    async def aexecute_graphql_request(self, request, data, query, variables, operation_name):
+        # Persisted query and response cache lookups are blocking I/O, keep them off the loop
+        prepared = await sync_to_async(self.prepare_operation)(request, data, query, variables, operation_name)
+        if not isinstance(prepared, PreparedOperation):
+            return prepared
+        if self.is_atomic_mutation(prepared.operation_ast):
+            # One transaction can't span awaits, run the whole operation in a thread
+            return await sync_to_async(self.execute_prepared)(request, prepared)
+        try:
+            with trace_operation(request, prepared.operation_ast) as trace:
+                result = execute(prepared.schema, prepared.document, **prepared.execute_options)
+                if isawaitable(result):
+                    result = await result
+            return await sync_to_async(self.finish_result)(prepared, result, trace)
+        except Exception as e:
+            return ExecutionResult(errors=[e])
+
+
+def cache_stats(request):
+    """Hit/miss counters for the response cache and the per-process document cache"""
+    return JsonResponse({
+        'responses': response_cache_stats(),
+        'documents': {'hits': document_cache.hits, 'misses': document_cache.misses},
+    })
+
+
+def metrics_view(request):
+    """Resolver and operation histograms of this process, in the Prometheus text format"""
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def health_view(request):
+    """Readiness: database, cache and broker latency, 503 when any of them fails"""
+    report = check_health()
+    response = JsonResponse(report, status=200 if report['status'] == 'ok' else 503)
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+def liveness_view(request):
+    """Liveness: the process serves requests, no dependencies are touched"""
+    return JsonResponse({'status': 'ok'})
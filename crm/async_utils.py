@@ -0,0 +1,41 @@
+import asyncio
+
+import graphene
+from asgiref.sync import sync_to_async
+from graphene.utils.get_unbound_function import get_unbound_function
+
+
+def running_async():
+    """True when resolvers run on an event loop and must not use the sync ORM"""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def maybe_sync_to_async(func, *args, **kwargs):
+    """Call func directly, or in a worker thread when running on an event loop"""
+    if running_async():
+        return sync_to_async(func)(*args, **kwargs)
+    return func(*args, **kwargs)
+
+
+class AsyncSafeMutation(graphene.Mutation):
+    """Mutation whose mutate() runs in a worker thread under async execution
+
+    Transactions and row locks stay synchronous; the event loop only awaits them.
+    """
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def __init_subclass_with_meta__(cls, resolver=None, **options):
+        if resolver is None and getattr(cls, 'mutate', None) is not None:
+            mutate = get_unbound_function(cls.mutate)
+
+            def resolver(root, info, **kwargs):
+                return maybe_sync_to_async(mutate, root, info, **kwargs)
+
+        super().__init_subclass_with_meta__(resolver=resolver, **options)
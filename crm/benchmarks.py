@@ -0,0 +1,295 @@
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+from collections import namedtuple
+from contextlib import nullcontext
+from datetime import timedelta
+from io import StringIO
+
+import django
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.utils import timezone
+
+from alx_backend_graphql.schema import schema
+from alx_backend_graphql.tracing import OperationTrace
+from .datagen import DatasetSpec, generate
+from .models import Customer, Product, Order, OrderItem, DailyProductSales
+
+# Dataset sizes the suite runs against, passed to DatasetSpec
+DATASET_SIZES = {
+    'small': {'customers': 200, 'products': 50, 'orders': 1000},
+    'medium': {'customers': 2000, 'products': 200, 'orders': 10000},
+    'large': {'customers': 20000, 'products': 1000, 'orders': 100000},
+}
+
+
+class Fixtures:
+    """IDs and dates the operations' variables are built from"""
+
+    def __init__(self):
+        self.customer_id = Customer.objects.order_by('pk').values_list('pk', flat=True).first()
+        self.product_ids = list(Product.objects.order_by('pk').values_list('pk', flat=True)[:3])
+        self.product_id = self.product_ids[0]
+        self.now = timezone.now()
+        self.month_ago = self.now - timedelta(days=30)
+
+
+# variables(fixtures, iteration) returns the operation's variables for one run
+BenchmarkOperation = namedtuple('BenchmarkOperation', 'name query variables mutation')
+
+
+def operation(name, query, variables=None, mutation=False):
+    return BenchmarkOperation(name, query, variables or (lambda fixtures, i: {}), mutation)
+
+
+# The filtering queries from FILTERING_TESTS.md and mutations from test_mutations.md,
+# paginated the way a client would call them
+OPERATIONS = [
+    operation('customers_name_filter', """
+    query { allCustomers(nameIcontains: "ali", first: 50) { edges { node { id name email createdAt } } } }
+    """),
+    operation('customers_search', """
+    query { allCustomers(search: "alice john", first: 20) { edges { node { id name email } } } }
+    """),
+    operation('customers_created_keyset', """
+    query($from: DateTime) {
+      allCustomers(createdAtGte: $from, first: 50, keyset: true) {
+        edges { node { id name createdAt } } pageInfo { hasNextPage endCursor }
+      }
+    }
+    """, lambda fixtures, i: {'from': fixtures.month_ago.isoformat()}),
+    operation('products_price_range', """
+    query { allProducts(priceGte: "100", priceLte: "500", first: 50) { totalCount edges { node { id name price stock } } } }
+    """),
+    operation('products_low_stock', """
+    query { allProducts(lowStock: true, first: 50) { edges { node { id name stock } } } }
+    """),
+    operation('orders_customer_name', """
+    query {
+      allOrders(customerName: "Alice", first: 50) {
+        edges { node { id totalAmount orderDate customer { name email } products { edges { node { name price } } } } }
+      }
+    }
+    """),
+    operation('orders_product_name', """
+    query {
+      allOrders(productName: "Laptop", first: 50) {
+        edges { node { id totalAmount customer { name } products { edges { node { name price } } } } }
+      }
+    }
+    """),
+    operation('orders_amount_range', """
+    query {
+      allOrders(totalAmountGte: "100", totalAmountLte: "1000", first: 50) {
+        totalCount edges { node { id totalAmount orderDate customer { name } } }
+      }
+    }
+    """),
+    operation('orders_date_range', """
+    query($from: DateTime, $to: DateTime) {
+      allOrders(orderDateGte: $from, orderDateLte: $to, first: 50) {
+        edges { node { id totalAmount orderDate customer { name } } }
+      }
+    }
+    """, lambda fixtures, i: {'from': fixtures.month_ago.isoformat(), 'to': fixtures.now.isoformat()}),
+    operation('orders_product_id', """
+    query($productId: Decimal) {
+      allOrders(productId: $productId, first: 50) {
+        edges { node { id totalAmount customer { name } products { edges { node { id name price } } } } }
+      }
+    }
+    """, lambda fixtures, i: {'productId': fixtures.product_id}),
+    operation('customer_orders', """
+    query($id: ID!) {
+      customer(id: $id) {
+        name
+        orders(first: 20) { totalCount edges { node { totalAmount products { edges { node { name } } } } } }
+      }
+    }
+    """, lambda fixtures, i: {'id': fixtures.customer_id}),
+    operation('crm_stats', """
+    query { crmStats { customerCount orderCount revenue } }
+    """),
+    operation('sales_time_series', """
+    query($from: Date!, $to: Date!) {
+      salesTimeSeries(from: $from, to: $to, granularity: MONTH) { period orderCount units revenue }
+    }
+    """, lambda fixtures, i: {
+        'from': (fixtures.now - timedelta(days=365)).date().isoformat(), 'to': fixtures.now.date().isoformat(),
+    }),
+    operation('create_customer', """
+    mutation($input: CustomerInput!) { createCustomer(input: $input) { success customer { id } } }
+    """, lambda fixtures, i: {
+        'input': {'name': f"Bench {i}", 'email': f"bench{i}@example.com", 'phone': "+1234567890"},
+    }, mutation=True),
+    operation('bulk_create_customers', """
+    mutation($input: [CustomerInput]!) { bulkCreateCustomers(input: $input) { success errors customers { id } } }
+    """, lambda fixtures, i: {
+        'input': [{'name': f"Bulk {i} {n}", 'email': f"bulk{i}.{n}@example.com"} for n in range(20)],
+    }, mutation=True),
+    operation('create_product', """
+    mutation($input: ProductInput!) { createProduct(input: $input) { success product { id } } }
+    """, lambda fixtures, i: {'input': {'name': f"Bench Product {i}", 'price': "19.99", 'stock': 5}}, mutation=True),
+    operation('create_order', """
+    mutation($input: OrderInput!) {
+      createOrder(input: $input) { success message order { id totalAmount customer { name } } }
+    }
+    """, lambda fixtures, i: {
+        'input': {'customerId': fixtures.customer_id, 'productIds': fixtures.product_ids},
+    }, mutation=True),
+    operation('bulk_create_orders', """
+    mutation($input: [OrderInput]!) { bulkCreateOrders(input: $input) { success errors orders { id totalAmount } } }
+    """, lambda fixtures, i: {
+        'input': [
+            {'customerId': fixtures.customer_id, 'items': [{'productId': pk} for pk in fixtures.product_ids]}
+            for n in range(20)
+        ],
+    }, mutation=True),
+    operation('update_low_stock_products', """
+    mutation { updateLowStockProducts { success message } }
+    """, mutation=True),
+]
+
+
+class BenchmarkError(Exception):
+    pass
+
+
+def percentile(samples, q):
+    """Nearest-rank percentile of an unsorted list"""
+    ordered = sorted(samples)
+    rank = max(1, -(-len(ordered) * q // 100))
+    return ordered[int(rank) - 1]
+
+
+def execute_once(op, fixtures, i):
+    """Run one operation and return (seconds, SQL statements)
+
+    Mutations run in a transaction that is rolled back, so every run sees
+    the same dataset.
+    """
+    request = RequestFactory().post('/graphql')
+    trace = OperationTrace(op.name)
+    with transaction.atomic() if op.mutation else nullcontext():
+        with connection.execute_wrapper(trace):
+            start = time.perf_counter()
+            result = schema.execute(op.query, variables=op.variables(fixtures, i), context_value=request)
+            elapsed = time.perf_counter() - start
+        if op.mutation:
+            transaction.set_rollback(True)
+    if result.errors:
+        raise BenchmarkError(f"{op.name}: {result.errors[0]}")
+    return elapsed, trace.query_count
+
+
+def measure(op, fixtures, iterations, warmup):
+    for i in range(warmup):
+        execute_once(op, fixtures, -1 - i)
+    timings = []
+    query_counts = []
+    for i in range(iterations):
+        elapsed, queries = execute_once(op, fixtures, i)
+        timings.append(elapsed * 1000)
+        query_counts.append(queries)
+
+    # tracemalloc slows execution down, so memory gets its own run
+    tracemalloc.start()
+    try:
+        execute_once(op, fixtures, iterations)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'p99_ms': round(percentile(timings, 99), 3),
+        'mean_ms': round(statistics.fmean(timings), 3),
+        'sql_queries': max(query_counts),
+        'peak_memory_kb': round(peak / 1024, 1),
+    }
+
+
+def clear_dataset():
+    DailyProductSales.objects.all().delete()
+    OrderItem.objects.all().delete()
+    Order.objects.all().delete()
+    Product.objects.all().delete()
+    Customer.objects.all().delete()
+
+
+def run_suite(sizes, operations=None, iterations=20, warmup=2, seed=42, stdout=None):
+    """Generate each dataset in `sizes` ({name: DatasetSpec kwargs}) and benchmark the operations on it
+
+    Replaces all CRM rows in the current database; the benchmark command
+    runs it against a throwaway test database.
+    """
+    operations = operations or OPERATIONS
+    results = {}
+    for size, counts in sizes.items():
+        clear_dataset()
+        spec = DatasetSpec(seed=seed, workers=1, **counts)
+        if stdout:
+            stdout.write(f"Dataset {size}: {spec.customers} customers, {spec.products} products, "
+                         f"{spec.orders} orders\n")
+        generate(spec, stdout=stdout or StringIO())
+        fixtures = Fixtures()
+        results[size] = {}
+        for op in operations:
+            results[size][op.name] = stats = measure(op, fixtures, iterations, warmup)
+            if stdout:
+                stdout.write(f"  {op.name:<28} p50 {stats['p50_ms']:>9.2f}ms  p95 {stats['p95_ms']:>9.2f}ms  "
+                             f"{stats['sql_queries']:>3} queries  {stats['peak_memory_kb']:>9.1f}KB\n")
+    clear_dataset()
+    return {
+        'meta': {
+            'created': timezone.now().isoformat(),
+            'iterations': iterations,
+            'seed': seed,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+        },
+        'results': results,
+    }
+
+
+def find_regressions(results, baseline, threshold=0.25, min_delta_ms=1.0):
+    """Compare two suite results, returns a message per regressed metric
+
+    Latency and memory regress when they grow by more than `threshold`
+    (latency also by more than `min_delta_ms`, to ignore timer noise). SQL
+    counts don't depend on the machine, so any increase is a regression.
+    """
+    regressions = []
+    for size, operations in results['results'].items():
+        for name, current in operations.items():
+            previous = baseline.get('results', {}).get(size, {}).get(name)
+            if previous is None:
+                continue
+            label = f"{size}/{name}"
+            if current['sql_queries'] > previous['sql_queries']:
+                regressions.append(
+                    f"{label}: SQL queries {previous['sql_queries']} -> {current['sql_queries']}"
+                )
+            for metric in ('p50_ms', 'p95_ms'):
+                before, after = previous[metric], current[metric]
+                if after > before * (1 + threshold) and after - before > min_delta_ms:
+                    regressions.append(f"{label}: {metric} {before} -> {after}")
+            before, after = previous['peak_memory_kb'], current['peak_memory_kb']
+            if after > before * (1 + threshold):
+                regressions.append(f"{label}: peak_memory_kb {before} -> {after}")
+    return regressions
+
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_results(results, path):
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write('\n')
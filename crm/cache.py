@@ -0,0 +1,107 @@
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+TAG_PREFIX = 'graphql:tag:'
+STATS_PREFIX = 'graphql:response-cache:'
+
+
+def response_cache_settings():
+    options = {
+        'ENABLED': False,
+        'CACHE': 'default',
+        'TIMEOUT': 300,
+        'FIELD_TAGS': {},
+    }
+    options.update(getattr(settings, 'GRAPHQL_RESPONSE_CACHE', {}))
+    return options
+
+
+def response_cache():
+    return caches[response_cache_settings()['CACHE']]
+
+
+def model_tag(model):
+    return model._meta.label
+
+
+def new_version():
+    return uuid.uuid4().hex
+
+
+def tag_versions(tags):
+    """Current version of each tag, entries cached under older versions are stale
+
+    Versions are random tokens rather than counters, so a tag whose key was
+    evicted starts over with a version no cached response was stored under.
+    """
+    cache = response_cache()
+    keys = {TAG_PREFIX + tag: tag for tag in tags}
+    versions = cache.get_many(list(keys))
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        for key in missing:
+            cache.add(key, new_version(), timeout=None)
+        versions.update(cache.get_many(missing))
+    return {tag: versions.get(key) or new_version() for key, tag in keys.items()}
+
+
+# Order lines are what Order.products and Product.orders resolve through, so
+# responses reading them are tagged with the order and product models
+LINKED_TAGS = {
+    'crm.OrderItem': ('crm.Order', 'crm.Product'),
+}
+
+
+class DirtyTags(set):
+    """Tags changed in the current transaction, bumped together on commit"""
+    flushed = False
+
+    def __call__(self):
+        self.flushed = True
+        response_cache().set_many({TAG_PREFIX + tag: new_version() for tag in self}, timeout=None)
+
+
+def invalidate_tags(*tags):
+    """Bump tag versions once the current transaction commits
+
+    Tags are collected on the connection and a single on_commit callback bumps
+    each of them once, however many rows the transaction changed.
+    """
+    tags = set(tags).union(*(LINKED_TAGS.get(tag, ()) for tag in tags))
+    connection = transaction.get_connection()
+    dirty = getattr(connection, 'crm_dirty_tags', None)
+    # Rolling back drops the callback, later changes need a new one
+    pending = dirty is not None and not dirty.flushed
+    if pending and any(callback is dirty for _, callback, *_ in connection.run_on_commit):
+        dirty.update(tags)
+        return
+    dirty = connection.crm_dirty_tags = DirtyTags(tags)
+    transaction.on_commit(dirty)
+
+
+def invalidate_models(*models):
+    invalidate_tags(*(model_tag(model) for model in models))
+
+
+def invalidate_deleted(deleted):
+    """Invalidate the models a delete() removed rows from, given its per-model counts"""
+    invalidate_tags(*(label for label, count in deleted.items() if count))
+
+
+def record(outcome):
+    cache = response_cache()
+    try:
+        cache.incr(STATS_PREFIX + outcome)
+    except ValueError:
+        cache.set(STATS_PREFIX + outcome, 1, timeout=None)
+
+
+def response_cache_stats():
+    counters = response_cache().get_many([STATS_PREFIX + 'hits', STATS_PREFIX + 'misses'])
+    return {
+        'hits': counters.get(STATS_PREFIX + 'hits', 0),
+        'misses': counters.get(STATS_PREFIX + 'misses', 0),
+    }
@@ -0,0 +1,25 @@
+from .models import JobCheckpoint
+
+
+def load_checkpoint(name, default=0):
+    """Position saved by the last run of a job, or `default` on its first run"""
+    position = JobCheckpoint.objects.filter(name=name).values_list('position', flat=True).first()
+    return default if position is None else position
+
+
+def save_checkpoint(name, position):
+    JobCheckpoint.objects.update_or_create(name=name, defaults={'position': position})
+
+
+def claim_checkpoint(name, expected, position):
+    """Move a job's checkpoint from `expected` to `position`, False if another run moved it first
+
+    The update keeps the row locked until the surrounding transaction ends, so
+    a concurrent run waits and then finds the checkpoint already moved.
+    """
+    JobCheckpoint.objects.get_or_create(name=name, defaults={'position': expected})
+    return JobCheckpoint.objects.filter(name=name, position=expected).update(position=position) == 1
+
+
+def clear_checkpoint(name):
+    JobCheckpoint.objects.filter(name=name).delete()
@@ -0,0 +1,85 @@
+import time
+from collections import namedtuple
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .cache import invalidate_models
+from .checkpoints import clear_checkpoint, load_checkpoint, save_checkpoint
+from .models import Customer, Order
+
+CHECKPOINT_NAME = 'clean_inactive_customers'
+
+# One processed batch: IDs first_id..last_id, `count` customers deleted (or found, in a dry run)
+CleanupBatch = namedtuple('CleanupBatch', 'number first_id last_id count seconds')
+
+
+def inactive_customers(cutoff):
+    """Customers created before `cutoff` without any orders, as a NOT EXISTS subquery"""
+    return Customer.objects.filter(created_at__lt=cutoff).filter(
+        ~Exists(Order.objects.filter(customer=OuterRef('pk')))
+    )
+
+
+def delete_inactive_customers(cutoff, ids):
+    """Delete the customers in `ids` still inactive at `cutoff`, returns how many were deleted
+
+    The statement itself re-checks NOT EXISTS, so a customer who ordered since
+    the batch was read is kept. No orders means nothing to cascade, so the
+    collector and its per-row queries are skipped.
+    """
+    qn = connection.ops.quote_name
+    customers, orders = qn(Customer._meta.db_table), qn(Order._meta.db_table)
+    sql = (
+        f"DELETE FROM {customers} WHERE {qn('id')} IN ({', '.join(['%s'] * len(ids))}) "
+        f"AND {qn('created_at')} < %s "
+        f"AND NOT EXISTS (SELECT 1 FROM {orders} WHERE {orders}.{qn('customer_id')} = {customers}.{qn('id')})"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [*ids, connection.ops.adapt_datetimefield_value(cutoff)])
+        return cursor.rowcount
+
+
+def clean_inactive_customers(days=365, batch_size=1000, pause=0.0, dry_run=False, restart=False):
+    """Delete inactive customers in short per-batch transactions, yielding a CleanupBatch each
+
+    Candidates are read by keyset on the primary key. Each batch's delete
+    re-checks NOT EXISTS, so a customer who ordered in the meantime is kept.
+    The last deleted ID is checkpointed after every batch; an interrupted run
+    resumes after it unless `restart` is given, and a finished run clears it.
+    """
+    cutoff = timezone.now() - timedelta(days=days)
+    max_params = connection.features.max_query_params
+    if max_params is not None:
+        # Each ID is bound as a parameter next to the cutoff (999 in all on older SQLite builds)
+        batch_size = min(batch_size, max_params - 1)
+    if restart and not dry_run:
+        clear_checkpoint(CHECKPOINT_NAME)
+    last_id = 0 if restart else load_checkpoint(CHECKPOINT_NAME)
+    number = 0
+    while True:
+        start = time.perf_counter()
+        ids = list(
+            inactive_customers(cutoff).filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        number += 1
+        if dry_run:
+            count = len(ids)
+        else:
+            with transaction.atomic():
+                count = delete_inactive_customers(cutoff, ids)
+                save_checkpoint(CHECKPOINT_NAME, ids[-1])
+            invalidate_models(Customer)
+        last_id = ids[-1]
+        yield CleanupBatch(number, ids[0], ids[-1], count, time.perf_counter() - start)
+        # A short batch was the last one
+        if len(ids) < batch_size:
+            break
+        if pause:
+            time.sleep(pause)
+    if not dry_run:
+        clear_checkpoint(CHECKPOINT_NAME)
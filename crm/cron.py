@@ -1,46 +1,41 @@
 from datetime import datetime
-from gql import gql, Client
-from gql.transport.requests import RequestsHTTPTransport
+
+from alx_backend_graphql.client import get_client
+from alx_backend_graphql.health import check_health, format_health
+
+RESTOCK_MUTATION = """
+mutation {
+    updateLowStockProducts {
+        products {
+            name
+            stock
+        }
+        message
+        success
+    }
+}
+"""
+
 
 def log_crm_heartbeat():
-    """Log heartbeat message to confirm CRM application health"""
+    """Log the database, cache and broker probe results and latencies"""
     timestamp = datetime.now().strftime('%d/%m/%Y-%H:%M:%S')
     
-    try:
-        transport = RequestsHTTPTransport(url="http://localhost:8000/graphql")
-        client = Client(transport=transport, fetch_schema_from_transport=True)
-        query = gql("{ hello }")
-        client.execute(query)
-    except:
-        pass
-    
-    message = f"{timestamp} CRM is alive\n"
+    # Probes run in-process, a failing dependency is logged rather than swallowed
+    report = check_health()
+    message = f"{timestamp} CRM {format_health(report)}\n"
     
     with open('/tmp/crm_heartbeat_log.txt', 'a') as log_file:
         log_file.write(message)
+    return report
 
 def update_low_stock():
     """Update low stock products via GraphQL mutation"""
     timestamp = datetime.now().strftime('%d/%m/%Y-%H:%M:%S')
     
     try:
-        transport = RequestsHTTPTransport(url="http://localhost:8000/graphql")
-        client = Client(transport=transport, fetch_schema_from_transport=True)
-        
-        mutation = gql("""
-        mutation {
-            updateLowStockProducts {
-                products {
-                    name
-                    stock
-                }
-                message
-                success
-            }
-        }
-        """)
-        
-        result = client.execute(mutation)
+        # In-process by default; set GRAPHQL_CLIENT_URL to target a remote server
+        result = get_client().execute(RESTOCK_MUTATION)
         
         with open('/tmp/low_stock_updates_log.txt', 'a') as log_file:
             if result['updateLowStockProducts']['success']:
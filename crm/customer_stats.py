@@ -0,0 +1,71 @@
+from decimal import Decimal
+
+from django.db.models import Count, DecimalField, F, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .cache import invalidate_models
+from .exports import chunks
+from .models import Customer
+from .rollups import LOOKUP_SIZE
+
+STATS_FIELDS = ('order_count', 'lifetime_value', 'last_order_at')
+
+
+def record_customer_order(order):
+    """Add one order to its customer's aggregates with a single UPDATE"""
+    Customer.objects.filter(pk=order.customer_id).update(
+        order_count=F('order_count') + 1,
+        lifetime_value=F('lifetime_value') + order.total_amount,
+        # An order placed with an earlier date must not move last_order_at back
+        last_order_at=Greatest(Coalesce('last_order_at', Value(order.order_date)), Value(order.order_date)),
+    )
+    invalidate_models(Customer)
+
+
+def update_customer_stats(customers):
+    """Recompute the aggregates of a customer queryset from crm_order with one UPDATE
+
+    The orders model is taken from the queryset's, so migrations can pass historical models.
+    """
+    order_model = customers.model._meta.get_field('orders').related_model
+    orders = order_model.objects.filter(customer=OuterRef('pk')).order_by().values('customer')
+    return customers.update(
+        order_count=Coalesce(Subquery(orders.annotate(count=Count('pk')).values('count')), 0),
+        lifetime_value=Coalesce(
+            Subquery(orders.annotate(total=Sum('total_amount')).values('total')),
+            Value(Decimal('0.00')),
+            output_field=DecimalField(max_digits=14, decimal_places=2),
+        ),
+        last_order_at=Subquery(orders.annotate(last=Max('order_date')).values('last')),
+    )
+
+
+def recompute_customer_stats(customer_ids):
+    """Recompute the aggregates of the given customers, e.g. after bulk inserting their orders"""
+    customer_ids = list(customer_ids)
+    for chunk in chunks(customer_ids, LOOKUP_SIZE):
+        update_customer_stats(Customer.objects.filter(pk__in=chunk))
+    invalidate_models(Customer)
+
+
+def refresh_customer_stats(customers):
+    """Reload the aggregates of already fetched customers"""
+    # in_bulk splits the IDs where the backend limits query parameters
+    fresh = Customer.objects.only(*STATS_FIELDS).in_bulk([customer.pk for customer in customers])
+    for customer in customers:
+        if customer.pk in fresh:
+            for name in STATS_FIELDS:
+                setattr(customer, name, getattr(fresh[customer.pk], name))
+
+
+def backfill_customer_stats(first_id=None, last_id=None):
+    """Recompute the aggregates from crm_order for customers with first_id <= pk <= last_id"""
+    customers = Customer.objects.all()
+    if first_id is not None:
+        customers = customers.filter(pk__gte=first_id)
+    if last_id is not None:
+        customers = customers.filter(pk__lte=last_id)
+    updated = update_customer_stats(customers)
+    # Queryset updates skip model signals
+    invalidate_models(Customer)
+    return updated
@@ -0,0 +1,263 @@
+import itertools
+import random
+import sys
+import time
+from bisect import bisect
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from decimal import Decimal
+from functools import partial
+
+from django.apps import apps
+from django.core.management.color import no_style
+from django.db import connection, connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .cache import invalidate_models
+from .customer_stats import backfill_customer_stats
+from .models import Customer, Product, Order, OrderItem
+from .rollups import rebuild_daily_sales
+
+FIRST_NAMES = ('Alice', 'Bob', 'Carol', 'David', 'Eve', 'Frank', 'Grace', 'Heidi', 'Ivan', 'Judy',
+               'Mallory', 'Niaj', 'Olivia', 'Peggy', 'Rupert', 'Sybil', 'Trent', 'Victor', 'Walter', 'Zoe')
+LAST_NAMES = ('Johnson', 'Smith', 'Williams', 'Brown', 'Davis', 'Miller', 'Wilson', 'Moore', 'Taylor',
+              'Anderson', 'Thomas', 'Jackson', 'White', 'Harris', 'Martin', 'Garcia', 'Clark', 'Lewis')
+ADJECTIVES = ('Wireless', 'Ergonomic', 'Compact', 'Portable', 'Gaming', 'Premium', 'Smart', 'Mini', 'Pro', 'Ultra')
+NOUNS = ('Laptop', 'Mouse', 'Keyboard', 'Monitor', 'Headphones', 'Webcam', 'USB Cable', 'Speaker',
+         'Charger', 'Microphone', 'Tablet', 'Dock')
+
+
+class DatasetSpec:
+    """What to generate; the same spec always produces the same rows"""
+
+    def __init__(self, customers=1000, products=100, orders=5000, avg_items=3, seed=42,
+                 days=365, end=None, hot_products=0.01, hot_share=0.5, customer_skew=1.1,
+                 max_quantity=3, chunk_size=5000, workers=1):
+        self.customers = customers
+        self.products = products
+        self.orders = orders
+        self.avg_items = avg_items
+        self.seed = seed
+        self.days = days
+        # Timestamps are spread over `days` before midnight of `end` (default: today)
+        self.end = end or timezone.make_aware(datetime.combine(timezone.localdate(), datetime.min.time()))
+        # Share `hot_share` of order lines between the first `hot_products` fraction of products
+        self.hot_products = hot_products
+        self.hot_share = hot_share
+        # Orders per customer follow rank ** -customer_skew (0 is uniform)
+        self.customer_skew = customer_skew
+        # Units per order line, uniform in 1..max_quantity
+        self.max_quantity = max_quantity
+        self.chunk_size = chunk_size
+        self.workers = workers
+
+    def validate(self):
+        if min(self.customers, self.products, self.orders) < 0:
+            raise ValueError("Row counts must not be negative")
+        if self.orders and not (self.customers and self.products):
+            raise ValueError("Orders need at least one customer and one product")
+        if self.avg_items < 1:
+            raise ValueError("--avg-items must be at least 1")
+        if self.max_quantity < 1:
+            raise ValueError("--max-quantity must be at least 1")
+        if self.chunk_size < 1 or self.workers < 1:
+            raise ValueError("--chunk-size and --workers must be positive")
+        if not (0 <= self.hot_products <= 1 and 0 <= self.hot_share <= 1):
+            raise ValueError("--hot-products and --hot-share must be between 0 and 1")
+
+
+class Plan:
+    """A spec plus the IDs and prices the workers need, shipped to each process once"""
+
+    def __init__(self, spec, customer_start, product_start, order_start):
+        self.spec = spec
+        self.customer_start = customer_start
+        self.product_start = product_start
+        self.order_start = order_start
+        self.prices = []
+        self._customer_weights = None
+
+    def rng(self, table, start):
+        # Seeded per chunk, so rows don't depend on which worker runs the chunk
+        return random.Random(f'{self.spec.seed}:{table}:{start}')
+
+    def timestamp(self, rng):
+        return self.spec.end - timedelta(seconds=rng.random() * self.spec.days * 86400)
+
+    def customer_weights(self):
+        if self._customer_weights is None:
+            skew = self.spec.customer_skew
+            self._customer_weights = list(itertools.accumulate(
+                (rank + 1) ** -skew for rank in range(self.spec.customers)
+            ))
+        return self._customer_weights
+
+    def pick_customer(self, rng):
+        weights = self.customer_weights()
+        return self.customer_start + bisect(weights, rng.random() * weights[-1])
+
+    def pick_products(self, rng):
+        spec = self.spec
+        count = min(spec.products, 1 + int(rng.random() * (2 * (spec.avg_items - 1) + 1)))
+        hot = max(1, int(spec.products * spec.hot_products))
+        picked = set()
+        while len(picked) < count:
+            hot_left = hot - sum(1 for index in picked if index < hot)
+            pool = hot if hot_left and rng.random() < spec.hot_share else spec.products
+            picked.add(rng.randrange(pool))
+        return sorted(picked)
+
+
+_plan = None
+
+# Rows per UPDATE ... CASE statement restoring the generated timestamps
+UPDATE_BATCH_SIZE = 500
+
+
+def init_worker(plan):
+    global _plan
+    _plan = plan
+
+
+# Workers return (model label, field names, value tuples), cheap to send between processes
+def build_customers(bounds):
+    start, stop = bounds
+    rng = _plan.rng('customers', start)
+    rows = []
+    for i in range(start, stop):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        rows.append((
+            _plan.customer_start + i,
+            f"{first} {last}",
+            f"{first}.{last}.{i}@example.com".lower(),
+            f"+1{rng.randrange(10 ** 9, 10 ** 10)}" if rng.random() < 0.8 else None,
+            _plan.timestamp(rng),
+        ))
+    return [(Customer._meta.label, ('id', 'name', 'email', 'phone', 'created_at'), rows)]
+
+
+def build_products(bounds):
+    start, stop = bounds
+    rng = _plan.rng('products', start)
+    rows = [
+        (
+            _plan.product_start + i,
+            f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {i}",
+            Decimal(rng.randrange(100, 200000)) / 100,
+            rng.randrange(0, 200),
+            _plan.timestamp(rng),
+        )
+        for i in range(start, stop)
+    ]
+    return [(Product._meta.label, ('id', 'name', 'price', 'stock', 'created_at'), rows)]
+
+
+def build_orders(bounds):
+    """A chunk of orders and their product lines"""
+    start, stop = bounds
+    rng = _plan.rng('orders', start)
+    orders = []
+    lines = []
+    for i in range(start, stop):
+        order_id = _plan.order_start + i
+        order_lines = [
+            (order_id, _plan.product_start + index, rng.randint(1, _plan.spec.max_quantity), _plan.prices[index])
+            for index in _plan.pick_products(rng)
+        ]
+        orders.append((
+            order_id,
+            _plan.pick_customer(rng),
+            sum((quantity * price for _, _, quantity, price in order_lines), Decimal('0.00')),
+            _plan.timestamp(rng),
+        ))
+        lines.extend(order_lines)
+    return [
+        (Order._meta.label, ('id', 'customer_id', 'total_amount', 'order_date'), orders),
+        (OrderItem._meta.label, ('order_id', 'product_id', 'quantity', 'unit_price'), lines),
+    ]
+
+
+def write_rows(batches):
+    """bulk_create one built chunk in a transaction, returns the rows written
+
+    bulk_create stamps auto_now_add fields with the current time, so the
+    generated created_at/order_date values are written back with bulk_update().
+    """
+    with transaction.atomic():
+        for label, fields, rows in batches:
+            model = apps.get_model(label)
+            objs = model.objects.bulk_create(
+                [model(**dict(zip(fields, row))) for row in rows], batch_size=_plan.spec.chunk_size
+            )
+            stamped = [
+                field.name for field in model._meta.concrete_fields
+                if getattr(field, 'auto_now_add', False) and field.name in fields
+            ]
+            if stamped:
+                for obj, row in zip(objs, rows):
+                    for name in stamped:
+                        setattr(obj, name, row[fields.index(name)])
+                model.objects.bulk_update(objs, stamped, batch_size=UPDATE_BATCH_SIZE)
+    return sum(len(rows) for label, fields, rows in batches)
+
+
+def build_and_write(build, bounds):
+    return write_rows(build(bounds))
+
+
+def next_id(model):
+    return (model.objects.aggregate(last=Max('id'))['last'] or 0) + 1
+
+
+def run_phase(label, plan, build, total, stdout):
+    """Build and insert chunks of range(total), across processes when workers > 1
+
+    SQLite allows a single writer, so there the workers only build rows and
+    this process inserts them as they arrive.
+    """
+    chunk = plan.spec.chunk_size
+    tasks = [(start, min(start + chunk, total)) for start in range(0, total, chunk)]
+    started = time.perf_counter()
+    init_worker(plan)
+    if plan.spec.workers > 1 and len(tasks) > 1:
+        # Forked workers must not share the parent's database connection
+        connections.close_all()
+        with ProcessPoolExecutor(plan.spec.workers, initializer=init_worker, initargs=(plan,)) as pool:
+            if connection.vendor == 'sqlite':
+                rows = sum(write_rows(batches) for batches in pool.map(build, tasks))
+            else:
+                rows = sum(pool.map(partial(build_and_write, build), tasks))
+    else:
+        rows = sum(build_and_write(build, task) for task in tasks)
+    elapsed = max(time.perf_counter() - started, 1e-9)
+    stdout.write(f"  ✓ {label}: {rows:,} rows in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s)\n")
+    return rows
+
+
+def generate(spec, stdout=None):
+    """Bulk insert a synthetic dataset after any existing rows, returns rows per table"""
+    spec.validate()
+    stdout = stdout or sys.stdout
+    plan = Plan(spec, next_id(Customer), next_id(Product), next_id(Order))
+    counts = {
+        'customers': run_phase('customers', plan, build_customers, spec.customers, stdout),
+        'products': run_phase('products', plan, build_products, spec.products, stdout),
+    }
+    # Order totals need the generated prices, read back once for every worker
+    plan.prices = list(
+        Product.objects.filter(id__gte=plan.product_start).order_by('id').values_list('price', flat=True)
+    )
+    counts['orders + lines'] = run_phase('orders + lines', plan, build_orders, spec.orders, stdout)
+
+    # Explicit IDs don't advance PostgreSQL sequences
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), [Customer, Product, Order]):
+            cursor.execute(sql)
+    if spec.orders:
+        rebuild_daily_sales(timezone.localdate(spec.end - timedelta(days=spec.days)), timezone.localdate(spec.end))
+        # Orders only go to the generated customers
+        backfill_customer_stats(first_id=plan.customer_start)
+    # bulk_create skips model signals
+    invalidate_models(Customer, Product, Order)
+    return counts
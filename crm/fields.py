@@ -0,0 +1,191 @@
+import inspect
+from functools import partial
+
+import graphene
+from asgiref.sync import sync_to_async
+from django.db.models import QuerySet
+from graphene.relay.connection import connection_adapter, page_info_adapter
+from graphene_django.filter import DjangoFilterConnectionField
+from graphene_django.utils import maybe_queryset
+from graphql_relay import connection_from_array_slice, cursor_to_offset, get_offset_with_default, offset_to_cursor
+from promise import Promise
+
+from .async_utils import running_async
+from .loaders import get_loaders
+from .pagination import PAGINATION_ARGS, RelationPage, akeyset_connection, keyset_connection, page_window
+
+
+class CountableConnection(graphene.relay.Connection):
+    """Relay connection with an on-demand totalCount"""
+
+    class Meta:
+        abstract = True
+
+    total_count = graphene.Int()
+
+    def resolve_total_count(self, info):
+        if self.length is None:
+            if running_async():
+                return self.acount()
+            self.length = self.iterable.count()
+        return self.length
+
+    async def acount(self):
+        self.length = await self.iterable.acount()
+        return self.length
+
+
+def loader_window(args):
+    """page_window() for a loader, or None when filters have to see the whole relation"""
+    if any(value is not None for name, value in args.items() if name not in PAGINATION_ARGS):
+        return None
+    return page_window(args)
+
+
+def page_args(args, max_limit=None):
+    """Turn offset into an after cursor and default first to max_limit, as graphene-django does"""
+    offset = args.pop('offset', None)
+    after = args.get('after')
+    if offset:
+        if after:
+            offset += cursor_to_offset(after) + 1
+        args['after'] = offset_to_cursor(offset - 1)
+    if max_limit is not None and args.get('first') is None and args.get('last') is None:
+        args['first'] = max_limit
+    return args
+
+
+def slice_connection(connection, args, rows, start, array_length):
+    """Connection page for `rows`, positions start..start + len(rows) of array_length"""
+    return connection_from_array_slice(
+        rows,
+        args,
+        slice_start=start,
+        array_length=array_length,
+        array_slice_length=len(rows),
+        connection_type=partial(connection_adapter, connection),
+        edge_type=connection.Edge,
+        page_info_type=page_info_adapter,
+    )
+
+
+class BatchedFilterConnectionField(DjangoFilterConnectionField):
+    """Filter connection that feeds each resolved page to the request loaders"""
+
+    @classmethod
+    def resolve_queryset(cls, connection, iterable, info, args, filtering_args, filterset_class):
+        if running_async():
+            return cls.aresolve_queryset(connection, iterable, info, args, filtering_args, filterset_class)
+        return cls.filter_iterable(connection, iterable, info, args, filtering_args, filterset_class)
+
+    @classmethod
+    async def aresolve_queryset(cls, connection, iterable, info, args, filtering_args, filterset_class):
+        if inspect.isawaitable(iterable):
+            iterable = await iterable
+        filter_iterable = partial(cls.filter_iterable, connection, iterable, info, args, filtering_args, filterset_class)
+        # Filterset validation looks up model choices, which needs the sync ORM
+        if any(args.get(name) is not None for name in filtering_args):
+            return await sync_to_async(filter_iterable)()
+        return filter_iterable()
+
+    @classmethod
+    def filter_iterable(cls, connection, iterable, info, args, filtering_args, filterset_class):
+        # Optimizer prefetches are filtered in SQL already, loader pages only come without filters
+        if isinstance(iterable, RelationPage):
+            return iterable
+        # Lists come from a loader; they only need the filterset when filters are given
+        if isinstance(iterable, list):
+            if not any(args.get(name) is not None for name in filtering_args):
+                return iterable
+            model = connection._meta.node._meta.model
+            iterable = model.objects.filter(pk__in=[obj.pk for obj in iterable])
+        return super().resolve_queryset(
+            connection, iterable, info, args, filtering_args, filterset_class
+        )
+
+    @classmethod
+    def resolve_connection(cls, connection, args, iterable, max_limit=None):
+        iterable = maybe_queryset(iterable)
+        if args.get('keyset') and isinstance(iterable, QuerySet):
+            return keyset_connection(connection, args, iterable, max_limit=max_limit)
+        if isinstance(iterable, RelationPage):
+            # Only a window of the relation was read, the page knows where it sits
+            page = slice_connection(connection, page_args(args, max_limit), iterable, iterable.start, iterable.total)
+            page.iterable = iterable
+            page.length = iterable.total
+            return page
+        return super().resolve_connection(connection, args, iterable, max_limit=max_limit)
+
+    @classmethod
+    async def aresolve_connection(cls, connection, args, iterable, max_limit=None):
+        iterable = maybe_queryset(iterable)
+        if not isinstance(iterable, QuerySet):
+            return cls.resolve_connection(connection, args, iterable, max_limit=max_limit)
+        if args.get('keyset'):
+            return await akeyset_connection(connection, args, iterable, max_limit=max_limit)
+
+        args = page_args(args, max_limit)
+
+        # Same bounds connection_from_array_slice works out, but only that page is fetched
+        array_length = await iterable.acount()
+        start = min(get_offset_with_default(args.get('after'), -1) + 1, array_length)
+        end = min(get_offset_with_default(args.get('before'), array_length), array_length)
+        if args.get('first') is not None:
+            end = min(end, start + args['first'])
+        if args.get('last') is not None:
+            start = max(start, end - args['last'])
+        rows = [row async for row in iterable[start:end]] if end > start else []
+
+        page = slice_connection(connection, args, rows, start, array_length)
+        page.iterable = iterable
+        page.length = array_length
+        return page
+
+    @classmethod
+    def connection_resolver(cls, resolver, connection, default_manager, queryset_resolver,
+                            max_limit, enforce_first_or_last, root, info, **args):
+        if running_async():
+            return cls.aconnection_resolver(
+                resolver, connection, default_manager, queryset_resolver,
+                max_limit, enforce_first_or_last, root, info, **args
+            )
+
+        def prime(result):
+            get_loaders(info).prime_nodes(edge.node for edge in result.edges)
+            return result
+
+        result = super().connection_resolver(
+            resolver, connection, default_manager, queryset_resolver,
+            max_limit, enforce_first_or_last, root, info, **args
+        )
+        if Promise.is_thenable(result):
+            return Promise.resolve(result).then(prime)
+        return prime(result)
+
+    @classmethod
+    async def aconnection_resolver(cls, resolver, connection, default_manager, queryset_resolver,
+                                   max_limit, enforce_first_or_last, root, info, **args):
+        """connection_resolver() for async execution, asyncio loaders batch on their own"""
+        first = args.get('first')
+        last = args.get('last')
+        if enforce_first_or_last:
+            assert first or last, (
+                "You must provide a `first` or `last` value to properly paginate the `{}` connection."
+            ).format(info.field_name)
+        if max_limit:
+            for name, value in (('first', first), ('last', last)):
+                if value:
+                    assert value <= max_limit, (
+                        "Requesting {} records on the `{}` connection exceeds the `{}` limit of {} records."
+                    ).format(value, info.field_name, name, max_limit)
+        if args.get('offset') is not None:
+            assert args.get('before') is None, (
+                "You can't provide a `before` value at the same time as an `offset` value "
+                "to properly paginate the `{}` connection."
+            ).format(info.field_name)
+
+        iterable = resolver(root, info, **args)
+        if iterable is None:
+            iterable = default_manager
+        iterable = await queryset_resolver(connection, iterable, info, args)
+        return await cls.aresolve_connection(connection, args, iterable, max_limit=max_limit)
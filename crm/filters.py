@@ -1,5 +1,7 @@
 import django_filters
 from .models import Customer, Product, Order
+from .inventory import LOW_STOCK_THRESHOLD
+from .search import search_queryset
 
 
 class CustomerFilter(django_filters.FilterSet):
@@ -22,6 +24,26 @@ class CustomerFilter(django_filters.FilterSet):
     phone_pattern = django_filters.CharFilter(field_name='phone', lookup_expr='istartswith')
     phone = django_filters.CharFilter(lookup_expr='icontains')
     
+    # Order aggregates stored on the customer, served by their indexes
+    order_count_gte = django_filters.NumberFilter(field_name='order_count', lookup_expr='gte')
+    order_count_lte = django_filters.NumberFilter(field_name='order_count', lookup_expr='lte')
+    lifetime_value_gte = django_filters.NumberFilter(field_name='lifetime_value', lookup_expr='gte')
+    lifetime_value_lte = django_filters.NumberFilter(field_name='lifetime_value', lookup_expr='lte')
+    last_order_at_gte = django_filters.DateTimeFilter(field_name='last_order_at', lookup_expr='gte')
+    last_order_at_lte = django_filters.DateTimeFilter(field_name='last_order_at', lookup_expr='lte')
+    
+    # Indexed full-text search over name, email and phone, ranked by relevance
+    search = django_filters.CharFilter(method='filter_search')
+    
+    # e.g. orderBy: "-lifetimeValue" for top customers
+    order_by = django_filters.OrderingFilter(fields=(
+        'name', 'email', 'created_at', 'order_count', 'lifetime_value', 'last_order_at',
+    ))
+    
+    def filter_search(self, queryset, name, value):
+        """Search customers through the full-text index"""
+        return search_queryset(queryset, value)
+    
     class Meta:
         model = Customer
         fields = {
@@ -29,6 +51,9 @@ class CustomerFilter(django_filters.FilterSet):
             'email': ['exact', 'icontains'],
             'phone': ['exact', 'icontains', 'istartswith'],
             'created_at': ['exact', 'gte', 'lte'],
+            'order_count': ['exact', 'gte', 'lte'],
+            'lifetime_value': ['exact', 'gte', 'lte'],
+            'last_order_at': ['exact', 'gte', 'lte', 'isnull'],
         }
 
 
@@ -52,12 +77,19 @@ class ProductFilter(django_filters.FilterSet):
     # Low stock filter (stock < 10)
     low_stock = django_filters.BooleanFilter(method='filter_low_stock')
     
+    # Indexed full-text search over name, ranked by relevance
+    search = django_filters.CharFilter(method='filter_search')
+    
     def filter_low_stock(self, queryset, name, value):
         """Filter products with stock less than 10"""
         if value:
-            return queryset.filter(stock__lt=10)
+            return queryset.filter(stock__lt=LOW_STOCK_THRESHOLD)
         return queryset
     
+    def filter_search(self, queryset, name, value):
+        """Search products through the full-text index"""
+        return search_queryset(queryset, value)
+    
     class Meta:
         model = Product
         fields = {
@@ -84,12 +116,12 @@ class OrderFilter(django_filters.FilterSet):
     customer_name = django_filters.CharFilter(field_name='customer__name', lookup_expr='icontains')
     customer_name_icontains = django_filters.CharFilter(field_name='customer__name', lookup_expr='icontains')
     
-    # Filter by product name (related field lookup through ManyToMany)
-    product_name = django_filters.CharFilter(field_name='products__name', lookup_expr='icontains')
-    product_name_icontains = django_filters.CharFilter(field_name='products__name', lookup_expr='icontains')
+    # Filter by product name (related field lookup through the order lines)
+    product_name = django_filters.CharFilter(field_name='items__product__name', lookup_expr='icontains')
+    product_name_icontains = django_filters.CharFilter(field_name='items__product__name', lookup_expr='icontains')
     
-    # Filter by specific product ID
-    product_id = django_filters.NumberFilter(field_name='products__id', lookup_expr='exact')
+    # Filter by specific product ID, on the order lines without joining crm_product
+    product_id = django_filters.NumberFilter(field_name='items__product_id', lookup_expr='exact')
     
     # Filter by customer ID
     customer_id = django_filters.NumberFilter(field_name='customer__id', lookup_expr='exact')
@@ -0,0 +1,43 @@
+from django.db import connection, transaction
+from django.db.models import F
+
+from .cache import invalidate_models
+from .models import Product
+
+LOW_STOCK_THRESHOLD = 10
+RESTOCK_INCREMENT = 10
+
+
+def can_return_from_update():
+    """Whether the backend accepts UPDATE ... RETURNING (PostgreSQL, SQLite 3.35+)
+
+    MariaDB and Oracle return columns from INSERT but not from UPDATE.
+    """
+    if connection.vendor == 'postgresql':
+        return True
+    return connection.vendor == 'sqlite' and connection.Database.sqlite_version_info >= (3, 35)
+
+
+def restock_low_stock(threshold=LOW_STOCK_THRESHOLD, increment=RESTOCK_INCREMENT):
+    """Add `increment` to every product below `threshold` and return the updated rows"""
+    with transaction.atomic():
+        if can_return_from_update():
+            # The same statement hands back the updated rows
+            qn = connection.ops.quote_name
+            columns = ', '.join(qn(field.column) for field in Product._meta.concrete_fields)
+            sql = (
+                f"UPDATE {qn(Product._meta.db_table)} SET {qn('stock')} = {qn('stock')} + %s "
+                f"WHERE {qn('stock')} < %s RETURNING {columns}"
+            )
+            products = list(Product.objects.raw(sql, [increment, threshold]))
+        else:
+            products = list(Product.objects.select_for_update().filter(stock__lt=threshold))
+            Product.objects.filter(pk__in=[product.pk for product in products]).update(
+                stock=F('stock') + increment
+            )
+            for product in products:
+                product.stock += increment
+        # Neither statement sends model signals
+        invalidate_models(Product)
+    products.sort(key=lambda product: product.created_at, reverse=True)
+    return products
@@ -0,0 +1,235 @@
+from collections import defaultdict
+from functools import partial
+
+from django.db.models import F
+from graphene.utils.dataloader import DataLoader
+
+from .async_utils import running_async
+from .models import Customer, Product, Order, OrderItem
+from .pagination import RelationPage, window
+
+
+class BatchLoader:
+    """Per-request loader that resolves all queued keys with one query"""
+
+    def __init__(self, loaders):
+        self.loaders = loaders
+        self._cache = {}
+        self._queue = set()
+
+    def prime(self, key):
+        """Queue a key so it is fetched with the next batch"""
+        if key is not None and key not in self._cache:
+            self._queue.add(key)
+
+    def prime_value(self, key, value):
+        """Store an already loaded value without querying"""
+        self._cache.setdefault(key, value)
+        self._queue.discard(key)
+
+    def load(self, key):
+        if key not in self._cache:
+            keys = self._queue | {key}
+            self._queue = set()
+            results = self.batch_load(list(keys))
+            for batch_key in keys:
+                self._cache[batch_key] = results.get(batch_key, self.missing())
+        return self._cache[key]
+
+    def missing(self):
+        return None
+
+    def batch_load(self, keys):
+        """Return a dict mapping each found key to its value"""
+        raise NotImplementedError
+
+
+class GroupedBatchLoader(BatchLoader):
+    """Loader for to-many relations, each key maps to a list of objects
+
+    A load can be bounded to a page_window(), which reads only that window of
+    every key's rows. Keys batched together once are batched together again
+    for the other windows asked of them.
+    """
+    key_attr = None
+
+    def __init__(self, loaders):
+        super().__init__(loaders)
+        self._batches = {}
+
+    def missing(self):
+        return []
+
+    def prime(self, key):
+        if key is not None and key not in self._batches:
+            self._queue.add(key)
+
+    def load(self, key, page=None):
+        if (key, page) not in self._cache:
+            keys = frozenset(self._queue | self._batches.get(key, set()) | {key})
+            self._queue = set()
+            results = self.batch_load(list(keys), page)
+            for batch_key in keys:
+                self._cache[batch_key, page] = results.get(batch_key, self.missing())
+                self._batches[batch_key] = keys
+        return self._cache[key, page]
+
+    def get_queryset(self, keys):
+        raise NotImplementedError
+
+    def batch_load(self, keys, page=None):
+        queryset = self.get_queryset(keys)
+        if page is not None:
+            queryset = window(queryset, self.key_attr, *page)
+        grouped = defaultdict(list)
+        for obj in queryset:
+            grouped[getattr(obj, self.key_attr)].append(obj)
+        # Nested relations of the loaded objects are batched as one page
+        self.loaders.prime_nodes(obj for group in grouped.values() for obj in group)
+        if page is not None:
+            return {key: RelationPage(group) for key, group in grouped.items()}
+        return grouped
+
+
+class CustomerLoader(BatchLoader):
+    """Order.customer by customer ID"""
+
+    def batch_load(self, keys):
+        customers = Customer.objects.in_bulk(keys)
+        self.loaders.prime_nodes(customers.values())
+        return customers
+
+
+class OrderProductsLoader(GroupedBatchLoader):
+    """Order.products by order ID"""
+    key_attr = '_batch_key'
+
+    def get_queryset(self, keys):
+        return Product.objects.filter(orders__id__in=keys).annotate(_batch_key=F('orders__id'))
+
+
+class OrderItemsLoader(GroupedBatchLoader):
+    """Order.items with their products by order ID"""
+    key_attr = 'order_id'
+
+    def get_queryset(self, keys):
+        return OrderItem.objects.filter(order_id__in=keys).select_related('product').order_by('pk')
+
+
+class CustomerOrdersLoader(GroupedBatchLoader):
+    """Customer.orders by customer ID"""
+    key_attr = 'customer_id'
+
+    def get_queryset(self, keys):
+        return Order.objects.filter(customer_id__in=keys)
+
+
+class ProductOrdersLoader(GroupedBatchLoader):
+    """Product.orders by product ID"""
+    key_attr = '_batch_key'
+
+    def get_queryset(self, keys):
+        return Order.objects.filter(products__id__in=keys).annotate(_batch_key=F('products__id'))
+
+
+class Loaders:
+    """All CRM loaders for a single request"""
+
+    def __init__(self):
+        self.customer = CustomerLoader(self)
+        self.order_products = OrderProductsLoader(self)
+        self.order_items = OrderItemsLoader(self)
+        self.customer_orders = CustomerOrdersLoader(self)
+        self.product_orders = ProductOrdersLoader(self)
+
+    def prime_nodes(self, nodes):
+        """Queue the relation keys of a page of nodes for batched loading"""
+        for node in nodes:
+            if isinstance(node, Order):
+                self.customer.prime(node.customer_id)
+                self.order_products.prime(node.pk)
+                self.order_items.prime(node.pk)
+            elif isinstance(node, Customer):
+                # Optimized pages defer unselected fields, reusing them would query per field
+                if node.get_deferred_fields():
+                    self.customer.prime(node.pk)
+                else:
+                    self.customer.prime_value(node.pk, node)
+                self.customer_orders.prime(node.pk)
+            elif isinstance(node, Product):
+                self.product_orders.prime(node.pk)
+
+
+async def group_by(queryset, key_attr, keys, page=None):
+    if page is not None:
+        queryset = window(queryset, key_attr, *page)
+    grouped = defaultdict(list)
+    async for obj in queryset:
+        grouped[getattr(obj, key_attr)].append(obj)
+    if page is not None:
+        return [RelationPage(grouped[key]) for key in keys]
+    return [grouped[key] for key in keys]
+
+
+class PagedDataLoader:
+    """One DataLoader per page window of a to-many relation"""
+
+    def __init__(self, batch_load_fn):
+        self.batch_load_fn = batch_load_fn
+        self.loaders = {}
+
+    def load(self, key, page=None):
+        loader = self.loaders.get(page)
+        if loader is None:
+            loader = self.loaders[page] = DataLoader(partial(self.batch_load_fn, page=page))
+        return loader.load(key)
+
+
+class AsyncLoaders:
+    """Asyncio counterparts of the CRM loaders for async execution
+
+    Every load() issued in the same event loop tick is resolved by one query,
+    so pages don't need priming.
+    """
+
+    def __init__(self):
+        self.customer = DataLoader(self.load_customers)
+        self.order_products = PagedDataLoader(self.load_order_products)
+        self.order_items = PagedDataLoader(self.load_order_items)
+        self.customer_orders = PagedDataLoader(self.load_customer_orders)
+        self.product_orders = PagedDataLoader(self.load_product_orders)
+
+    def prime_nodes(self, nodes):
+        pass
+
+    async def load_customers(self, keys):
+        customers = {customer.pk: customer async for customer in Customer.objects.filter(pk__in=keys)}
+        return [customers.get(key) for key in keys]
+
+    async def load_order_products(self, keys, page=None):
+        products = Product.objects.filter(orders__id__in=keys).annotate(_batch_key=F('orders__id'))
+        return await group_by(products, '_batch_key', keys, page)
+
+    async def load_order_items(self, keys, page=None):
+        items = OrderItem.objects.filter(order_id__in=keys).select_related('product').order_by('pk')
+        return await group_by(items, 'order_id', keys, page)
+
+    async def load_customer_orders(self, keys, page=None):
+        return await group_by(Order.objects.filter(customer_id__in=keys), 'customer_id', keys, page)
+
+    async def load_product_orders(self, keys, page=None):
+        orders = Order.objects.filter(products__id__in=keys).annotate(_batch_key=F('products__id'))
+        return await group_by(orders, '_batch_key', keys, page)
+
+
+def get_loaders(info):
+    """Return the loaders bound to the current request, creating them on first use"""
+    loaders_class, attr = (AsyncLoaders, 'crm_async_loaders') if running_async() else (Loaders, 'crm_loaders')
+    context = info.context
+    if context is None:
+        return loaders_class()
+    loaders = getattr(context, attr, None)
+    if loaders is None:
+        loaders = loaders_class()
+        setattr(context, attr, loaders)
+    return loaders
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max, Min
+
+from crm.customer_stats import backfill_customer_stats
+from crm.models import Customer
+
+
+class Command(BaseCommand):
+    help = "Recompute every customer's order count, lifetime value and last order date from their orders"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help="Customers updated per transaction")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError("--batch-size must be positive")
+
+        bounds = Customer.objects.aggregate(first=Min('id'), last=Max('id'))
+        if bounds['first'] is None:
+            self.stdout.write("No customers")
+            return
+        started = time.perf_counter()
+        total = 0
+        # Ranges of IDs rather than OFFSET pages, each one a single UPDATE
+        for first_id in range(bounds['first'], bounds['last'] + 1, batch_size):
+            last_id = min(first_id + batch_size - 1, bounds['last'])
+            batch_started = time.perf_counter()
+            with transaction.atomic():
+                count = backfill_customer_stats(first_id, last_id)
+            total += count
+            self.stdout.write(
+                f"  IDs {first_id}-{last_id}: {count} customer(s) in {(time.perf_counter() - batch_started) * 1000:.1f}ms"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"Backfilled order stats for {total} customers in {time.perf_counter() - started:.1f}s"
+        ))
@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from crm.benchmarks import (
+    DATASET_SIZES, OPERATIONS, BenchmarkError, find_regressions, load_results, run_suite, write_results,
+)
+
+
+class Command(BaseCommand):
+    help = "Benchmark the core GraphQL operations against generated datasets in a test database"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', choices=list(DATASET_SIZES), default=['small', 'medium'],
+                            help="Dataset sizes to run (default: small medium)")
+        parser.add_argument('--operations', nargs='+', metavar='NAME',
+                            help="Only run these operations (default: all)")
+        parser.add_argument('--iterations', type=int, default=20, help="Timed runs per operation")
+        parser.add_argument('--warmup', type=int, default=2, help="Untimed runs per operation")
+        parser.add_argument('--seed', type=int, default=42, help="Dataset seed")
+        parser.add_argument('--output', help="Write the results to this JSON file")
+        parser.add_argument('--baseline', help="Fail when results regress against this JSON file")
+        parser.add_argument('--threshold', type=float, default=0.25,
+                            help="Allowed latency/memory growth over the baseline (default 0.25 = 25%%)")
+        parser.add_argument('--min-delta-ms', type=float, default=1.0,
+                            help="Ignore latency growth smaller than this many milliseconds")
+
+    def handle(self, *args, **options):
+        operations = OPERATIONS
+        if options['operations']:
+            known = {op.name: op for op in OPERATIONS}
+            unknown = sorted(set(options['operations']) - set(known))
+            if unknown:
+                raise CommandError(f"Unknown operations: {', '.join(unknown)}")
+            operations = [known[name] for name in options['operations']]
+        if options['iterations'] < 1 or options['warmup'] < 0:
+            raise CommandError("--iterations must be positive and --warmup not negative")
+        baseline = load_results(options['baseline']) if options['baseline'] else None
+
+        # Never touch the configured database, run against a throwaway copy of the schema
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            results = run_suite(
+                {size: DATASET_SIZES[size] for size in options['sizes']}, operations, options['iterations'], options['warmup'], options['seed'],
+                stdout=self.stdout,
+            )
+        except BenchmarkError as e:
+            raise CommandError(str(e))
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        if options['output']:
+            write_results(results, options['output'])
+            self.stdout.write(f"Wrote {options['output']}")
+        if baseline is not None:
+            regressions = find_regressions(results, baseline, options['threshold'], options['min_delta_ms'])
+            if regressions:
+                raise CommandError(
+                    f"{len(regressions)} regression(s) against {options['baseline']}:\n  " + '\n  '.join(regressions)
+                )
+            self.stdout.write(self.style.SUCCESS(f"No regressions against {options['baseline']}"))
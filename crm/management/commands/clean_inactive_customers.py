@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from crm.checkpoints import load_checkpoint
+from crm.cleanup import CHECKPOINT_NAME, clean_inactive_customers
+
+
+class Command(BaseCommand):
+    help = "Delete customers without orders that were created over a year ago, in throttled batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=365, help="Only customers created more than this many days ago")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Customers deleted per transaction")
+        parser.add_argument('--pause', type=float, default=0.5, help="Seconds to sleep between batches")
+        parser.add_argument('--dry-run', action='store_true', help="Report what would be deleted without deleting")
+        parser.add_argument('--restart', action='store_true',
+                            help="Ignore the checkpoint of an interrupted run and start from the first customer")
+        parser.add_argument('--log-file', default='/tmp/customer_cleanup_log.txt', help="Append a summary line here")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1 or options['days'] < 0 or options['pause'] < 0:
+            raise CommandError("--batch-size must be positive, --days and --pause not negative")
+
+        resume_after = 0 if options['restart'] else load_checkpoint(CHECKPOINT_NAME)
+        if resume_after:
+            self.stdout.write(f"Resuming after customer {resume_after}")
+        verb = "Would delete" if options['dry_run'] else "Deleted"
+        started = time.perf_counter()
+        total = 0
+        for batch in clean_inactive_customers(
+            options['days'], options['batch_size'], options['pause'], options['dry_run'], options['restart']
+        ):
+            total += batch.count
+            self.stdout.write(
+                f"  batch {batch.number}: {verb.lower()} {batch.count} customer(s), "
+                f"IDs {batch.first_id}-{batch.last_id}, in {batch.seconds * 1000:.1f}ms"
+            )
+
+        summary = f"{verb} {total} inactive customers in {time.perf_counter() - started:.1f}s"
+        if not options['dry_run'] and options['log_file']:
+            with open(options['log_file'], 'a') as log_file:
+                log_file.write(f"{timezone.now():%Y-%m-%d %H:%M:%S}: {summary}\n")
+        self.stdout.write(self.style.SUCCESS(summary))
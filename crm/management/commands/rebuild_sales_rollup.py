@@ -0,0 +1,30 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from crm.rollups import rebuild_daily_sales
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily product sales rollup for a date range"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='date_from', required=True, help="First day (YYYY-MM-DD)")
+        parser.add_argument('--to', dest='date_to', required=True, help="Last day, inclusive (YYYY-MM-DD)")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Rollup rows inserted per statement")
+
+    def handle(self, *args, **options):
+        try:
+            date_from = date.fromisoformat(options['date_from'])
+            date_to = date.fromisoformat(options['date_to'])
+        except ValueError as e:
+            raise CommandError(f"Invalid date: {e}")
+        if date_from > date_to:
+            raise CommandError("--from must not be after --to")
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be positive")
+
+        count = rebuild_daily_sales(date_from, date_to, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {count} daily sales rows from {date_from} to {date_to}"
+        ))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from crm.checkpoints import clear_checkpoint
+from crm.reminders import CHECKPOINT_NAME, reminder_settings, run_order_reminders, send_reminder_batch
+from crm.tasks import send_order_reminder_batch
+
+
+class Command(BaseCommand):
+    help = "Remind each customer once about orders placed since the last run"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, help="Customers per worker batch")
+        parser.add_argument('--days', type=int, help="Only remind orders this recent")
+        parser.add_argument('--sync', action='store_true',
+                            help="Send the batches in this process instead of queueing them for Celery workers")
+        parser.add_argument('--reset', action='store_true',
+                            help="Forget the high-water mark and start from the lookback window again")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] is not None and options['batch_size'] < 1:
+            raise CommandError("--batch-size must be positive")
+        if options['reset']:
+            clear_checkpoint(CHECKPOINT_NAME)
+
+        dispatch = send_reminder_batch if options['sync'] else send_order_reminder_batch.delay
+        summary = run_order_reminders(dispatch, options['batch_size'], options['days'])
+        if summary['up_to_id'] <= summary['after_id']:
+            self.stdout.write(f"No orders since order {summary['after_id']}")
+            return
+        target = reminder_settings()['LOG_FILE'] if options['sync'] else "the workers"
+        self.stdout.write(self.style.SUCCESS(
+            f"Order reminders processed! {summary['customers']} customer(s) in {summary['batches']} batch(es) "
+            f"sent to {target}, orders {summary['after_id'] + 1}-{summary['up_to_id']}"
+        ))
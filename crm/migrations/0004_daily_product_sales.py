@@ -0,0 +1,51 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("crm", "0003_keyset_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyProductSales",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("order_count", models.PositiveIntegerField(default=0)),
+                ("units", models.PositiveIntegerField(default=0)),
+                (
+                    "revenue",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_sales",
+                        to="crm.product",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["day", "product"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("day", "product"),
+                        name="crm_daily_sales_day_product_uniq",
+                    )
+                ],
+            },
+        ),
+    ]
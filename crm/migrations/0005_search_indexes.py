@@ -0,0 +1,72 @@
+# Generated by Django 4.2.7 on 2026-10-18 06:10
+
+from django.db import migrations
+
+SEARCH_FIELDS = {
+    "crm_customer": ("name", "email", "phone"),
+    "crm_product": ("name",),
+}
+
+
+def sqlite_statements(table, fields):
+    fts = f"{table}_fts"
+    columns = ", ".join(fields)
+    new_values = ", ".join(f"new.{field}" for field in fields)
+    old_values = ", ".join(f"old.{field}" for field in fields)
+    delete_old = (
+        f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.id, {old_values});"
+    )
+    insert_new = f"INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new_values});"
+    return [
+        f"CREATE VIRTUAL TABLE {fts} USING fts5({columns}, content='{table}', "
+        f"content_rowid='id', prefix='2 3')",
+        f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN {insert_new} END",
+        f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN {delete_old} END",
+        # Only text changes touch the index, stock updates don't
+        f"CREATE TRIGGER {fts}_au AFTER UPDATE OF {columns} ON {table} "
+        f"BEGIN {delete_old} {insert_new} END",
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+
+
+def postgresql_statements(table, fields):
+    return ["CREATE EXTENSION IF NOT EXISTS pg_trgm"] + [
+        f"CREATE INDEX IF NOT EXISTS {table}_{field}_trgm "
+        f"ON {table} USING gin ({field} gin_trgm_ops)"
+        for field in fields
+    ]
+
+
+def create_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for table, fields in SEARCH_FIELDS.items():
+        if vendor == "sqlite":
+            statements = sqlite_statements(table, fields)
+        elif vendor == "postgresql":
+            statements = postgresql_statements(table, fields)
+        else:
+            statements = []
+        for statement in statements:
+            schema_editor.execute(statement)
+
+
+def drop_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for table, fields in SEARCH_FIELDS.items():
+        if vendor == "sqlite":
+            for suffix in ("ai", "ad", "au"):
+                schema_editor.execute(f"DROP TRIGGER IF EXISTS {table}_fts_{suffix}")
+            schema_editor.execute(f"DROP TABLE IF EXISTS {table}_fts")
+        elif vendor == "postgresql":
+            for field in fields:
+                schema_editor.execute(f"DROP INDEX IF EXISTS {table}_{field}_trgm")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("crm", "0004_daily_product_sales"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
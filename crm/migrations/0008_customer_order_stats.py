@@ -0,0 +1,70 @@
+# Generated by Django 4.2.7 on 2026-10-18 06:24
+
+from django.db import migrations, models
+
+FTS_FIELDS = ("name", "email", "phone")
+
+
+def restore_search_triggers(apps, schema_editor):
+    """SQLite rebuilds crm_customer to add the columns, which drops the FTS triggers from 0005"""
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    table, fts = "crm_customer", "crm_customer_fts"
+    columns = ", ".join(FTS_FIELDS)
+    new_values = ", ".join(f"new.{field}" for field in FTS_FIELDS)
+    old_values = ", ".join(f"old.{field}" for field in FTS_FIELDS)
+    delete_old = f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.id, {old_values});"
+    insert_new = f"INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new_values});"
+    for statement in [
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN {insert_new} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN {delete_old} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {columns} ON {table} "
+        f"BEGIN {delete_old} {insert_new} END",
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("crm", "0007_job_checkpoints"),
+    ]
+
+    operations = [
+        # Runs last when unapplying, after the columns are dropped again
+        migrations.RunPython(migrations.RunPython.noop, restore_search_triggers),
+        migrations.AddField(
+            model_name="customer",
+            name="last_order_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="customer",
+            name="lifetime_value",
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.AddField(
+            model_name="customer",
+            name="order_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name="customer",
+            index=models.Index(
+                fields=["lifetime_value", "id"], name="crm_customer_value_id_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="customer",
+            index=models.Index(
+                fields=["order_count", "id"], name="crm_customer_orders_id_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="customer",
+            index=models.Index(
+                fields=["last_order_at", "id"], name="crm_customer_last_order_idx"
+            ),
+        ),
+        migrations.RunPython(restore_search_triggers, migrations.RunPython.noop),
+    ]
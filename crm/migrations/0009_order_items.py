@@ -0,0 +1,88 @@
+# Generated by Django 4.2.7 on 2026-10-18 07:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import OuterRef, Subquery
+
+
+def snapshot_unit_prices(apps, schema_editor):
+    """Price the existing lines at their product's current price, one UPDATE"""
+    # Duplicate product IDs were never stored, so every existing line is one unit
+    OrderItem = apps.get_model("crm", "OrderItem")
+    Product = apps.get_model("crm", "Product")
+    OrderItem.objects.update(
+        unit_price=Subquery(
+            Product.objects.filter(pk=OuterRef("product_id")).values("price")[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("crm", "0008_customer_order_stats"),
+    ]
+
+    operations = [
+        # Adopt the table of the plain ManyToManyField as the through model
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name="OrderItem",
+                    fields=[
+                        (
+                            "id",
+                            models.BigAutoField(
+                                auto_created=True,
+                                primary_key=True,
+                                serialize=False,
+                                verbose_name="ID",
+                            ),
+                        ),
+                        (
+                            "order",
+                            models.ForeignKey(
+                                on_delete=django.db.models.deletion.CASCADE,
+                                related_name="items",
+                                to="crm.order",
+                            ),
+                        ),
+                        (
+                            "product",
+                            models.ForeignKey(
+                                on_delete=django.db.models.deletion.CASCADE,
+                                related_name="order_items",
+                                to="crm.product",
+                            ),
+                        ),
+                    ],
+                    options={
+                        "db_table": "crm_order_products",
+                        "unique_together": {("order", "product")},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name="order",
+                    name="products",
+                    field=models.ManyToManyField(
+                        related_name="orders", through="crm.OrderItem", to="crm.product"
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name="orderitem",
+            name="quantity",
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name="orderitem",
+            name="unit_price",
+            field=models.DecimalField(decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.RunPython(snapshot_unit_prices, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="orderitem",
+            name="unit_price",
+            field=models.DecimalField(decimal_places=2, max_digits=10),
+        ),
+    ]
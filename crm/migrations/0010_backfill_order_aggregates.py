@@ -0,0 +1,26 @@
+# Generated by Django 4.2.7 on 2026-10-18 07:40
+
+from django.db import migrations
+
+from crm.customer_stats import update_customer_stats
+from crm.rollups import insert_daily_sales
+
+
+def backfill_order_aggregates(apps, schema_editor):
+    """Fill the customer aggregates (0008) and the daily sales rollup (0004) from existing orders"""
+    Customer = apps.get_model("crm", "Customer")
+    OrderItem = apps.get_model("crm", "OrderItem")
+    DailyProductSales = apps.get_model("crm", "DailyProductSales")
+    update_customer_stats(Customer.objects.all())
+    DailyProductSales.objects.all().delete()
+    insert_daily_sales(DailyProductSales, OrderItem.objects.all())
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("crm", "0009_order_items"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_order_aggregates, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,35 @@
 from django.db import models
 from django.core.validators import RegexValidator
 
+from .cache import invalidate_deleted
 
-class Customer(models.Model):
+
+class CachedResponseQuerySet(models.QuerySet):
+    def delete(self):
+        deleted = super().delete()
+        invalidate_deleted(deleted[1])
+        return deleted
+
+
+class CachedResponseModel(models.Model):
+    """Model whose deletes drop the cached GraphQL responses that selected it
+
+    Deletes report the models they cascaded to, so every affected tag is
+    invalidated once. post_delete receivers would turn off Django's fast
+    deletes and load every row first.
+    """
+    objects = CachedResponseQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+    def delete(self, *args, **kwargs):
+        deleted = super().delete(*args, **kwargs)
+        invalidate_deleted(deleted[1])
+        return deleted
+
+
+class Customer(CachedResponseModel):
     name = models.CharField(max_length=100)
     email = models.EmailField(unique=True)
     phone_regex = RegexValidator(
@@ -11,15 +38,27 @@ class Customer(models.Model):
     )
     phone = models.CharField(validators=[phone_regex], max_length=20, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Order aggregates kept in step by place_order, recomputed by backfill_customer_stats
+    order_count = models.PositiveIntegerField(default=0)
+    lifetime_value = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    last_order_at = models.DateTimeField(blank=True, null=True)
 
     def __str__(self):
         return self.name
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination seeks on (sort key, id)
+            models.Index(fields=['created_at', 'id'], name='crm_customer_created_id_idx'),
+            # "Top customers" orderings and range filters on the order aggregates
+            models.Index(fields=['lifetime_value', 'id'], name='crm_customer_value_id_idx'),
+            models.Index(fields=['order_count', 'id'], name='crm_customer_orders_id_idx'),
+            models.Index(fields=['last_order_at', 'id'], name='crm_customer_last_order_idx'),
+        ]
 
 
-class Product(models.Model):
+class Product(CachedResponseModel):
     name = models.CharField(max_length=100)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     stock = models.IntegerField(default=0)
@@ -30,11 +69,22 @@ class Product(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination seeks on (sort key, id)
+            models.Index(fields=['created_at', 'id'], name='crm_product_created_id_idx'),
+            # ProductFilter price/stock ranges and the low_stock flag
+            models.Index(fields=['price'], name='crm_product_price_idx'),
+            models.Index(fields=['stock'], name='crm_product_stock_idx'),
+            # Partial index in default order for low_stock. Only the default threshold (stock < 10,
+            # LOW_STOCK_THRESHOLD) is indexed; any other updateLowStockProducts threshold can't use
+            # it and falls back to crm_product_stock_idx
+            models.Index(fields=['created_at', 'id'], name='crm_product_low_stock_idx', condition=models.Q(stock__lt=10)),
+        ]
 
 
-class Order(models.Model):
+class Order(CachedResponseModel):
     customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='orders')
-    products = models.ManyToManyField(Product, related_name='orders')
+    products = models.ManyToManyField(Product, through='OrderItem', related_name='orders')
     total_amount = models.DecimalField(max_digits=10, decimal_places=2)
     order_date = models.DateTimeField(auto_now_add=True)
 
@@ -43,3 +93,54 @@ class Order(models.Model):
 
     class Meta:
         ordering = ['-order_date']
+        indexes = [
+            # Keyset pagination seeks on (sort key, id)
+            models.Index(fields=['order_date', 'id'], name='crm_order_date_id_idx'),
+            # OrderFilter customer_id combined with order_date ranges, and total_amount ranges
+            models.Index(fields=['customer', 'order_date'], name='crm_order_customer_date_idx'),
+            models.Index(fields=['total_amount'], name='crm_order_total_idx'),
+        ]
+
+
+class OrderItem(CachedResponseModel):
+    """One product line of an order, with the price it was sold at"""
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='order_items')
+    quantity = models.PositiveIntegerField(default=1)
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2)
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product_id} in order {self.order_id}"
+
+    class Meta:
+        # The table the plain ManyToManyField created, kept with its rows
+        db_table = 'crm_order_products'
+        unique_together = [('order', 'product')]
+
+
+class DailyProductSales(CachedResponseModel):
+    """Per-day, per-product sales rollup maintained as orders are created"""
+    day = models.DateField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='daily_sales')
+    order_count = models.PositiveIntegerField(default=0)
+    units = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"{self.day} - {self.product_id}"
+
+    class Meta:
+        ordering = ['day', 'product']
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'product'], name='crm_daily_sales_day_product_uniq'),
+        ]
+
+
+class JobCheckpoint(models.Model):
+    """Position a periodic job persisted at the end of its last run"""
+    name = models.CharField(max_length=100, unique=True)
+    position = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.position}"
@@ -0,0 +1,165 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from graphene.relay import ConnectionField
+from graphene.utils.str_converters import to_snake_case
+from graphene_django.registry import get_global_registry
+from graphql import FieldNode, FragmentSpreadNode, InlineFragmentNode, Undefined
+from graphql.utilities import value_from_ast_untyped
+
+from .pagination import CURSOR_ARGS, PAGINATION_ARGS, RelationPage, page_window, window
+
+
+def prefetch_attr(response_key):
+    return f'_prefetched_{response_key}'
+
+
+def get_prefetched(instance, info):
+    """Return the optimizer's prefetched rows for the field being resolved, if any"""
+    rows = getattr(instance, prefetch_attr(info.path.key), None)
+    if rows is None:
+        return None
+    return RelationPage(rows)
+
+
+def is_cached(instance, name):
+    """Check whether a forward relation was loaded through select_related"""
+    return instance._meta.get_field(name).is_cached(instance)
+
+
+def collect_fields(selection_set, info, fields=None):
+    """Group selected fields by response key, expanding fragments"""
+    if fields is None:
+        fields = {}
+    if selection_set is None:
+        return fields
+    for selection in selection_set.selections:
+        if isinstance(selection, FieldNode):
+            key = selection.alias.value if selection.alias else selection.name.value
+            fields.setdefault(key, []).append(selection)
+        elif isinstance(selection, InlineFragmentNode):
+            collect_fields(selection.selection_set, info, fields)
+        elif isinstance(selection, FragmentSpreadNode):
+            fragment = info.fragments.get(selection.name.value)
+            if fragment is not None:
+                collect_fields(fragment.selection_set, info, fields)
+    return fields
+
+
+def node_fields(field_nodes, info):
+    """Return the fields selected on the object, looking through edges/node for connections"""
+    fields = {}
+    for field_node in field_nodes:
+        collect_fields(field_node.selection_set, info, fields)
+    if 'edges' not in fields:
+        return fields
+    edges = collect_fields_many(fields['edges'], info)
+    return collect_fields_many(edges.get('node', []), info)
+
+
+def collect_fields_many(field_nodes, info):
+    fields = {}
+    for field_node in field_nodes:
+        collect_fields(field_node.selection_set, info, fields)
+    return fields
+
+
+def field_arguments(field_node, info):
+    arguments = {}
+    for argument in field_node.arguments:
+        value = value_from_ast_untyped(argument.value, info.variable_values)
+        # Arguments bound to variables the operation wasn't given are left out
+        if value is not Undefined:
+            arguments[to_snake_case(argument.name.value)] = value
+    return arguments
+
+
+def is_connection(model, name):
+    """Check whether the model's node type exposes the relation as a connection"""
+    node_type = get_global_registry().get_type_for_model(model)
+    return node_type is not None and isinstance(node_type._meta.fields.get(name), ConnectionField)
+
+
+def parent_lookup(field):
+    """The lookup from a to-many relation's rows back to the parent, as prefetching filters them"""
+    return field.field.name if field.auto_created else field.related_query_name()
+
+
+def filter_queryset(queryset, arguments):
+    """Apply the node type's filterset to a prefetch queryset, or None if invalid"""
+    data = {name: value for name, value in arguments.items() if name not in PAGINATION_ARGS}
+    if not data:
+        return queryset
+    node_type = get_global_registry().get_type_for_model(queryset.model)
+    filterset_class = getattr(node_type._meta, 'filterset_class', None) if node_type else None
+    if filterset_class is None:
+        return None
+    filterset = filterset_class(data=data, queryset=queryset)
+    if not filterset.is_valid():
+        return None
+    return filterset.qs
+
+
+def plan(model, fields, info, prefix=''):
+    """Work out the columns, joins and prefetches needed for the selected fields"""
+    only = {prefix + model._meta.pk.attname}
+    select_related = []
+    prefetches = []
+
+    # Forward foreign keys are always loaded so loaders and prefetches never defer them
+    for field in model._meta.concrete_fields:
+        if field.is_relation:
+            only.add(prefix + field.attname)
+
+    for response_key, field_nodes in fields.items():
+        name = to_snake_case(field_nodes[0].name.value)
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            continue
+
+        if field.many_to_one or field.one_to_one:
+            related = plan(field.related_model, node_fields(field_nodes, info), info,
+                           prefix=f'{prefix}{name}__')
+            select_related.append(prefix + name)
+            select_related.extend(related['select_related'])
+            only.update(related['only'])
+            prefetches.extend(related['prefetches'])
+        elif field.one_to_many or field.many_to_many:
+            # Aliased selections with differing arguments can't share one prefetch
+            if len(field_nodes) > 1:
+                continue
+            arguments = field_arguments(field_nodes[0], info)
+            # Pages after a cursor are left to the loaders
+            if any(arguments.get(name) is not None for name in CURSOR_ARGS):
+                continue
+            queryset = build(field.related_model._default_manager.all(),
+                             node_fields(field_nodes, info), info)
+            queryset = filter_queryset(queryset, arguments)
+            if queryset is None:
+                continue
+            # Only the rows of each parent's first (or last) page are read
+            page = page_window(arguments) if is_connection(model, name) else None
+            if page is not None:
+                queryset = window(queryset, parent_lookup(field), *page)
+            prefetches.append(Prefetch(
+                prefix + name, queryset=queryset, to_attr=prefetch_attr(response_key)
+            ))
+        elif field.concrete:
+            only.add(prefix + field.attname)
+
+    return {'only': only, 'select_related': select_related, 'prefetches': prefetches}
+
+
+def build(queryset, fields, info):
+    steps = plan(queryset.model, fields, info)
+    queryset = queryset.only(*sorted(steps['only']))
+    if steps['select_related']:
+        queryset = queryset.select_related(*steps['select_related'])
+    if steps['prefetches']:
+        queryset = queryset.prefetch_related(*steps['prefetches'])
+    return queryset
+
+
+def optimize(queryset, info):
+    """Add select_related, filtered prefetches and only() for the current selection set"""
+    return build(queryset, node_fields(info.field_nodes, info), info)
@@ -0,0 +1,216 @@
+from collections import Counter, defaultdict
+from decimal import Decimal
+from itertools import chain
+
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, transaction
+from django.db.models import Case, F, Q, When
+
+from .cache import invalidate_models
+from .customer_stats import STATS_FIELDS, record_customer_order, recompute_customer_stats, refresh_customer_stats
+from .exports import chunks
+from .models import Customer, Product, Order, OrderItem
+from .rollups import LOOKUP_SIZE, record_order_sales, record_sales
+
+
+class OrderError(Exception):
+    """Raised when an order can't be placed, the message is shown to the client"""
+
+
+def product_quantities(product_ids=(), items=()):
+    """Units per product ID, keeping first-seen order
+
+    Each product ID counts as one unit, so repeating it orders several;
+    `items` are (product ID, quantity) pairs added on top.
+    """
+    quantities = Counter()
+    for product_id, quantity in chain(((product_id, 1) for product_id in product_ids), items):
+        if quantity is None or quantity < 1:
+            raise OrderError(f"Quantity must be positive for product ID: {product_id}")
+        try:
+            quantities[Product._meta.pk.to_python(product_id)] += quantity
+        except ValidationError:
+            raise OrderError(f"Invalid product ID: {product_id}")
+    return quantities
+
+
+def lock_products(product_ids):
+    """Read the products with a row lock, keyed by ID"""
+    return Product.objects.select_for_update().in_bulk(list(product_ids))
+
+
+def stock_error(products, quantities, available):
+    """Why the locked products can't supply `quantities` from `available` units, or None"""
+    for product_id in quantities:
+        if product_id not in products:
+            return f"Invalid product ID: {product_id}"
+    for product_id, quantity in quantities.items():
+        if available[product_id] < quantity:
+            return f"Insufficient stock for product: {products[product_id].name}"
+    return None
+
+
+def decrement_stock(products, quantities):
+    """Take `quantities` off the locked products with one UPDATE"""
+    # The stock condition is repeated in SQL so a concurrent order can't oversell
+    condition = Q()
+    for product_id, quantity in quantities.items():
+        condition |= Q(pk=product_id, stock__gte=quantity)
+    updated = Product.objects.filter(condition).update(stock=Case(
+        *(When(pk=product_id, then=F('stock') - quantity) for product_id, quantity in quantities.items())
+    ))
+    if updated != len(quantities):
+        raise OrderError("Insufficient stock for one or more products")
+
+    for product_id, quantity in quantities.items():
+        products[product_id].stock -= quantity
+    # Queryset updates skip model signals
+    invalidate_models(Product)
+
+
+def decrement_stock_in_bulk(products, quantities):
+    """decrement_stock() for many products, with one UPDATE per distinct quantity
+
+    Products taking the same quantity share a plain UPDATE, which stays cheap
+    where a CASE branch per product would not.
+    """
+    product_ids = defaultdict(list)
+    for product_id, quantity in quantities.items():
+        product_ids[quantity].append(product_id)
+    for quantity, ids in product_ids.items():
+        for chunk in chunks(ids, LOOKUP_SIZE):
+            updated = Product.objects.filter(pk__in=chunk, stock__gte=quantity).update(stock=F('stock') - quantity)
+            if updated != len(chunk):
+                raise OrderError("Insufficient stock for one or more products")
+
+    for product_id, quantity in quantities.items():
+        products[product_id].stock -= quantity
+    invalidate_models(Product)
+
+
+def reserve_stock(quantities):
+    """Lock the products, check their stock and decrement it"""
+    products = lock_products(quantities)
+    error = stock_error(products, quantities, {pk: product.stock for pk, product in products.items()})
+    if error:
+        raise OrderError(error)
+    decrement_stock(products, quantities)
+    return products
+
+
+def order_items(products, quantities):
+    """Unsaved order lines, priced at the products' current prices"""
+    return [
+        OrderItem(product=products[product_id], quantity=quantity, unit_price=products[product_id].price)
+        for product_id, quantity in quantities.items()
+    ]
+
+
+def order_total(items):
+    return sum((item.unit_price * item.quantity for item in items), Decimal('0.00'))
+
+
+def place_order(customer, product_ids=(), items=()):
+    """Create an order for the given products inside one short transaction
+
+    `product_ids` and `items` are combined as in product_quantities().
+    """
+    quantities = product_quantities(product_ids, items)
+    if not quantities:
+        raise OrderError("At least one product must be selected")
+    with transaction.atomic():
+        products = reserve_stock(quantities)
+        lines = order_items(products, quantities)
+        order = Order.objects.create(customer=customer, total_amount=order_total(lines))
+        for line in lines:
+            line.order = order
+        OrderItem.objects.bulk_create(lines)
+        record_order_sales(order, lines)
+        record_customer_order(order)
+    # bulk_create skips model signals
+    invalidate_models(OrderItem)
+    # The UPDATE used F() expressions, read back what concurrent orders added too
+    customer.refresh_from_db(fields=STATS_FIELDS)
+    return order
+
+
+def place_orders(rows, batch_size=1000):
+    """Create many orders with a fixed number of queries per batch
+
+    `rows` are (customer ID, product IDs, items) triples, read like
+    place_order()'s arguments. All customers are fetched with one query and
+    each batch of rows locks its products with one more. Rows that can't be
+    placed are skipped; stock goes to the rows in input order. The others are
+    bulk inserted with their lines in one transaction per batch.
+    Returns the created orders and a dict of row index -> error message.
+    """
+    errors = {}
+    parsed = []
+    for idx, (customer_id, product_ids, items) in enumerate(rows):
+        try:
+            quantities = product_quantities(product_ids or (), items or ())
+            if not quantities:
+                raise OrderError("At least one product must be selected")
+            customer_pk = Customer._meta.pk.to_python(customer_id)
+        except OrderError as e:
+            errors[idx] = str(e)
+            continue
+        except ValidationError:
+            errors[idx] = f"Customer with ID {customer_id} does not exist"
+            continue
+        parsed.append((idx, customer_pk, quantities))
+
+    customers = Customer.objects.in_bulk({customer_pk for _, customer_pk, _ in parsed})
+    orders = []
+    for start in range(0, len(parsed), batch_size):
+        batch = parsed[start:start + batch_size]
+        try:
+            with transaction.atomic():
+                orders.extend(place_order_batch(batch, customers, errors))
+        except (OrderError, DatabaseError) as e:
+            # A concurrent change beat the checks, nothing of this batch was saved
+            for idx, _, _ in batch:
+                errors[idx] = str(e)
+    if orders:
+        # bulk_create skips model signals
+        invalidate_models(Order, OrderItem)
+        refresh_customer_stats({order.customer for order in orders})
+    return orders, errors
+
+
+def place_order_batch(batch, customers, errors):
+    """Validate and insert one batch of place_orders() rows inside the caller's transaction"""
+    products = lock_products({product_id for _, _, quantities in batch for product_id in quantities})
+    available = {pk: product.stock for pk, product in products.items()}
+    accepted = []
+    for idx, customer_pk, quantities in batch:
+        if customer_pk not in customers:
+            errors[idx] = f"Customer with ID {customer_pk} does not exist"
+            continue
+        error = stock_error(products, quantities, available)
+        if error:
+            errors[idx] = error
+            continue
+        for product_id, quantity in quantities.items():
+            available[product_id] -= quantity
+        accepted.append((customers[customer_pk], quantities))
+    if not accepted:
+        return []
+
+    used = Counter()
+    for _, quantities in accepted:
+        used.update(quantities)
+    decrement_stock_in_bulk(products, used)
+
+    placed = []
+    for customer, quantities in accepted:
+        lines = order_items(products, quantities)
+        placed.append((Order(customer=customer, total_amount=order_total(lines)), lines))
+    Order.objects.bulk_create([order for order, _ in placed])
+    for order, lines in placed:
+        for line in lines:
+            line.order = order
+    OrderItem.objects.bulk_create([line for _, lines in placed for line in lines])
+    record_sales(placed)
+    recompute_customer_stats({order.customer_id for order, _ in placed})
+    return [order for order, _ in placed]
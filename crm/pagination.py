@@ -0,0 +1,187 @@
+import base64
+import json
+from decimal import Decimal
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Count, F, Q, Window
+from django.db.models.functions import RowNumber
+from graphene.relay import PageInfo
+from graphene_django.settings import graphene_settings
+from graphql import GraphQLError
+from graphql_relay import get_offset_with_default
+
+KEYSET_PREFIX = 'keyset:'
+
+PAGINATION_ARGS = {'first', 'last', 'before', 'after', 'offset'}
+CURSOR_ARGS = ('after', 'before', 'offset')
+
+
+class RelationPage(list):
+    """Rows of a relation read through window(), or all of them
+
+    The rows are positions start..start + len(rows) of the relation's `total` rows.
+    """
+
+    def __init__(self, rows=()):
+        super().__init__(rows)
+        head = self[0] if self else None
+        self.start = getattr(head, '_window_start', 0)
+        self.total = getattr(head, '_window_total', len(self))
+
+
+def page_window(args, max_limit=None):
+    """Return (limit, reverse) bounding the rows a connection page can show, or None
+
+    Offset cursors are positions, so the page lies within the first `limit`
+    rows of the relation, or within the last `limit` rows when `reverse` is set.
+    """
+    first = args.get('first')
+    last = args.get('last')
+    if first is None and last is None:
+        first = graphene_settings.RELAY_CONNECTION_MAX_LIMIT if max_limit is None else max_limit
+    bounds = []
+    if first is not None:
+        start = get_offset_with_default(args.get('after'), -1) + 1 + (args.get('offset') or 0)
+        bounds.append(start + first)
+    before = get_offset_with_default(args.get('before'), None)
+    if before is not None:
+        bounds.append(before)
+    # At least one row is read so the relation's size comes back with it
+    if bounds:
+        return max(min(bounds), 1), False
+    if last is not None:
+        return max(last, 1), True
+    return None
+
+
+def window(queryset, partition, limit, reverse=False):
+    """Keep the first `limit` rows (the last with `reverse`) of each `partition` group
+
+    ROW_NUMBER() and COUNT(*) OVER (PARTITION BY ...) bound every group in the
+    same query and annotate each row with its position and the group's size.
+    """
+    ordered = queryset.reverse() if reverse else queryset
+    order_by = [expr for expr, _ in ordered.query.get_compiler(using=queryset.db).get_order_by()]
+    queryset = queryset.annotate(
+        _window_row=Window(RowNumber(), partition_by=F(partition), order_by=order_by),
+        _window_total=Window(Count('*'), partition_by=F(partition)),
+    )
+    start = F('_window_total') - F('_window_row') if reverse else F('_window_row') - 1
+    return queryset.annotate(_window_start=start).filter(_window_row__lte=limit)
+
+
+def ordering_key(queryset):
+    """Return the (field name, descending) pair the keyset is built on"""
+    ordering = queryset.query.order_by or queryset.model._meta.ordering
+    if not ordering:
+        return 'pk', False
+    first = ordering[0]
+    if not isinstance(first, str):
+        raise GraphQLError("Keyset pagination requires ordering by a field name")
+    descending = first.startswith('-')
+    name = first.lstrip('-')
+    if name in ('pk', 'id'):
+        return 'pk', descending
+    try:
+        field = queryset.model._meta.get_field(name)
+    except FieldDoesNotExist:
+        field = None
+    if field is None or not field.concrete or field.null:
+        raise GraphQLError(f"Keyset pagination does not support ordering by '{name}'")
+    return field.name, descending
+
+
+def encode_cursor(value, pk):
+    if isinstance(value, Decimal):
+        value = str(value)
+    elif hasattr(value, 'isoformat'):
+        value = value.isoformat()
+    payload = KEYSET_PREFIX + json.dumps([value, pk])
+    return base64.b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor, queryset, name):
+    try:
+        payload = base64.b64decode(cursor).decode()
+        if not payload.startswith(KEYSET_PREFIX):
+            raise ValueError(cursor)
+        value, pk = json.loads(payload[len(KEYSET_PREFIX):])
+        field = queryset.model._meta.pk if name == 'pk' else queryset.model._meta.get_field(name)
+        return field.to_python(value), int(pk)
+    except (ValueError, TypeError):
+        raise GraphQLError(f"Invalid keyset cursor: {cursor}")
+
+
+def seek(queryset, cursor, name, descending):
+    """Restrict the queryset to rows after the cursor in (descending) key order"""
+    value, pk = decode_cursor(cursor, queryset, name)
+    lookup = 'lt' if descending else 'gt'
+    if name == 'pk':
+        return queryset.filter(**{f'pk__{lookup}': pk})
+    return queryset.filter(
+        Q(**{f'{name}__{lookup}': value}) | Q(**{name: value, f'pk__{lookup}': pk})
+    )
+
+
+def keyset_query(args, queryset, max_limit=None):
+    """Seek to the requested page, return (page queryset, limit, backward)"""
+    name, descending = ordering_key(queryset)
+    first = args.get('first')
+    last = args.get('last')
+    after = args.get('after')
+    before = args.get('before')
+    if first is None and last is None:
+        first = max_limit
+    backward = first is None
+
+    if after:
+        queryset = seek(queryset, after, name, descending)
+    if before:
+        queryset = seek(queryset, before, name, not descending)
+
+    # Walking backwards flips the order, the page is reversed again below
+    reverse = descending != backward
+    prefix = '-' if reverse else ''
+    queryset = queryset.annotate(_keyset_value=F(name)).order_by(f'{prefix}{name}', f'{prefix}pk')
+
+    limit = last if backward else first
+    return (queryset[:limit + 1] if limit is not None else queryset), limit, backward
+
+
+def keyset_page(connection, args, rows, limit, backward, total):
+    """Build the connection from the rows fetched for a keyset_query()"""
+    has_more = limit is not None and len(rows) > limit
+    rows = rows[:limit]
+    if backward:
+        rows.reverse()
+
+    edges = [
+        connection.Edge(node=row, cursor=encode_cursor(row._keyset_value, row.pk))
+        for row in rows
+    ]
+    page = connection(
+        edges=edges,
+        page_info=PageInfo(
+            start_cursor=edges[0].cursor if edges else None,
+            end_cursor=edges[-1].cursor if edges else None,
+            has_previous_page=has_more if backward else bool(args.get('after')),
+            has_next_page=bool(args.get('before')) if backward else has_more,
+        ),
+    )
+    # The unpaginated queryset is only counted if totalCount is selected
+    page.iterable = total
+    page.length = None
+    return page
+
+
+def keyset_connection(connection, args, queryset, max_limit=None):
+    """Build a connection page by seeking on (sort key, id) instead of OFFSET"""
+    page, limit, backward = keyset_query(args, queryset, max_limit)
+    return keyset_page(connection, args, list(page), limit, backward, queryset)
+
+
+async def akeyset_connection(connection, args, queryset, max_limit=None):
+    """keyset_connection() reading the page with the async ORM"""
+    page, limit, backward = keyset_query(args, queryset, max_limit)
+    rows = [row async for row in page]
+    return keyset_page(connection, args, rows, limit, backward, queryset)
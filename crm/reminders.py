@@ -0,0 +1,103 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Sum
+from django.utils import timezone
+
+from .checkpoints import claim_checkpoint, load_checkpoint
+from .exports import GroupConcat, split_ids
+from .models import Order
+from .rollups import CENTS
+
+CHECKPOINT_NAME = 'order_reminders'
+
+
+def reminder_settings():
+    options = {
+        # Customers per batch handed to a worker
+        'BATCH_SIZE': 500,
+        # On the first run, only orders this recent are reminded
+        'LOOKBACK_DAYS': 7,
+        # Orders placed this recently wait for the next run. IDs are handed out before their
+        # transactions commit, so a lower ID can still appear after a higher one was seen
+        'SETTLE_SECONDS': 300,
+        'LOG_FILE': '/tmp/order_reminders_log.txt',
+    }
+    options.update(getattr(settings, 'CRM_ORDER_REMINDERS', {}))
+    return options
+
+
+def pending_reminders(after_id, up_to_id, since, batch_size):
+    """Yield batches of one reminder per customer for orders with after_id < id <= up_to_id
+
+    Orders are grouped by customer in SQL and the customers are read in
+    keyset-paginated chunks, so no batch holds more than `batch_size` rows.
+    """
+    orders = Order.objects.filter(id__gt=after_id, id__lte=up_to_id, order_date__gte=since)
+    last_customer_id = 0
+    while True:
+        rows = list(
+            orders.filter(customer_id__gt=last_customer_id)
+            .values('customer_id', 'customer__email')
+            .annotate(
+                order_ids=GroupConcat('id'), total=Sum('total_amount'), latest=Max('order_date')
+            )
+            .order_by('customer_id')[:batch_size]
+        )
+        if not rows:
+            return
+        last_customer_id = rows[-1]['customer_id']
+        # Celery serializes task arguments as JSON
+        yield [
+            {
+                'customer_id': row['customer_id'],
+                'email': row['customer__email'],
+                'order_ids': split_ids(row['order_ids']),
+                'total': str(row['total'].quantize(CENTS)),
+                'latest_order_date': row['latest'].isoformat(),
+            }
+            for row in rows
+        ]
+
+
+def send_reminder_batch(reminders):
+    """Remind each customer once about their new orders, returns the reminders sent"""
+    timestamp = timezone.now().strftime('%Y-%m-%d %H:%M:%S')
+    with open(reminder_settings()['LOG_FILE'], 'a') as log_file:
+        log_file.writelines(
+            f"{timestamp}: Customer {reminder['email']}, {len(reminder['order_ids'])} new order(s) "
+            f"totalling {reminder['total']}: Order IDs {', '.join(map(str, reminder['order_ids']))}\n"
+            for reminder in reminders
+        )
+    return len(reminders)
+
+
+def run_order_reminders(dispatch, batch_size=None, days=None):
+    """Hand a batch of reminders to `dispatch` per chunk of customers with new orders
+
+    Orders up to the highest ID placed at least SETTLE_SECONDS before the run
+    are covered, so orders still committing below that ID are not skipped. The run
+    first claims that range by moving the high-water mark, and commits the move
+    once every batch has been dispatched: the next run starts after them, a
+    failed run is retried in full and an overlapping run skips the range.
+    """
+    options = reminder_settings()
+    batch_size = batch_size or options['BATCH_SIZE']
+    days = options['LOOKBACK_DAYS'] if days is None else days
+
+    now = timezone.now()
+    since = now - timedelta(days=days)
+    settled = Order.objects.filter(order_date__lte=now - timedelta(seconds=options['SETTLE_SECONDS']))
+    customers = batches = 0
+    with transaction.atomic():
+        after_id = load_checkpoint(CHECKPOINT_NAME)
+        up_to_id = settled.aggregate(last=Max('id'))['last'] or 0
+        if up_to_id > after_id and not claim_checkpoint(CHECKPOINT_NAME, after_id, up_to_id):
+            # Another run already took these orders
+            up_to_id = after_id
+        for batch in pending_reminders(after_id, up_to_id, since, batch_size):
+            dispatch(batch)
+            customers += len(batch)
+            batches += 1
+    return {'customers': customers, 'batches': batches, 'after_id': after_id, 'up_to_id': up_to_id}
@@ -0,0 +1,45 @@
+from decimal import Decimal
+
+from django.db.models import Count, Sum
+
+from .models import Customer, Order, OrderItem
+
+
+def stats_querysets(date_from=None, date_to=None):
+    customers = Customer.objects.all()
+    orders = Order.objects.all()
+    items = OrderItem.objects.all()
+    if date_from is not None:
+        customers = customers.filter(created_at__gte=date_from)
+        orders = orders.filter(order_date__gte=date_from)
+        items = items.filter(order__order_date__gte=date_from)
+    if date_to is not None:
+        customers = customers.filter(created_at__lte=date_to)
+        orders = orders.filter(order_date__lte=date_to)
+        items = items.filter(order__order_date__lte=date_to)
+    return customers, orders, items
+
+
+def stats_result(customer_count, totals, units):
+    return {
+        'customer_count': customer_count,
+        'order_count': totals['order_count'],
+        'units_sold': units['units_sold'] or 0,
+        'revenue': (totals['revenue'] or Decimal('0')).quantize(Decimal('0.01')),
+    }
+
+
+def crm_stats(date_from=None, date_to=None):
+    """Customer count, order count, units sold and revenue computed with SQL aggregates"""
+    customers, orders, items = stats_querysets(date_from, date_to)
+    totals = orders.aggregate(order_count=Count('id'), revenue=Sum('total_amount'))
+    units = items.aggregate(units_sold=Sum('quantity'))
+    return stats_result(customers.count(), totals, units)
+
+
+async def acrm_stats(date_from=None, date_to=None):
+    """crm_stats() through the async ORM"""
+    customers, orders, items = stats_querysets(date_from, date_to)
+    totals = await orders.aaggregate(order_count=Count('id'), revenue=Sum('total_amount'))
+    units = await items.aaggregate(units_sold=Sum('quantity'))
+    return stats_result(await customers.acount(), totals, units)
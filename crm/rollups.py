@@ -0,0 +1,163 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import (
+    Case, Count, DateField, DecimalField, ExpressionWrapper, F, IntegerField, Sum, Value, When,
+)
+from django.db.models.functions import TruncDate, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from .cache import invalidate_models
+from .exports import chunks
+from .models import DailyProductSales, OrderItem
+
+# IDs per IN lookup, under SQLite's 999 query parameters with room for the rest
+LOOKUP_SIZE = 900
+
+# Revenue of an order line, summed in SQL
+LINE_TOTAL = ExpressionWrapper(
+    F('quantity') * F('unit_price'), output_field=DecimalField(max_digits=14, decimal_places=2)
+)
+
+
+def record_order_sales(order, items):
+    """Add one order's lines to the daily rollup, two queries however many products it has"""
+    day = timezone.localdate(order.order_date)
+    DailyProductSales.objects.bulk_create(
+        [DailyProductSales(day=day, product_id=item.product_id) for item in items],
+        ignore_conflicts=True,
+    )
+    DailyProductSales.objects.filter(day=day, product_id__in=[item.product_id for item in items]).update(
+        order_count=F('order_count') + 1,
+        units=F('units') + Case(
+            *(When(product_id=item.product_id, then=Value(item.quantity)) for item in items),
+            output_field=IntegerField(),
+        ),
+        revenue=F('revenue') + Case(
+            *(When(product_id=item.product_id, then=Value(item.unit_price * item.quantity)) for item in items),
+            output_field=DecimalField(max_digits=14, decimal_places=2),
+        ),
+    )
+
+
+def record_sales(orders):
+    """Add the lines of many (order, items) pairs to the daily rollup
+
+    A CASE branch per product, as in record_order_sales(), gets slow with
+    thousands of products. Here the rows are created if missing, locked, added
+    to in Python and written back with an upsert, a few queries per batch.
+    """
+    totals = defaultdict(lambda: [0, 0, Decimal('0.00')])
+    for order, items in orders:
+        day = timezone.localdate(order.order_date)
+        for item in items:
+            row = totals[day, item.product_id]
+            row[0] += 1
+            row[1] += item.quantity
+            row[2] += item.unit_price * item.quantity
+    DailyProductSales.objects.bulk_create(
+        [DailyProductSales(day=day, product_id=product_id) for day, product_id in totals], ignore_conflicts=True
+    )
+    products_by_day = defaultdict(list)
+    for day, product_id in totals:
+        products_by_day[day].append(product_id)
+    for day, product_ids in products_by_day.items():
+        for chunk in chunks(product_ids, LOOKUP_SIZE):
+            rows = DailyProductSales.objects.select_for_update().filter(day=day, product_id__in=chunk).order_by()
+            for row in rows.values_list('day', 'product_id', 'order_count', 'units', 'revenue'):
+                totals[row[:2]] = [current + added for current, added in zip(row[2:], totals[row[:2]])]
+    DailyProductSales.objects.bulk_create(
+        [
+            DailyProductSales(day=day, product_id=product_id, order_count=count, units=units, revenue=revenue)
+            for (day, product_id), (count, units, revenue) in totals.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['day', 'product'],
+        update_fields=['order_count', 'units', 'revenue'],
+    )
+
+
+def insert_daily_sales(rollup_model, lines, batch_size=1000):
+    """Insert the per-day, per-product totals of an order line queryset into the rollup
+
+    The totals are streamed and inserted `batch_size` rows at a time, so a
+    long range is never held in memory. The models are passed in so that
+    migrations can run this with their historical models.
+    """
+    totals = (
+        lines.annotate(day=TruncDate('order__order_date'))
+        .values('day', 'product_id')
+        # A product appears once per order, so lines and orders count the same
+        .annotate(order_count=Count('id'), units=Sum('quantity'), revenue=Sum(LINE_TOTAL))
+        .order_by()
+    )
+    count = 0
+    for batch in chunks(totals.iterator(chunk_size=batch_size), batch_size):
+        rollup_model.objects.bulk_create([
+            rollup_model(
+                day=row['day'],
+                product_id=row['product_id'],
+                order_count=row['order_count'],
+                units=row['units'],
+                revenue=row['revenue'] or Decimal('0.00'),
+            )
+            for row in batch
+        ])
+        count += len(batch)
+    return count
+
+
+def rebuild_daily_sales(date_from, date_to, batch_size=1000):
+    """Recompute the rollup rows for an inclusive date range from the order lines"""
+    lines = OrderItem.objects.filter(
+        order__order_date__date__gte=date_from,
+        order__order_date__date__lte=date_to,
+    )
+    with transaction.atomic():
+        DailyProductSales.objects.filter(day__gte=date_from, day__lte=date_to).delete()
+        count = insert_daily_sales(DailyProductSales, lines, batch_size)
+        # Neither the queryset delete nor bulk_create sends the signals that drop cached series
+        invalidate_models(DailyProductSales)
+    return count
+
+
+CENTS = Decimal('0.01')
+
+GRANULARITIES = {
+    'day': None,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+
+def sales_points(date_from, date_to, granularity='day', product_id=None):
+    """Per-period, per-product totals from the rollup table, as a values() queryset"""
+    rows = DailyProductSales.objects.filter(day__gte=date_from, day__lte=date_to)
+    if product_id is not None:
+        rows = rows.filter(product_id=product_id)
+    trunc = GRANULARITIES[granularity]
+    period = trunc('day', output_field=DateField()) if trunc else F('day')
+    return (
+        rows.annotate(period=period)
+        .values('period', 'product_id')
+        .annotate(order_count=Sum('order_count'), units=Sum('units'), revenue=Sum('revenue'))
+        .order_by('period', 'product_id')
+    )
+
+
+def quantize_points(points):
+    for point in points:
+        point['revenue'] = point['revenue'].quantize(CENTS)
+    return points
+
+
+def sales_time_series(date_from, date_to, granularity='day', product_id=None):
+    """Read per-period, per-product totals from the rollup table"""
+    return quantize_points(list(sales_points(date_from, date_to, granularity, product_id)))
+
+
+async def asales_time_series(date_from, date_to, granularity='day', product_id=None):
+    """sales_time_series() through the async ORM"""
+    points = sales_points(date_from, date_to, granularity, product_id)
+    return quantize_points([point async for point in points])
@@ -1,21 +1,39 @@
 import graphene
 from graphene_django import DjangoObjectType
-from graphene_django.filter import DjangoFilterConnectionField
-from django.db import transaction
+from django.conf import settings
+from django.db import connection, transaction, IntegrityError
 from django.core.exceptions import ValidationError
 from decimal import Decimal
-from .models import Customer, Product, Order
+from .models import Customer, Product, Order, OrderItem
 from crm.models import Product
 from .filters import CustomerFilter, ProductFilter, OrderFilter
+from .fields import BatchedFilterConnectionField, CountableConnection, loader_window
+from .loaders import get_loaders
+from .optimizer import optimize, get_prefetched, is_cached
+from .orders import OrderError, place_order, place_orders
+from .inventory import LOW_STOCK_THRESHOLD, RESTOCK_INCREMENT, restock_low_stock
+from .reports import crm_stats, acrm_stats
+from .cache import invalidate_models
+from .rollups import sales_time_series, asales_time_series
+from .async_utils import AsyncSafeMutation, maybe_sync_to_async, running_async
 
 
 # GraphQL Types
 class CustomerType(DjangoObjectType):
     class Meta:
         model = Customer
-        fields = ('id', 'name', 'email', 'phone', 'created_at', 'orders')
+        fields = ('id', 'name', 'email', 'phone', 'created_at', 'order_count', 'lifetime_value', 'last_order_at', 'orders')
         filterset_class = CustomerFilter
         interfaces = (graphene.relay.Node,)
+        connection_class = CountableConnection
+
+    orders = BatchedFilterConnectionField(lambda: OrderType, required=True)
+
+    def resolve_orders(self, info, **kwargs):
+        prefetched = get_prefetched(self, info)
+        if prefetched is not None:
+            return prefetched
+        return get_loaders(info).customer_orders.load(self.pk, loader_window(kwargs))
 
 
 class ProductType(DjangoObjectType):
@@ -24,14 +42,71 @@ class ProductType(DjangoObjectType):
         fields = ('id', 'name', 'price', 'stock', 'created_at', 'orders')
         filterset_class = ProductFilter
         interfaces = (graphene.relay.Node,)
+        connection_class = CountableConnection
+
+    orders = BatchedFilterConnectionField(lambda: OrderType, required=True)
+
+    def resolve_orders(self, info, **kwargs):
+        prefetched = get_prefetched(self, info)
+        if prefetched is not None:
+            return prefetched
+        return get_loaders(info).product_orders.load(self.pk, loader_window(kwargs))
+
+
+class OrderItemType(DjangoObjectType):
+    class Meta:
+        model = OrderItem
+        fields = ('product', 'quantity', 'unit_price')
 
 
 class OrderType(DjangoObjectType):
     class Meta:
         model = Order
-        fields = ('id', 'customer', 'products', 'total_amount', 'order_date')
+        fields = ('id', 'customer', 'products', 'items', 'total_amount', 'order_date')
         filterset_class = OrderFilter
         interfaces = (graphene.relay.Node,)
+        connection_class = CountableConnection
+
+    products = BatchedFilterConnectionField(ProductType, required=True)
+    items = graphene.List(graphene.NonNull(OrderItemType), required=True)
+
+    def resolve_customer(self, info):
+        if is_cached(self, 'customer'):
+            return self.customer
+        return get_loaders(info).customer.load(self.customer_id)
+
+    def resolve_products(self, info, **kwargs):
+        prefetched = get_prefetched(self, info)
+        if prefetched is not None:
+            return prefetched
+        return get_loaders(info).order_products.load(self.pk, loader_window(kwargs))
+
+    def resolve_items(self, info):
+        prefetched = get_prefetched(self, info)
+        if prefetched is not None:
+            return prefetched
+        return get_loaders(info).order_items.load(self.pk)
+
+
+class CRMStatsType(graphene.ObjectType):
+    customer_count = graphene.Int()
+    order_count = graphene.Int()
+    units_sold = graphene.Int()
+    revenue = graphene.Decimal()
+
+
+class SalesGranularity(graphene.Enum):
+    DAY = 'day'
+    WEEK = 'week'
+    MONTH = 'month'
+
+
+class SalesPointType(graphene.ObjectType):
+    period = graphene.Date()
+    product_id = graphene.ID()
+    order_count = graphene.Int()
+    units = graphene.Int()
+    revenue = graphene.Decimal()
 
 
 # Input Types
@@ -47,14 +122,21 @@ class ProductInput(graphene.InputObjectType):
     stock = graphene.Int(required=False, default_value=0)
 
 
+class OrderItemInput(graphene.InputObjectType):
+    product_id = graphene.ID(required=True)
+    quantity = graphene.Int(required=False, default_value=1)
+
+
 class OrderInput(graphene.InputObjectType):
     customer_id = graphene.ID(required=True)
-    product_ids = graphene.List(graphene.ID, required=True)
+    # Each ID is one unit; use items to order several units of a product
+    product_ids = graphene.List(graphene.ID, required=False)
+    items = graphene.List(graphene.NonNull(OrderItemInput), required=False)
     order_date = graphene.DateTime(required=False)
 
 
 # Mutations
-class CreateCustomer(graphene.Mutation):
+class CreateCustomer(AsyncSafeMutation):
     class Arguments:
         input = CustomerInput(required=True)
 
@@ -105,54 +187,99 @@ class CreateCustomer(graphene.Mutation):
             )
 
 
-class BulkCreateCustomers(graphene.Mutation):
+class BulkCreateCustomers(AsyncSafeMutation):
     class Arguments:
         input = graphene.List(CustomerInput, required=True)
+        batch_size = graphene.Int(required=False)
 
     customers = graphene.List(CustomerType)
     errors = graphene.List(graphene.String)
     success = graphene.Boolean()
 
-    def mutate(self, info, input):
+    def mutate(self, info, input, batch_size=None):
+        if batch_size is None:
+            batch_size = getattr(settings, 'CRM_BULK_CREATE_BATCH_SIZE', 1000)
+        if batch_size < 1:
+            return BulkCreateCustomers(
+                customers=[],
+                errors=["Batch size must be positive"],
+                success=False
+            )
+
+        # Check every email against the database up front with one IN query
+        # (split only where the backend limits the number of query parameters)
+        emails = list({customer_data.email for customer_data in input})
+        lookup_size = connection.features.max_query_params or len(emails) or 1
+        existing_emails = set()
+        for start in range(0, len(emails), lookup_size):
+            existing_emails.update(
+                Customer.objects.filter(email__in=emails[start:start + lookup_size])
+                .order_by()
+                .values_list('email', flat=True)
+            )
+
+        pending = []
+        errors = {}
+        seen_emails = set()
+        for idx, customer_data in enumerate(input):
+            # Check if email already exists, in the database or earlier in this batch
+            if customer_data.email in existing_emails or customer_data.email in seen_emails:
+                errors[idx] = f"Row {idx + 1}: Email '{customer_data.email}' already exists"
+                continue
+
+            customer = Customer(
+                name=customer_data.name,
+                email=customer_data.email,
+                phone=customer_data.phone if customer_data.phone else None
+            )
+
+            # Validate in memory, uniqueness was checked above
+            try:
+                customer.full_clean(validate_unique=False)
+            except ValidationError as e:
+                error_messages = []
+                for field, field_errors in e.message_dict.items():
+                    error_messages.extend(field_errors)
+                errors[idx] = f"Row {idx + 1}: {'; '.join(error_messages)}"
+                continue
+
+            seen_emails.add(customer_data.email)
+            pending.append((idx, customer))
+
         created_customers = []
-        errors = []
-
-        with transaction.atomic():
-            for idx, customer_data in enumerate(input):
-                try:
-                    # Check if email already exists
-                    if Customer.objects.filter(email=customer_data.email).exists():
-                        errors.append(f"Row {idx + 1}: Email '{customer_data.email}' already exists")
-                        continue
-
-                    # Create customer
-                    customer = Customer(
-                        name=customer_data.name,
-                        email=customer_data.email,
-                        phone=customer_data.phone if customer_data.phone else None
-                    )
-                    
-                    # Validate and save
-                    customer.full_clean()
-                    customer.save()
-                    created_customers.append(customer)
-
-                except ValidationError as e:
-                    error_messages = []
-                    for field, field_errors in e.message_dict.items():
-                        error_messages.extend(field_errors)
-                    errors.append(f"Row {idx + 1}: {'; '.join(error_messages)}")
-                except Exception as e:
-                    errors.append(f"Row {idx + 1}: {str(e)}")
+        for start in range(0, len(pending), batch_size):
+            chunk = pending[start:start + batch_size]
+            try:
+                with transaction.atomic():
+                    Customer.objects.bulk_create([customer for idx, customer in chunk], batch_size=batch_size)
+                created_customers.extend(customer for idx, customer in chunk)
+            except IntegrityError:
+                # A concurrent insert took one of the emails, retry row by row
+                for idx, customer in chunk:
+                    try:
+                        with transaction.atomic():
+                            customer.save()
+                        created_customers.append(customer)
+                    except IntegrityError:
+                        errors[idx] = f"Row {idx + 1}: Email '{customer.email}' already exists"
+                    except Exception as e:
+                        errors[idx] = f"Row {idx + 1}: {str(e)}"
+            except Exception as e:
+                for idx, customer in chunk:
+                    errors[idx] = f"Row {idx + 1}: {str(e)}"
+
+        # bulk_create skips model signals
+        if created_customers:
+            invalidate_models(Customer)
 
         return BulkCreateCustomers(
             customers=created_customers,
-            errors=errors if errors else None,
+            errors=[errors[idx] for idx in sorted(errors)] if errors else None,
             success=len(created_customers) > 0
         )
 
 
-class CreateProduct(graphene.Mutation):
+class CreateProduct(AsyncSafeMutation):
     class Arguments:
         input = ProductInput(required=True)
 
@@ -212,7 +339,7 @@ class CreateProduct(graphene.Mutation):
             )
 
 
-class CreateOrder(graphene.Mutation):
+class CreateOrder(AsyncSafeMutation):
     class Arguments:
         input = OrderInput(required=True)
 
@@ -233,39 +360,26 @@ class CreateOrder(graphene.Mutation):
                 )
 
             # Validate at least one product
-            if not input.product_ids or len(input.product_ids) == 0:
+            if not input.product_ids and not input.items:
                 return CreateOrder(
                     order=None,
                     message="At least one product must be selected",
                     success=False
                 )
 
-            # Validate all products exist
-            products = []
-            for product_id in input.product_ids:
-                try:
-                    product = Product.objects.get(pk=product_id)
-                    products.append(product)
-                except Product.DoesNotExist:
-                    return CreateOrder(
-                        order=None,
-                        message=f"Invalid product ID: {product_id}",
-                        success=False
-                    )
-
-            # Calculate total amount
-            total_amount = sum(product.price for product in products)
-
-            # Create order
-            with transaction.atomic():
-                order = Order(
-                    customer=customer,
-                    total_amount=total_amount
+            # Load all products in one query, reserve stock and create the order
+            try:
+                order = place_order(
+                    customer,
+                    input.product_ids or [],
+                    [(item.product_id, item.quantity) for item in input.items or []],
+                )
+            except OrderError as e:
+                return CreateOrder(
+                    order=None,
+                    message=str(e),
+                    success=False
                 )
-                order.save()
-                
-                # Add products to order
-                order.products.set(products)
 
             return CreateOrder(
                 order=order,
@@ -280,71 +394,171 @@ class CreateOrder(graphene.Mutation):
             )
 
 
+class BulkCreateOrders(AsyncSafeMutation):
+    class Arguments:
+        input = graphene.List(OrderInput, required=True)
+        batch_size = graphene.Int(required=False)
+
+    orders = graphene.List(OrderType)
+    errors = graphene.List(graphene.String)
+    success = graphene.Boolean()
+
+    def mutate(self, info, input, batch_size=None):
+        if batch_size is None:
+            batch_size = getattr(settings, 'CRM_BULK_CREATE_BATCH_SIZE', 1000)
+        if batch_size < 1:
+            return BulkCreateOrders(
+                orders=[],
+                errors=["Batch size must be positive"],
+                success=False
+            )
+
+        # Customers and products are looked up once for all rows, orders and
+        # their lines are inserted with bulk_create; invalid rows are skipped
+        rows = [
+            (
+                order_data.customer_id,
+                order_data.product_ids,
+                [(item.product_id, item.quantity) for item in order_data.items or []],
+            )
+            for order_data in input
+        ]
+        try:
+            created_orders, errors = place_orders(rows, batch_size)
+        except Exception as e:
+            return BulkCreateOrders(
+                orders=[],
+                errors=[str(e)],
+                success=False
+            )
+
+        # Load the returned orders' relations in batches
+        get_loaders(info).prime_nodes(created_orders)
+
+        return BulkCreateOrders(
+            orders=created_orders,
+            errors=[f"Row {idx + 1}: {errors[idx]}" for idx in sorted(errors)] if errors else None,
+            success=len(created_orders) > 0
+        )
+
+
+async def aget_optimized(queryset, info, **lookup):
+    """Single object lookup for async execution, None if it doesn't exist"""
+    # Prefetch filtersets may query while validating their arguments
+    queryset = await maybe_sync_to_async(optimize, queryset, info)
+    try:
+        return await queryset.aget(**lookup)
+    except queryset.model.DoesNotExist:
+        return None
+
+
 # Query
 class Query(graphene.ObjectType):
     # Relay connection fields with filtering
-    all_customers = DjangoFilterConnectionField(CustomerType, order_by=graphene.String())
-    all_products = DjangoFilterConnectionField(ProductType, order_by=graphene.String())
-    all_orders = DjangoFilterConnectionField(OrderType, order_by=graphene.String())
+    # Ordering comes from CustomerFilter's orderBy argument
+    all_customers = BatchedFilterConnectionField(CustomerType, keyset=graphene.Boolean())
+    all_products = BatchedFilterConnectionField(ProductType, order_by=graphene.String(), keyset=graphene.Boolean())
+    all_orders = BatchedFilterConnectionField(OrderType, order_by=graphene.String(), keyset=graphene.Boolean())
     
     # Single object queries
     customer = graphene.Field(CustomerType, id=graphene.ID(required=True))
     product = graphene.Field(ProductType, id=graphene.ID(required=True))
     order = graphene.Field(OrderType, id=graphene.ID(required=True))
+
+    # Aggregate statistics
+    crm_stats = graphene.Field(
+        CRMStatsType,
+        date_from=graphene.DateTime(name='from'),
+        date_to=graphene.DateTime(name='to')
+    )
+    sales_time_series = graphene.List(
+        SalesPointType,
+        date_from=graphene.Date(name='from', required=True),
+        date_to=graphene.Date(name='to', required=True),
+        granularity=SalesGranularity(default_value=SalesGranularity.DAY.value),
+        product_id=graphene.ID()
+    )
     
     # Custom resolvers with ordering support
-    def resolve_all_customers(self, info, order_by=None, **kwargs):
-        queryset = Customer.objects.all()
-        if order_by:
-            queryset = queryset.order_by(order_by)
-        return queryset
+    def resolve_all_customers(self, info, **kwargs):
+        return maybe_sync_to_async(optimize, Customer.objects.all(), info)
 
     def resolve_all_products(self, info, order_by=None, **kwargs):
         queryset = Product.objects.all()
         if order_by:
             queryset = queryset.order_by(order_by)
-        return queryset
+        return maybe_sync_to_async(optimize, queryset, info)
 
     def resolve_all_orders(self, info, order_by=None, **kwargs):
         queryset = Order.objects.all()
         if order_by:
             queryset = queryset.order_by(order_by)
-        return queryset
+        return maybe_sync_to_async(optimize, queryset, info)
+
+    def resolve_crm_stats(self, info, date_from=None, date_to=None):
+        if running_async():
+            # CRMStatsType resolves its fields from the dict keys just the same
+            return acrm_stats(date_from, date_to)
+        return CRMStatsType(**crm_stats(date_from, date_to))
+
+    def resolve_sales_time_series(self, info, date_from, date_to, granularity=SalesGranularity.DAY.value, product_id=None):
+        if running_async():
+            return asales_time_series(date_from, date_to, getattr(granularity, 'value', granularity), product_id)
+        return [
+            SalesPointType(**row)
+            for row in sales_time_series(date_from, date_to, getattr(granularity, 'value', granularity), product_id)
+        ]
 
     def resolve_customer(self, info, id):
+        if running_async():
+            return aget_optimized(Customer.objects.all(), info, pk=id)
         try:
-            return Customer.objects.get(pk=id)
+            return optimize(Customer.objects.all(), info).get(pk=id)
         except Customer.DoesNotExist:
             return None
 
     def resolve_product(self, info, id):
+        if running_async():
+            return aget_optimized(Product.objects.all(), info, pk=id)
         try:
-            return Product.objects.get(pk=id)
+            return optimize(Product.objects.all(), info).get(pk=id)
         except Product.DoesNotExist:
             return None
 
     def resolve_order(self, info, id):
+        if running_async():
+            return aget_optimized(Order.objects.all(), info, pk=id)
         try:
-            return Order.objects.get(pk=id)
+            return optimize(Order.objects.all(), info).get(pk=id)
         except Order.DoesNotExist:
             return None
 
 
-class UpdateLowStockProducts(graphene.Mutation):
+class UpdateLowStockProducts(AsyncSafeMutation):
+    class Arguments:
+        threshold = graphene.Int(
+            required=False, default_value=LOW_STOCK_THRESHOLD,
+            description="Restock products below this stock level; only the default uses the partial low stock index",
+        )
+        increment = graphene.Int(required=False, default_value=RESTOCK_INCREMENT)
+
     products = graphene.List(ProductType)
     message = graphene.String()
     success = graphene.Boolean()
 
-    def mutate(self, info):
+    def mutate(self, info, threshold=LOW_STOCK_THRESHOLD, increment=RESTOCK_INCREMENT):
         try:
-            low_stock_products = Product.objects.filter(stock__lt=10)
-            updated_products = []
-            
-            for product in low_stock_products:
-                product.stock += 10
-                product.save()
-                updated_products.append(product)
-            
+            # Validate increment is positive
+            if increment <= 0:
+                return UpdateLowStockProducts(
+                    products=[],
+                    message="Increment must be positive",
+                    success=False
+                )
+
+            # One UPDATE for every low stock product
+            updated_products = restock_low_stock(threshold, increment)
+
             return UpdateLowStockProducts(
                 products=updated_products,
                 message=f"Updated {len(updated_products)} low stock products",
@@ -364,4 +578,5 @@ class Mutation(graphene.ObjectType):
     bulk_create_customers = BulkCreateCustomers.Field()
     create_product = CreateProduct.Field()
     create_order = CreateOrder.Field()
+    bulk_create_orders = BulkCreateOrders.Field()
     update_low_stock_products = UpdateLowStockProducts.Field()
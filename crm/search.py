@@ -0,0 +1,58 @@
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+# Text columns indexed for each searchable table
+SEARCH_FIELDS = {
+    'crm_customer': ('name', 'email', 'phone'),
+    'crm_product': ('name',),
+}
+
+TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def fts_table(table):
+    return f'{table}_fts'
+
+
+def fts_match_query(value):
+    """Quote each word as an FTS5 prefix term so user input can't inject syntax"""
+    terms = TERM_RE.findall(value)
+    return ' '.join('"{}"*'.format(term.replace('"', '""')) for term in terms)
+
+
+def search_queryset(queryset, value):
+    """Filter a customer/product queryset by a free-text search, best matches first"""
+    value = (value or '').strip()
+    if not value:
+        return queryset
+    table = queryset.model._meta.db_table
+    fields = SEARCH_FIELDS[table]
+
+    if connection.vendor == 'sqlite':
+        match = fts_match_query(value)
+        if not match:
+            return queryset.none()
+        fts = fts_table(table)
+        # Join the index once on rowid; bm25() is lower for better matches
+        return queryset.extra(
+            tables=[fts],
+            where=[f'"{fts}".rowid = "{table}"."{queryset.model._meta.pk.column}"', f'"{fts}" MATCH %s'],
+            params=[match],
+            select={'search_rank': f'bm25("{fts}")'},
+        ).order_by('search_rank', 'pk')
+
+    condition = Q()
+    for field in fields:
+        condition |= Q(**{f'{field}__icontains': value})
+    queryset = queryset.filter(condition)
+
+    if connection.vendor == 'postgresql':
+        # ILIKE is served by the pg_trgm GIN indexes, similarity ranks the matches
+        from django.contrib.postgres.search import TrigramSimilarity
+
+        rank = sum((TrigramSimilarity(field, value) for field in fields[1:]), TrigramSimilarity(fields[0], value))
+        return queryset.annotate(search_rank=rank).order_by('-search_rank', 'pk')
+
+    return queryset
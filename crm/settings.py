@@ -22,4 +22,8 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'crm.tasks.generate_crm_report',
         'schedule': crontab(day_of_week='mon', hour=6, minute=0),
     },
+    'queue-order-reminders': {
+        'task': 'crm.tasks.queue_order_reminders',
+        'schedule': crontab(hour=8, minute=0),
+    },
 }
\ No newline at end of file
@@ -0,0 +1,16 @@
+from django.db.models.signals import post_save, m2m_changed
+from django.dispatch import receiver
+
+from .cache import invalidate_models
+from .models import Customer, Product, Order, OrderItem
+
+
+# Deletes are invalidated by CachedResponseModel, keeping Django's fast deletes
+@receiver(post_save, sender=Customer)
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Order)
+@receiver(post_save, sender=OrderItem)
+@receiver(m2m_changed, sender=OrderItem)
+def invalidate_cached_responses(sender, **kwargs):
+    """Drop cached GraphQL responses that selected the changed model"""
+    invalidate_models(sender)
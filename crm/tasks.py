@@ -1,45 +1,21 @@
 from celery import shared_task
 from datetime import datetime
-import requests
-from gql import gql, Client
-from gql.transport.requests import RequestsHTTPTransport
+
+from .reminders import run_order_reminders, send_reminder_batch
+from .reports import crm_stats
 
 @shared_task
 def generate_crm_report():
-    """Generate weekly CRM report using GraphQL queries"""
+    """Generate weekly CRM report from in-database aggregates"""
     timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     
     try:
-        transport = RequestsHTTPTransport(url="http://localhost:8000/graphql")
-        client = Client(transport=transport, fetch_schema_from_transport=True)
-        
-        # Query for CRM statistics
-        query = gql("""
-        query {
-            allCustomers {
-                edges {
-                    node {
-                        id
-                    }
-                }
-            }
-            allOrders {
-                edges {
-                    node {
-                        id
-                        totalAmount
-                    }
-                }
-            }
-        }
-        """)
-        
-        result = client.execute(query)
+        # Counts and revenue come from COUNT/SUM queries, not a full fetch over HTTP
+        stats = crm_stats()
         
-        # Calculate statistics
-        total_customers = len(result['allCustomers']['edges'])
-        total_orders = len(result['allOrders']['edges'])
-        total_revenue = sum(float(order['node']['totalAmount']) for order in result['allOrders']['edges'])
+        total_customers = stats['customer_count']
+        total_orders = stats['order_count']
+        total_revenue = stats['revenue']
         
         # Log the report
         report = f"{timestamp} - Report: {total_customers} customers, {total_orders} orders, {total_revenue:.2f} revenue"
@@ -53,4 +29,16 @@ def generate_crm_report():
         error_msg = f"{timestamp} - Error generating report: {str(e)}"
         with open('/tmp/crm_report_log.txt', 'a') as log_file:
             log_file.write(error_msg + '\n')
-        return error_msg
\ No newline at end of file
+        return error_msg
+
+
+@shared_task
+def send_order_reminder_batch(reminders):
+    """Send one batch of per-customer order reminders"""
+    return send_reminder_batch(reminders)
+
+
+@shared_task
+def queue_order_reminders():
+    """Fan reminders for orders placed since the last run out to the workers"""
+    return run_order_reminders(send_order_reminder_batch.delay)
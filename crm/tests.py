@@ -1,3 +1,1441 @@
-from django.test import TestCase
+import asyncio
+import json
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models import Count, Max, Min, QuerySet
+from django.db.migrations.executor import MigrationExecutor
+from django.test import AsyncClient, TestCase, TransactionTestCase, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from graphql_relay import from_global_id, offset_to_cursor
+
+from alx_backend_graphql.client import GraphQLClientError, HTTPClient, SchemaClient
+from alx_backend_graphql.schema import schema
+from alx_backend_graphql.tracing import metrics
+from alx_backend_graphql.views import AsyncGraphQLView, document_cache, query_hash
+from .loaders import AsyncLoaders, Loaders
+from .benchmarks import OPERATIONS, find_regressions, run_suite
+from .cache import response_cache_stats
+from .checkpoints import load_checkpoint
+from .cleanup import CHECKPOINT_NAME as CLEANUP_CHECKPOINT, clean_inactive_customers, delete_inactive_customers
+from .customer_stats import backfill_customer_stats
+from .datagen import DatasetSpec, generate
+from .filters import CustomerFilter, ProductFilter, OrderFilter
+from .models import Customer, Product, Order, OrderItem, DailyProductSales
+from .orders import place_order
+from .reminders import CHECKPOINT_NAME as REMINDERS_CHECKPOINT, pending_reminders, run_order_reminders
+from .rollups import rebuild_daily_sales
+from .search import search_queryset
+from .cron import log_crm_heartbeat, update_low_stock
+from .tasks import generate_crm_report
+
+
+def node_pk(edge):
+    return int(from_global_id(edge['node']['id']).id)
+
+
+class SchemaTestCase(TestCase):
+    """Base class that runs operations through the project schema"""
+
+    def execute(self, query, variables=None):
+        request = RequestFactory().post('/graphql')
+        result = schema.execute(query, variables=variables, context_value=request)
+        self.assertIsNone(result.errors, result.errors)
+        return result.data
+
+    def create_orders(self, count, products_per_order=2):
+        products = [
+            Product.objects.create(name=f"Product {i}", price=Decimal('10.00'), stock=20)
+            for i in range(products_per_order + 1)
+        ]
+        for i in range(count):
+            customer = Customer.objects.create(name=f"Customer {i}", email=f"c{i}@example.com")
+            order = Order.objects.create(customer=customer, total_amount=Decimal('20.00'))
+            order.products.set(products[i % 2:i % 2 + products_per_order], through_defaults={'unit_price': Decimal('10.00')})
+        return products
+
+
+class DataLoaderTests(SchemaTestCase):
+    def test_order_relations_are_batched_per_page(self):
+        self.create_orders(10)
+        orders = list(Order.objects.all())
+        loaders = Loaders()
+        loaders.prime_nodes(orders)
+        with self.assertNumQueries(2):
+            for order in orders:
+                self.assertEqual(loaders.customer.load(order.customer_id).pk, order.customer_id)
+                self.assertEqual(len(loaders.order_products.load(order.pk)), 2)
+
+    def test_reverse_orders_are_batched_per_page(self):
+        products = self.create_orders(5)
+        customers = list(Customer.objects.all())
+        loaders = Loaders()
+        loaders.prime_nodes(customers + products)
+        with self.assertNumQueries(3):
+            for customer in customers:
+                orders = loaders.customer_orders.load(customer.pk)
+                self.assertEqual(len(orders), 1)
+                self.assertEqual(loaders.customer.load(orders[0].customer_id), customer)
+            counts = sorted(len(loaders.product_orders.load(product.pk)) for product in products)
+            # Orders loaded above were primed, so their products come in one batch
+            for customer in customers:
+                for order in loaders.customer_orders.load(customer.pk):
+                    loaders.order_products.load(order.pk)
+        self.assertEqual(counts, [2, 3, 5])
+
+    def test_windowed_loads_read_one_page_per_key(self):
+        products = self.create_orders(5)
+        loaders = Loaders()
+        loaders.prime_nodes(products)
+        with self.assertNumQueries(2) as context:
+            pages = [loaders.product_orders.load(product.pk, (1, False)) for product in products]
+            # Keys batched together are batched again for another window
+            counts = [len(loaders.product_orders.load(product.pk)) for product in products]
+        self.assertIn('ROW_NUMBER() OVER (PARTITION BY', context.captured_queries[0]['sql'])
+        self.assertEqual([len(page) for page in pages], [1, 1, 1])
+        self.assertEqual([page.total for page in pages], counts)
+
+    def test_filtered_nested_connection_still_filters(self):
+        self.create_orders(3)
+        query = """
+        { allOrders { edges { node { products(name: "Product 1") { edges { node { name } } } } } } }
+        """
+        data = self.execute(query)
+        for edge in data['allOrders']['edges']:
+            names = [e['node']['name'] for e in edge['node']['products']['edges']]
+            self.assertEqual(names, ['Product 1'])
+
+
+class QueryOptimizerTests(SchemaTestCase):
+    def test_deep_query_uses_fixed_number_of_queries(self):
+        self.create_orders(10)
+        query = """
+        { allCustomers { edges { node {
+            name
+            orders { edges { node { totalAmount products { edges { node { name } } } } } }
+        } } } }
+        """
+        # count + page, one prefetch for orders, one for their products
+        with self.assertNumQueries(4):
+            data = self.execute(query)
+        self.assertEqual(len(data['allCustomers']['edges']), 10)
+
+    def test_select_related_and_column_projection(self):
+        self.create_orders(3)
+        query = "{ allOrders { edges { node { totalAmount customer { email } } } } }"
+        with self.assertNumQueries(2) as context:
+            self.execute(query)
+        page_sql = context.captured_queries[1]['sql']
+        self.assertIn('JOIN "crm_customer"', page_sql)
+        self.assertNotIn('"crm_customer"."name"', page_sql)
+        self.assertNotIn('"crm_order"."order_date"', page_sql.split('FROM')[0])
+
+    def test_nested_filter_arguments_become_filtered_prefetch(self):
+        self.create_orders(3)
+        query = """
+        query($name: String) { allOrders { edges { node {
+            products(name: $name) { edges { node { name } } }
+        } } } }
+        """
+        with self.assertNumQueries(3):
+            data = self.execute(query, {'name': 'Product 1'})
+        for edge in data['allOrders']['edges']:
+            names = [e['node']['name'] for e in edge['node']['products']['edges']]
+            self.assertEqual(names, ['Product 1'])
+
+    def test_single_object_query(self):
+        self.create_orders(1)
+        customer = Customer.objects.get()
+        query = "query($id: ID!) { customer(id: $id) { email orders { edges { node { id } } } } }"
+        with self.assertNumQueries(2):
+            data = self.execute(query, {'id': customer.pk})
+        self.assertEqual(len(data['customer']['orders']['edges']), 1)
+
+
+class NestedPaginationTests(SchemaTestCase):
+    query = """
+    query($id: ID!, $first: Int, $last: Int, $after: String, $before: String, $offset: Int) {
+      customer(id: $id) {
+        orders(first: $first, last: $last, after: $after, before: $before, offset: $offset) {
+          totalCount pageInfo { hasNextPage hasPreviousPage } edges { node { id } }
+        }
+      }
+    }
+    """
+
+    def setUp(self):
+        self.customer = Customer.objects.create(name="Heavy", email="heavy@example.com")
+        now = timezone.now()
+        for i in range(30):
+            order = Order.objects.create(customer=self.customer, total_amount=Decimal('10.00'))
+            Order.objects.filter(pk=order.pk).update(order_date=now - timedelta(minutes=i))
+        self.order_ids = list(self.customer.orders.values_list('pk', flat=True))
+
+    def page(self, **args):
+        data = self.execute(self.query, dict(args, id=self.customer.pk))
+        return data['customer']['orders']
+
+    def test_first_page_reads_a_window_per_parent(self):
+        with self.assertNumQueries(2) as context:
+            orders = self.page(first=2)
+        prefetch_sql = context.captured_queries[1]['sql']
+        self.assertIn('ROW_NUMBER() OVER (PARTITION BY "crm_order"."customer_id"', prefetch_sql)
+        self.assertIn('"_window_row" <= 2', prefetch_sql)
+        self.assertEqual([node_pk(edge) for edge in orders['edges']], self.order_ids[:2])
+        self.assertEqual(orders['totalCount'], 30)
+        self.assertTrue(orders['pageInfo']['hasNextPage'])
+
+    def test_pages_match_the_whole_relation(self):
+        pages = [
+            ({'first': 3}, slice(0, 3)),
+            ({'last': 3}, slice(27, 30)),
+            ({'first': 2, 'after': offset_to_cursor(4)}, slice(5, 7)),
+            ({'offset': 5, 'first': 2}, slice(5, 7)),
+            ({'last': 2, 'before': offset_to_cursor(10)}, slice(8, 10)),
+            ({}, slice(0, 30)),
+        ]
+        for args, rows in pages:
+            with self.subTest(**args):
+                # Cursor pages come from the loaders, windowed the same way
+                with self.assertNumQueries(2) as context:
+                    orders = self.page(**args)
+                self.assertIn('ROW_NUMBER()', context.captured_queries[1]['sql'])
+                self.assertEqual([node_pk(edge) for edge in orders['edges']], self.order_ids[rows])
+                self.assertEqual(orders['totalCount'], 30)
+                self.assertEqual(orders['pageInfo']['hasNextPage'], 'first' in args and rows.stop < 30)
+                self.assertEqual(orders['pageInfo']['hasPreviousPage'], 'last' in args and rows.start > 0)
+
+    def test_deferred_parents_are_not_reused_for_nested_customers(self):
+        self.create_orders(5)
+        query = """
+        { allCustomers(first: 5) { edges { node { name orders(offset: 0) { edges { node {
+            customer { email phone createdAt }
+        } } } } } } }
+        """
+        # Count, page, its orders, then the customers those orders point at as one batch
+        with self.assertNumQueries(4):
+            data = self.execute(query)
+        node = data['allCustomers']['edges'][0]['node']
+        self.assertEqual(node['orders']['edges'][0]['node']['customer']['email'], Customer.objects.get(name=node['name']).email)
+
+
+class KeysetPaginationTests(SchemaTestCase):
+    query = """
+    query($after: String, $before: String, $first: Int, $last: Int) {
+      allOrders(keyset: true, first: $first, last: $last, after: $after, before: $before) {
+        edges { cursor node { id totalAmount } }
+        pageInfo { hasNextPage hasPreviousPage startCursor endCursor }
+      }
+    }
+    """
+
+    def test_pages_walk_every_row_without_counting(self):
+        self.create_orders(7)
+        expected = [order.pk for order in Order.objects.order_by('-order_date', '-pk')]
+        seen = []
+        after = None
+        while True:
+            with self.assertNumQueries(1):
+                data = self.execute(self.query, {'first': 3, 'after': after})['allOrders']
+            seen.extend(node_pk(edge) for edge in data['edges'])
+            if not data['pageInfo']['hasNextPage']:
+                break
+            after = data['pageInfo']['endCursor']
+        self.assertEqual(seen, expected)
+
+    def test_backward_pagination_with_tied_sort_keys(self):
+        self.create_orders(5)
+        Order.objects.update(order_date=Order.objects.first().order_date)
+        first_page = self.execute(self.query, {'first': 2})['allOrders']
+        ids = [node_pk(e) for e in first_page['edges']]
+        self.assertEqual(ids, sorted(Order.objects.values_list('pk', flat=True), reverse=True)[:2])
+        previous = self.execute(self.query, {
+            'last': 5, 'before': first_page['edges'][1]['cursor'],
+        })['allOrders']
+        self.assertEqual([e['cursor'] for e in previous['edges']], [first_page['edges'][0]['cursor']])
+        self.assertFalse(previous['pageInfo']['hasPreviousPage'])
+
+    def test_total_count_only_when_requested(self):
+        self.create_orders(4)
+        query = "{ allOrders(keyset: true, first: 2) { totalCount edges { node { id } } } }"
+        with self.assertNumQueries(2):
+            data = self.execute(query)
+        self.assertEqual(data['allOrders']['totalCount'], 4)
+
+    def test_invalid_cursor_is_rejected(self):
+        result = schema.execute(
+            '{ allOrders(keyset: true, after: "bm9wZQ==") { edges { node { id } } } }',
+            context_value=RequestFactory().post('/graphql'),
+        )
+        self.assertIn('Invalid keyset cursor', str(result.errors[0]))
+
+
+class BulkCreateCustomersTests(SchemaTestCase):
+    mutation = """
+    mutation($input: [CustomerInput]!, $batchSize: Int) {
+      bulkCreateCustomers(input: $input, batchSize: $batchSize) {
+        customers { email }
+        errors
+        success
+      }
+    }
+    """
+
+    def test_rows_are_validated_in_memory_and_inserted_in_chunks(self):
+        Customer.objects.create(name="Existing", email="taken@example.com")
+        rows = [{'name': f"New {i}", 'email': f"new{i}@example.com"} for i in range(5)]
+        rows += [
+            {'name': "Taken", 'email': "taken@example.com"},
+            {'name': "Twice", 'email': "new0@example.com"},
+            {'name': "Bad phone", 'email': "phone@example.com", 'phone': "abc"},
+        ]
+        # existence check + one INSERT per chunk of 2 (savepoints wrap each chunk)
+        with self.assertNumQueries(1 + 3 * 3):
+            data = self.execute(self.mutation, {'input': rows, 'batchSize': 2})['bulkCreateCustomers']
+        self.assertTrue(data['success'])
+        self.assertEqual(len(data['customers']), 5)
+        self.assertEqual(data['errors'], [
+            "Row 6: Email 'taken@example.com' already exists",
+            "Row 7: Email 'new0@example.com' already exists",
+            "Row 8: Phone number must be in format: '+1234567890' or '123-456-7890'",
+        ])
+        self.assertEqual(Customer.objects.count(), 6)
+
+    def test_invalid_batch_size(self):
+        data = self.execute(self.mutation, {
+            'input': [{'name': "A", 'email': "a@example.com"}], 'batchSize': 0,
+        })['bulkCreateCustomers']
+        self.assertFalse(data['success'])
+        self.assertEqual(Customer.objects.count(), 0)
+
+
+class CreateOrderTests(SchemaTestCase):
+    mutation = """
+    mutation($customerId: ID!, $productIds: [ID]!) {
+      createOrder(input: {customerId: $customerId, productIds: $productIds}) {
+        order { totalAmount }
+        message
+        success
+      }
+    }
+    """
+
+    def setUp(self):
+        self.customer = Customer.objects.create(name="Alice", email="alice@example.com")
+        self.laptop = Product.objects.create(name="Laptop", price=Decimal('999.99'), stock=2)
+        self.mouse = Product.objects.create(name="Mouse", price=Decimal('29.99'), stock=5)
+
+    def place(self, *product_ids):
+        return self.execute(self.mutation, {
+            'customerId': self.customer.pk, 'productIds': list(product_ids),
+        })['createOrder']
+
+    def test_duplicate_ids_are_quantities_and_stock_is_reserved(self):
+        # customer, locked products, stock UPDATE, order INSERT, line INSERT,
+        # two rollup statements, customer stats UPDATE and re-read (+ savepoint pair)
+        with self.assertNumQueries(11):
+            data = self.place(self.laptop.pk, self.mouse.pk, self.mouse.pk)
+        self.assertTrue(data['success'], data['message'])
+        self.assertEqual(Decimal(data['order']['totalAmount']), Decimal('1059.97'))
+        self.laptop.refresh_from_db()
+        self.mouse.refresh_from_db()
+        self.assertEqual((self.laptop.stock, self.mouse.stock), (1, 3))
+
+    def test_insufficient_stock_rolls_back(self):
+        data = self.place(self.mouse.pk, self.laptop.pk, self.laptop.pk, self.laptop.pk)
+        self.assertFalse(data['success'])
+        self.assertEqual(data['message'], "Insufficient stock for product: Laptop")
+        self.mouse.refresh_from_db()
+        self.assertEqual(self.mouse.stock, 5)
+        self.assertFalse(Order.objects.exists())
+
+    def test_invalid_product_id(self):
+        data = self.place(self.mouse.pk, 999999)
+        self.assertEqual(data['message'], "Invalid product ID: 999999")
+        self.assertFalse(Order.objects.exists())
+
+    def test_items_store_quantity_and_price_snapshot(self):
+        data = self.execute('''
+        mutation($input: OrderInput!) {
+          createOrder(input: $input) {
+            success message
+            order { totalAmount items { product { name } quantity unitPrice } }
+          }
+        }
+        ''', {'input': {
+            'customerId': self.customer.pk,
+            'productIds': [self.laptop.pk],
+            'items': [{'productId': self.mouse.pk, 'quantity': 2}, {'productId': self.laptop.pk}],
+        }})['createOrder']
+        self.assertTrue(data['success'], data['message'])
+        self.assertEqual(Decimal(data['order']['totalAmount']), Decimal('2059.96'))
+        self.assertEqual(data['order']['items'], [
+            {'product': {'name': "Laptop"}, 'quantity': 2, 'unitPrice': '999.99'},
+            {'product': {'name': "Mouse"}, 'quantity': 2, 'unitPrice': '29.99'},
+        ])
+        self.mouse.price = Decimal('1.00')
+        self.mouse.save()
+        self.assertEqual(OrderItem.objects.get(product=self.mouse).unit_price, Decimal('29.99'))
+
+    def test_quantity_must_be_positive(self):
+        data = self.execute('''
+        mutation($input: OrderInput!) { createOrder(input: $input) { success message } }
+        ''', {'input': {'customerId': self.customer.pk, 'items': [{'productId': self.mouse.pk, 'quantity': 0}]}})
+        self.assertFalse(data['createOrder']['success'])
+        self.assertEqual(data['createOrder']['message'], f"Quantity must be positive for product ID: {self.mouse.pk}")
+        self.assertFalse(Order.objects.exists())
+
+
+class BulkCreateOrdersTests(SchemaTestCase):
+    mutation = """
+    mutation($input: [OrderInput]!, $batchSize: Int) {
+      bulkCreateOrders(input: $input, batchSize: $batchSize) {
+        orders { totalAmount customer { name orderCount } items { product { name } quantity } }
+        errors
+        success
+      }
+    }
+    """
+
+    def setUp(self):
+        self.alice = Customer.objects.create(name="Alice", email="alice@example.com")
+        self.bob = Customer.objects.create(name="Bob", email="bob@example.com")
+        self.laptop = Product.objects.create(name="Laptop", price=Decimal('999.99'), stock=2)
+        self.mouse = Product.objects.create(name="Mouse", price=Decimal('29.99'), stock=100)
+
+    def bulk(self, rows, **variables):
+        return self.execute(self.mutation, {'input': rows, **variables})['bulkCreateOrders']
+
+    def test_rows_are_placed_or_reported(self):
+        data = self.bulk([
+            {'customerId': self.alice.pk, 'productIds': [self.laptop.pk, self.mouse.pk]},
+            {'customerId': 999999, 'productIds': [self.mouse.pk]},
+            {'customerId': self.bob.pk, 'items': [{'productId': self.laptop.pk, 'quantity': 2}]},
+            {'customerId': self.bob.pk, 'items': [{'productId': self.mouse.pk, 'quantity': 3}]},
+            {'customerId': self.bob.pk, 'productIds': [999999]},
+            {'customerId': self.alice.pk, 'productIds': []},
+            {'customerId': self.alice.pk, 'items': [{'productId': self.laptop.pk}]},
+        ])
+        self.assertTrue(data['success'])
+        self.assertEqual(data['errors'], [
+            "Row 2: Customer with ID 999999 does not exist",
+            "Row 3: Insufficient stock for product: Laptop",
+            "Row 5: Invalid product ID: 999999",
+            "Row 6: At least one product must be selected",
+        ])
+        self.assertEqual([order['totalAmount'] for order in data['orders']], ['1029.98', '89.97', '999.99'])
+        self.assertEqual(data['orders'][1]['items'], [{'product': {'name': "Mouse"}, 'quantity': 3}])
+        self.assertEqual(data['orders'][0]['customer'], {'name': "Alice", 'orderCount': 2})
+        self.laptop.refresh_from_db()
+        self.mouse.refresh_from_db()
+        self.assertEqual((self.laptop.stock, self.mouse.stock), (0, 96))
+        self.alice.refresh_from_db()
+        self.assertEqual((self.alice.order_count, self.alice.lifetime_value), (2, Decimal('2029.97')))
+        rollup = DailyProductSales.objects.get(product=self.mouse)
+        self.assertEqual((rollup.order_count, rollup.units, rollup.revenue), (2, 4, Decimal('119.96')))
+
+    def test_query_count_does_not_grow_with_rows(self):
+        query = "mutation($input: [OrderInput]!) { bulkCreateOrders(input: $input) { success } }"
+        for count in (2, 40):
+            rows = [
+                {'customerId': (self.alice, self.bob)[i % 2].pk, 'productIds': [self.mouse.pk]}
+                for i in range(count)
+            ]
+            # customers, locked products, stock UPDATE, order INSERT, line INSERT, rollup
+            # insert/lock/upsert, customer stats UPDATE and re-read (+ savepoint pair)
+            with self.assertNumQueries(12):
+                self.assertTrue(self.execute(query, {'input': rows})['bulkCreateOrders']['success'])
+        self.assertEqual(Order.objects.count(), 42)
+        self.assertEqual(Customer.objects.get(pk=self.bob.pk).order_count, 21)
+
+    def test_batches_commit_separately(self):
+        Product.objects.filter(pk=self.mouse.pk).update(stock=3)
+        rows = [{'customerId': self.alice.pk, 'items': [{'productId': self.mouse.pk, 'quantity': 2}]}] * 3
+        data = self.bulk(rows, batchSize=1)
+        self.assertEqual(len(data['orders']), 1)
+        self.assertEqual(data['errors'], [
+            "Row 2: Insufficient stock for product: Mouse",
+            "Row 3: Insufficient stock for product: Mouse",
+        ])
+        self.assertEqual(self.bulk(rows, batchSize=0)['errors'], ["Batch size must be positive"])
+
+
+class CustomerOrderStatsTests(SchemaTestCase):
+    query = """
+    query($orderBy: String, $after: String, $gte: Decimal) {
+      allCustomers(orderBy: $orderBy, lifetimeValueGte: $gte, keyset: true, first: 2, after: $after) {
+        edges { cursor node { name orderCount lifetimeValue } }
+      }
+    }
+    """
+
+    def setUp(self):
+        self.product = Product.objects.create(name="Cable", price=Decimal('12.50'), stock=100)
+        self.customers = [
+            Customer.objects.create(name=name, email=f"{name.lower()}@example.com")
+            for name in ("Alice", "Bob", "Carol", "Dave")
+        ]
+
+    def test_orders_update_stats(self):
+        alice = self.customers[0]
+        place_order(alice, [self.product.pk, self.product.pk])
+        order = place_order(alice, [self.product.pk])
+        self.assertEqual((alice.order_count, alice.lifetime_value), (2, Decimal('37.50')))
+        self.assertEqual(alice.last_order_at, order.order_date)
+        self.assertEqual(Customer.objects.get(pk=self.customers[1].pk).order_count, 0)
+
+    def test_backfill_recomputes_from_orders(self):
+        bob = self.customers[1]
+        Order.objects.create(customer=bob, total_amount=Decimal('5.25'))
+        latest = Order.objects.create(customer=bob, total_amount=Decimal('4.75'))
+        Customer.objects.filter(pk=self.customers[0].pk).update(order_count=9, lifetime_value=Decimal('99'))
+        out = StringIO()
+        call_command('backfill_customer_stats', batch_size=3, stdout=out)
+        self.assertIn("Backfilled order stats for 4 customers", out.getvalue())
+        stats = {
+            customer.name: (customer.order_count, customer.lifetime_value, customer.last_order_at)
+            for customer in Customer.objects.all()
+        }
+        self.assertEqual(stats["Alice"], (0, Decimal('0.00'), None))
+        self.assertEqual(stats["Bob"], (2, Decimal('10.00'), latest.order_date))
+
+    def test_filter_and_keyset_order_by_lifetime_value(self):
+        for count, customer in enumerate(self.customers):
+            for _ in range(count):
+                place_order(customer, [self.product.pk])
+        page = self.execute(self.query, {'orderBy': '-lifetimeValue', 'gte': '10'})['allCustomers']['edges']
+        self.assertEqual([edge['node']['name'] for edge in page], ["Dave", "Carol"])
+        self.assertEqual(page[0]['node']['orderCount'], 3)
+        page = self.execute(
+            self.query, {'orderBy': '-lifetimeValue', 'gte': '10', 'after': page[-1]['cursor']}
+        )['allCustomers']['edges']
+        self.assertEqual([edge['node']['name'] for edge in page], ["Bob"])
+
+
+class UpdateLowStockProductsTests(SchemaTestCase):
+    mutation = """
+    mutation($threshold: Int, $increment: Int) {
+      updateLowStockProducts(threshold: $threshold, increment: $increment) {
+        products { name stock }
+        message
+        success
+      }
+    }
+    """
+
+    def test_single_update_returns_affected_products(self):
+        for name, stock in [("Empty", 0), ("Low", 4), ("Plenty", 50)]:
+            Product.objects.create(name=name, price=Decimal('1.00'), stock=stock)
+        with self.assertNumQueries(3):
+            data = self.execute(self.mutation, {'threshold': 5, 'increment': 20})['updateLowStockProducts']
+        self.assertTrue(data['success'])
+        self.assertEqual(sorted((p['name'], p['stock']) for p in data['products']), [("Empty", 20), ("Low", 24)])
+        self.assertEqual(Product.objects.get(name="Plenty").stock, 50)
+
+    def test_backends_without_update_returning_lock_then_update(self):
+        for name, stock in [("Empty", 0), ("Plenty", 50)]:
+            Product.objects.create(name=name, price=Decimal('1.00'), stock=stock)
+        with mock.patch.object(connection, 'vendor', 'mysql'), self.assertNumQueries(4) as context:
+            data = self.execute(self.mutation, {'threshold': 5, 'increment': 20})['updateLowStockProducts']
+        self.assertNotIn('RETURNING', ' '.join(query['sql'] for query in context.captured_queries))
+        self.assertEqual(data['products'], [{'name': "Empty", 'stock': 20}])
+        self.assertEqual(Product.objects.get(name="Empty").stock, 20)
+
+    def test_defaults_match_previous_behaviour(self):
+        Product.objects.create(name="Low", price=Decimal('1.00'), stock=9)
+        data = self.execute(self.mutation)['updateLowStockProducts']
+        self.assertEqual(data['products'], [{'name': "Low", 'stock': 19}])
+        self.assertEqual(data['message'], "Updated 1 low stock products")
+
+
+class CRMStatsTests(SchemaTestCase):
+    def test_stats_use_aggregates(self):
+        self.create_orders(3)
+        Order.objects.filter(pk=Order.objects.first().pk).update(total_amount=Decimal('0.10'))
+        with self.assertNumQueries(3):
+            data = self.execute("{ crmStats { customerCount orderCount unitsSold revenue } }")['crmStats']
+        self.assertEqual(data['customerCount'], 3)
+        self.assertEqual(data['orderCount'], 3)
+        self.assertEqual(data['unitsSold'], 6)
+        self.assertEqual(Decimal(data['revenue']), Decimal('40.10'))
+
+    def test_date_range(self):
+        self.create_orders(2)
+        data = self.execute(
+            'query($from: DateTime) { crmStats(from: $from) { customerCount orderCount revenue } }',
+            {'from': '2100-01-01T00:00:00+00:00'},
+        )['crmStats']
+        self.assertEqual(data, {'customerCount': 0, 'orderCount': 0, 'revenue': '0.00'})
+
+    def test_weekly_report_task(self):
+        self.create_orders(2)
+        self.assertTrue(generate_crm_report().endswith("2 customers, 2 orders, 40.00 revenue"))
+
+
+class SalesRollupTests(SchemaTestCase):
+    query = """
+    query($from: Date!, $to: Date!, $granularity: SalesGranularity, $productId: ID) {
+      salesTimeSeries(from: $from, to: $to, granularity: $granularity, productId: $productId) {
+        period productId orderCount units revenue
+      }
+    }
+    """
+
+    def setUp(self):
+        self.customer = Customer.objects.create(name="Alice", email="alice@example.com")
+        self.laptop = Product.objects.create(name="Laptop", price=Decimal('100.00'), stock=10)
+        self.mouse = Product.objects.create(name="Mouse", price=Decimal('5.00'), stock=10)
+
+    def test_create_order_updates_rollup_incrementally(self):
+        place_order(self.customer, [self.laptop.pk, self.mouse.pk, self.mouse.pk])
+        place_order(self.customer, [self.mouse.pk])
+        today = timezone.localdate().isoformat()
+        with self.assertNumQueries(1):
+            points = self.execute(self.query, {'from': today, 'to': today})['salesTimeSeries']
+        self.assertEqual(points, [
+            {'period': today, 'productId': str(self.laptop.pk), 'orderCount': 1, 'units': 1, 'revenue': '100.00'},
+            {'period': today, 'productId': str(self.mouse.pk), 'orderCount': 2, 'units': 3, 'revenue': '15.00'},
+        ])
+
+    def test_rebuild_command_and_monthly_granularity(self):
+        place_order(self.customer, [self.laptop.pk])
+        place_order(self.customer, [self.laptop.pk])
+        DailyProductSales.objects.update(order_count=99)
+        today = timezone.localdate()
+        call_command('rebuild_sales_rollup', '--from', today.isoformat(), '--to', today.isoformat(), stdout=StringIO())
+        points = self.execute(self.query, {
+            'from': today.replace(day=1).isoformat(), 'to': today.isoformat(),
+            'granularity': 'MONTH', 'productId': self.laptop.pk,
+        })['salesTimeSeries']
+        self.assertEqual(points, [{
+            'period': today.replace(day=1).isoformat(), 'productId': str(self.laptop.pk),
+            'orderCount': 2, 'units': 2, 'revenue': '200.00',
+        }])
+
+    def test_rebuild_sums_line_quantities_and_prices(self):
+        place_order(self.customer, items=[(self.mouse.pk, 3)])
+        Product.objects.filter(pk=self.mouse.pk).update(price=Decimal('7.00'))
+        place_order(self.customer, [self.mouse.pk])
+        today = timezone.localdate()
+        DailyProductSales.objects.all().delete()
+        rebuild_daily_sales(today, today)
+        row = DailyProductSales.objects.get(product=self.mouse)
+        self.assertEqual((row.order_count, row.units, row.revenue), (2, 4, Decimal('22.00')))
+
+    def test_rebuild_inserts_in_batches(self):
+        place_order(self.customer, [self.laptop.pk, self.mouse.pk])
+        today = timezone.localdate()
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(rebuild_daily_sales(today, today, batch_size=1), 2)
+        inserts = [query for query in context.captured_queries if query['sql'].startswith('INSERT')]
+        self.assertEqual(len(inserts), 2)
+        self.assertEqual(DailyProductSales.objects.count(), 2)
+
+
+class GraphQLEndpointCacheTests(TestCase):
+    def setUp(self):
+        document_cache.clear()
+        cache.clear()
+
+    def post(self, payload):
+        return self.client.post('/graphql', json.dumps(payload), content_type='application/json')
+
+    def test_repeated_queries_reuse_parsed_document(self):
+        for _ in range(3):
+            response = self.post({'query': '{ hello }'})
+            self.assertEqual(response.json()['data'], {'hello': "Hello, GraphQL!"})
+        self.assertEqual((document_cache.misses, document_cache.hits), (1, 2))
+
+    def test_persisted_query_round_trip(self):
+        query = '{ hello }'
+        extensions = {'persistedQuery': {'version': 1, 'sha256Hash': query_hash(query)}}
+        response = self.post({'extensions': extensions})
+        self.assertEqual(response.json()['errors'][0]['message'], "PersistedQueryNotFound")
+
+        self.post({'query': query, 'extensions': extensions})
+        response = self.client.get('/graphql', {'extensions': json.dumps(extensions)},
+                                   HTTP_ACCEPT='application/json')
+        self.assertEqual(response.json()['data'], {'hello': "Hello, GraphQL!"})
+
+    def test_persisted_query_hash_must_match(self):
+        extensions = {'persistedQuery': {'version': 1, 'sha256Hash': 'abc'}}
+        response = self.post({'query': '{ hello }', 'extensions': extensions})
+        self.assertEqual(response.json()['errors'][0]['message'], "provided sha does not match query")
+
+
+class QueryCostTests(TestCase):
+    deep_query = """
+    { allCustomers { edges { node { orders { edges { node {
+        products { edges { node { orders { edges { node { customer { name } } } } } } }
+    } } } } } } }
+    """
+
+    def post(self, query, variables=None):
+        payload = {'query': query, 'variables': variables or {}}
+        return self.client.post('/graphql', json.dumps(payload), content_type='application/json')
+
+    def test_cost_is_reported_in_extensions(self):
+        query = 'query($n: Int) { allCustomers(first: $n) { edges { node { name orders { totalCount } } } } }'
+        response = self.post(query, {'n': 5})
+        self.assertEqual(response.status_code, 200)
+        # The connection, five nodes and five nested order connections
+        self.assertEqual(response.json()['extensions']['cost']['requestedQueryCost'], 11)
+        self.assertEqual(response.json()['extensions']['cost']['depth'], 4)
+
+    def test_unbounded_nesting_is_rejected_before_execution(self):
+        Customer.objects.create(name="Alice", email="alice@example.com")
+        with self.assertNumQueries(0):
+            response = self.post(self.deep_query)
+        self.assertEqual(response.status_code, 400)
+        messages = [error['message'] for error in response.json()['errors']]
+        self.assertTrue(any(message.startswith("Query cost") for message in messages), messages)
+        self.assertNotIn('data', response.json())
+
+    @override_settings(GRAPHQL_QUERY_COST={
+        **settings.GRAPHQL_QUERY_COST, 'MAX_DEPTH': 3, 'FIELD_WEIGHTS': {'Query.crmStats': 5000},
+    })
+    def test_depth_limit_and_field_weights_come_from_settings(self):
+        response = self.post('{ allOrders(first: 1) { edges { node { customer { name } } } } }')
+        self.assertEqual(response.json()['errors'][0]['message'],
+                         "Query depth 4 exceeds the maximum depth of 3.")
+        response = self.post('{ crmStats { orderCount } }')
+        self.assertEqual(response.json()['extensions']['cost']['requestedQueryCost'], 5000)
+
+
+class TracingTests(TestCase):
+    query = 'query RecentOrders { allOrders(first: 5) { edges { node { totalAmount customer { name } } } } }'
+
+    def setUp(self):
+        metrics.clear()
+        customer = Customer.objects.create(name="Alice", email="alice@example.com")
+        Order.objects.create(customer=customer, total_amount=Decimal('10.00'))
+
+    def post(self):
+        return self.client.post('/graphql', json.dumps({'query': self.query}), content_type='application/json')
+
+    def test_operation_and_field_histograms(self):
+        self.post()
+        # Count plus the page with customers joined
+        queries = metrics.get('graphql_operation_sql_queries', operation='RecentOrders')
+        self.assertEqual((queries.count, queries.sum), (1, 2))
+        field = metrics.get('graphql_field_duration_seconds', field='OrderType.customer')
+        self.assertEqual(field.count, 1)
+
+        body = self.client.get('/metrics').content.decode()
+        self.assertIn('graphql_operation_sql_queries_count{operation="RecentOrders"} 1', body)
+        self.assertIn('graphql_field_duration_seconds_bucket{field="Query.allOrders",le="+Inf"} 1', body)
+
+    def test_labels_ignore_aliases_and_cap_operation_names(self):
+        for i in range(3):
+            query = f'query Op{i} {{ a{i}: allOrders(first: 1) {{ totalCount }} }}'
+            self.client.post('/graphql', json.dumps({'query': query}), content_type='application/json')
+        self.assertEqual(metrics.series_count('graphql_field_duration_seconds'), 2)
+        self.assertEqual(metrics.get('graphql_field_duration_seconds', field='Query.allOrders').count, 3)
+        with override_settings(GRAPHQL_TRACING={'MAX_OPERATION_LABELS': 3}):
+            for name in ('Op0', 'Op3', 'Op4'):
+                query = f'query {name} {{ allOrders(first: 1) {{ totalCount }} }}'
+                self.client.post('/graphql', json.dumps({'query': query}), content_type='application/json')
+        self.assertEqual(metrics.get('graphql_operation_duration_seconds', operation='Op0').count, 2)
+        self.assertEqual(metrics.get('graphql_operation_duration_seconds', operation='other').count, 2)
+        self.assertIsNone(metrics.get('graphql_operation_duration_seconds', operation='Op3'))
+
+    @override_settings(GRAPHQL_TRACING={'ENABLED': True, 'EXTENSIONS': True})
+    def test_tracing_extension(self):
+        tracing = self.post().json()['extensions']['tracing']
+        self.assertEqual(tracing['operationName'], 'RecentOrders')
+        self.assertEqual(tracing['sql']['count'], 2)
+        paths = [resolver['path'] for resolver in tracing['execution']['resolvers']]
+        self.assertIn(['allOrders', 'edges', 0, 'node', 'customer', 'name'], paths)
+
+    def test_tracing_extension_is_off_by_default(self):
+        self.assertNotIn('tracing', self.post().json()['extensions'])
+
+
+@override_settings(GRAPHQL_RESPONSE_CACHE={
+    **settings.GRAPHQL_RESPONSE_CACHE, 'ENABLED': True,
+})
+class ResponseCacheTests(TestCase):
+    query = '{ allProducts(lowStock: true) { edges { node { name stock } } } }'
+
+    def setUp(self):
+        document_cache.clear()
+        cache.clear()
+        # Each test runs in one transaction, commit what setUp changed
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product = Product.objects.create(name="Mouse", price=Decimal('5.00'), stock=3)
+
+    def post(self, query):
+        response = self.client.post('/graphql', json.dumps({'query': query}), content_type='application/json')
+        return response.json()
+
+    def test_queries_are_cached_until_the_model_changes(self):
+        first = self.post(self.query)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.post(self.query), first)
+        self.assertEqual(response_cache_stats(), {'hits': 1, 'misses': 1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.filter(pk=self.product.pk).update(stock=4)
+            self.product.refresh_from_db()
+            self.product.save()
+        data = self.post(self.query)
+        self.assertEqual(data['data']['allProducts']['edges'][0]['node']['stock'], 4)
+
+    def test_evicted_tags_never_bring_stale_responses_back(self):
+        self.post(self.query)
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.filter(pk=self.product.pk).update(stock=4)
+            self.product.refresh_from_db()
+            self.product.save()
+        self.post(self.query)
+        for _ in range(2):
+            cache.delete('graphql:tag:crm.Product')
+            with self.captureOnCommitCallbacks(execute=True):
+                self.product.stock += 1
+                self.product.save()
+            data = self.post(self.query)
+            self.assertEqual(data['data']['allProducts']['edges'][0]['node']['stock'], self.product.stock)
+
+    def test_other_models_do_not_invalidate(self):
+        self.post(self.query)
+        with self.captureOnCommitCallbacks(execute=True):
+            Customer.objects.create(name="Alice", email="alice@example.com")
+        self.post(self.query)
+        self.assertEqual(response_cache_stats(), {'hits': 1, 'misses': 1})
+
+    def test_mutations_are_not_cached_and_invalidate(self):
+        mutation = 'mutation { updateLowStockProducts { success } }'
+        self.post(self.query)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post(mutation)
+        data = self.post(self.query)
+        self.assertEqual(data['data']['allProducts']['edges'], [])
+        self.assertEqual(response_cache_stats(), {'hits': 0, 'misses': 2})
+
+    def test_changed_tags_are_bumped_once_per_transaction(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            for i in range(3):
+                Product.objects.create(name=f"Product {i}", price=Decimal('1.00'), stock=1)
+                Customer.objects.create(name=f"Customer {i}", email=f"c{i}@example.com")
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(callbacks[0], {'crm.Product', 'crm.Customer'})
+
+    def test_rolled_back_changes_leave_later_ones_tracked(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            with self.assertRaises(ValueError), transaction.atomic():
+                Customer.objects.create(name="Alice", email="alice@example.com")
+                raise ValueError
+            Product.objects.create(name="Keyboard", price=Decimal('1.00'), stock=1)
+        self.assertEqual(callbacks, [{'crm.Product'}])
+
+    def test_deletes_stay_fast_and_invalidate_what_they_cascade_to(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            customer = Customer.objects.create(name="Alice", email="alice@example.com")
+            place_order(customer, [self.product.pk])
+        with self.captureOnCommitCallbacks() as callbacks, CaptureQueriesContext(connection) as context:
+            Customer.objects.all().delete()
+        # Order lines have no delete receivers, so they go in one DELETE without being read
+        statements = [query['sql'] for query in context.captured_queries]
+        self.assertFalse([sql for sql in statements if sql.startswith('SELECT') and 'FROM "crm_order_products"' in sql])
+        self.assertTrue([sql for sql in statements if sql.startswith('DELETE FROM "crm_order_products"')])
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(callbacks[0], {'crm.Customer', 'crm.Order', 'crm.OrderItem', 'crm.Product'})
+
+    def test_rollup_rebuild_drops_cached_sales_series(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            place_order(Customer.objects.create(name="Alice", email="alice@example.com"), [self.product.pk])
+        DailyProductSales.objects.update(order_count=99)
+        today = timezone.localdate()
+        query = '{ salesTimeSeries(from: "%s", to: "%s") { orderCount } }' % (today, today)
+        self.assertEqual(self.post(query)['data']['salesTimeSeries'], [{'orderCount': 99}])
+        with self.captureOnCommitCallbacks(execute=True):
+            rebuild_daily_sales(today, today)
+        self.assertEqual(self.post(query)['data']['salesTimeSeries'], [{'orderCount': 1}])
+
+
+class SearchFilterTests(SchemaTestCase):
+    def test_customer_search_uses_index_and_ranks_results(self):
+        Customer.objects.create(name="Alice Johnson", email="alice@example.com", phone="+1234567890")
+        Customer.objects.create(name="Bob Alison", email="bob@example.com")
+        Customer.objects.create(name="Carol", email="carol@alice.org")
+        Customer.objects.create(name="Dave", email="dave@example.com")
+        data = self.execute('{ allCustomers(search: "alice") { edges { node { name } } } }')
+        names = [edge['node']['name'] for edge in data['allCustomers']['edges']]
+        self.assertEqual(names[0], "Alice Johnson")
+        self.assertEqual(sorted(names), ["Alice Johnson", "Carol"])
+
+    def test_index_follows_updates_and_deletes(self):
+        product = Product.objects.create(name="Wireless Mouse", price=Decimal('5.00'))
+        query = 'query($q: String) { allProducts(search: $q) { edges { node { name } } } }'
+        self.assertEqual(len(self.execute(query, {'q': "wire"})['allProducts']['edges']), 1)
+        product.name = "Keyboard"
+        product.save()
+        self.assertEqual(self.execute(query, {'q': "wire"})['allProducts']['edges'], [])
+        self.assertEqual(len(self.execute(query, {'q': "key"})['allProducts']['edges']), 1)
+        product.delete()
+        self.assertEqual(self.execute(query, {'q': "key"})['allProducts']['edges'], [])
+
+    @skipUnless(connection.vendor == 'sqlite', "Query plans are captured with SQLite's EXPLAIN QUERY PLAN")
+    def test_index_is_matched_once(self):
+        plan = search_queryset(Customer.objects.all(), "alice").explain()
+        self.assertIn('SCAN crm_customer_fts VIRTUAL TABLE', plan)
+        self.assertNotIn('CORRELATED', plan)
+
+    def test_search_syntax_is_escaped(self):
+        Customer.objects.create(name="Alice", email="alice@example.com")
+        data = self.execute('{ allCustomers(search: "alice\\" OR NEAR(") { edges { node { name } } } }')
+        self.assertEqual(data['allCustomers']['edges'], [])
+
+
+@skipUnless(connection.vendor == 'sqlite', "Query plans are captured with SQLite's EXPLAIN QUERY PLAN")
+class FilterIndexPlanTests(TestCase):
+    """Each filter/ordering combination must keep using its index"""
+
+    cases = [
+        (CustomerFilter, {'created_at_gte': '2025-01-01'}, 'crm_customer_created_id_idx'),
+        (ProductFilter, {'low_stock': True}, 'crm_product_low_stock_idx'),
+        (ProductFilter, {'price_gte': '10', 'price_lte': '20'}, 'crm_product_price_idx'),
+        (ProductFilter, {'stock_gte': 5, 'stock_lte': 8}, 'crm_product_stock_idx'),
+        (OrderFilter, {'customer_id': 1, 'order_date_gte': '2025-01-01'}, 'crm_order_customer_date_idx'),
+        (OrderFilter, {'total_amount_gte': 5, 'total_amount_lte': 9}, 'crm_order_total_idx'),
+        (OrderFilter, {}, 'crm_order_date_id_idx'),
+        (CustomerFilter, {}, 'crm_customer_created_id_idx'),
+        (CustomerFilter, {'lifetime_value_gte': 100, 'order_by': '-lifetime_value'}, 'crm_customer_value_id_idx'),
+        (CustomerFilter, {'order_count_gte': 3, 'order_by': '-order_count'}, 'crm_customer_orders_id_idx'),
+        (CustomerFilter, {'last_order_at_lte': '2025-01-01', 'order_by': 'last_order_at'}, 'crm_customer_last_order_idx'),
+    ]
+
+    def test_filters_use_indexes(self):
+        for filterset_class, data, index in self.cases:
+            with self.subTest(filterset=filterset_class.__name__, data=data):
+                filterset = filterset_class(data=data, queryset=filterset_class._meta.model.objects.all())
+                self.assertTrue(filterset.is_valid(), filterset.errors)
+                plan = filterset.qs.explain()
+                self.assertIn(f'USING INDEX {index}', plan)
+                self.assertNotRegex(plan, r'SCAN crm_\w+\s*$')
+
+
+class AsyncExecutionTests(SchemaTestCase):
+    def aexecute(self, query, variables=None):
+        request = RequestFactory().post('/graphql')
+        result = async_to_sync(schema.execute_async)(query, variables=variables, context_value=request)
+        self.assertIsNone(result.errors, result.errors)
+        return result.data
+
+    def test_asyncio_loaders_batch_concurrent_loads(self):
+        self.create_orders(4)
+        order_ids = list(Order.objects.values_list('pk', flat=True))
+
+        async def load():
+            loaders = AsyncLoaders()
+            return await asyncio.gather(*(loaders.order_products.load(pk) for pk in order_ids))
+
+        with self.assertNumQueries(1):
+            groups = async_to_sync(load)()
+        self.assertEqual([len(products) for products in groups], [2, 2, 2, 2])
+
+    def test_nested_query_runs_on_async_orm(self):
+        self.create_orders(5)
+        query = """
+        {
+          allOrders { edges { node { customer { name } products { edges { node { name } } } } } }
+          allCustomers { totalCount }
+        }
+        """
+        # Count and page per connection, customers joined and products prefetched
+        with self.assertNumQueries(5):
+            data = self.aexecute(query)
+        edges = data['allOrders']['edges']
+        self.assertEqual(len(edges), 5)
+        self.assertEqual(sorted(edge['node']['customer']['name'] for edge in edges),
+                         [f"Customer {i}" for i in range(5)])
+        self.assertTrue(all(len(edge['node']['products']['edges']) == 2 for edge in edges))
+        self.assertEqual(data['allCustomers']['totalCount'], 5)
+
+    def test_nested_pages_are_windowed(self):
+        customer = Customer.objects.create(name="Heavy", email="heavy@example.com")
+        for _ in range(5):
+            Order.objects.create(customer=customer, total_amount=Decimal('10.00'))
+        query = """
+        query($id: ID!, $after: String) {
+          customer(id: $id) {
+            first: orders(first: 2) { totalCount edges { node { id } } }
+            next: orders(first: 2, after: $after) { totalCount edges { node { id } } }
+          }
+        }
+        """
+        # The first page is prefetched, the one after the cursor comes from an asyncio loader
+        with self.assertNumQueries(3) as context:
+            data = self.aexecute(query, {'id': customer.pk, 'after': offset_to_cursor(1)})
+        for captured in context.captured_queries[1:]:
+            self.assertIn('ROW_NUMBER()', captured['sql'])
+        self.assertEqual([data['customer'][key]['totalCount'] for key in ('first', 'next')], [5, 5])
+        self.assertEqual([len(data['customer'][key]['edges']) for key in ('first', 'next')], [2, 2])
+        self.assertNotEqual(data['customer']['first']['edges'], data['customer']['next']['edges'])
+
+    def test_keyset_single_object_and_stats(self):
+        self.create_orders(3)
+        customer = Customer.objects.order_by('pk').first()
+        data = self.aexecute("""
+        query($id: ID!) {
+          allCustomers(first: 2, keyset: true) { edges { node { name } } pageInfo { hasNextPage } }
+          customer(id: $id) { email orders { edges { node { totalAmount } } } }
+          missing: customer(id: 0) { name }
+          crmStats { orderCount revenue }
+        }
+        """, {'id': customer.pk})
+        self.assertEqual(len(data['allCustomers']['edges']), 2)
+        self.assertTrue(data['allCustomers']['pageInfo']['hasNextPage'])
+        self.assertEqual(data['customer']['email'], customer.email)
+        self.assertEqual(len(data['customer']['orders']['edges']), 1)
+        self.assertIsNone(data['missing'])
+        self.assertEqual(data['crmStats'], {'orderCount': 3, 'revenue': '60.00'})
+
+    def test_mutation_runs_in_a_thread(self):
+        products = self.create_orders(1)
+        customer = Customer.objects.get()
+        data = self.aexecute("""
+        mutation($input: OrderInput!) {
+          createOrder(input: $input) { success order { customer { name } products { edges { node { name } } } } }
+        }
+        """, {'input': {'customerId': customer.pk, 'productIds': [products[0].pk]}})
+        self.assertTrue(data['createOrder']['success'])
+        self.assertEqual(data['createOrder']['order']['customer']['name'], customer.name)
+        self.assertEqual(Order.objects.count(), 2)
+
+    def test_async_endpoint(self):
+        self.create_orders(2)
+        response = self.client.post(
+            '/graphql/async',
+            json.dumps({'query': '{ allOrders(first: 1) { totalCount edges { node { customer { name } } } } }'}),
+            content_type='application/json',
+        )
+        data = response.json()['data']['allOrders']
+        self.assertEqual(data['totalCount'], 2)
+        self.assertEqual(len(data['edges']), 1)
+
+    def test_async_endpoint_reads_the_cache_off_the_event_loop(self):
+        on_loop = []
+
+        def get_cached_response(view, *args):
+            try:
+                asyncio.get_running_loop()
+                on_loop.append(True)
+            except RuntimeError:
+                on_loop.append(False)
+            return None, None
+
+        with mock.patch.object(AsyncGraphQLView, 'get_cached_response', get_cached_response):
+            response = self.client.post(
+                '/graphql/async', json.dumps({'query': '{ allProducts { totalCount } }'}),
+                content_type='application/json',
+            )
+        self.assertEqual(response.json()['data']['allProducts']['totalCount'], 0)
+        self.assertEqual(on_loop, [False])
+
+
+class AsyncTracingTests(TransactionTestCase):
+    """The async view on a real event loop, its queries run on worker threads' connections"""
+    query = 'query RecentOrders { allOrders(first: 5) { edges { node { totalAmount customer { name } } } } }'
+
+    def setUp(self):
+        metrics.clear()
+        for i in range(2):
+            customer = Customer.objects.create(name=f"Customer {i}", email=f"c{i}@example.com")
+            Order.objects.create(customer=customer, total_amount=Decimal('10.00'))
+
+    def post_concurrently(self, count):
+        async def post():
+            client = AsyncClient()
+            return await asyncio.gather(*(
+                client.post('/graphql/async', json.dumps({'query': self.query}), content_type='application/json')
+                for _ in range(count)
+            ))
+
+        with override_settings(GRAPHQL_TRACING={'ENABLED': True, 'EXTENSIONS': True}):
+            return [response.json()['extensions']['tracing']['sql']['count'] for response in asyncio.run(post())]
+
+    def test_sql_is_counted_per_request(self):
+        # Count plus the page with customers joined
+        self.assertEqual(self.post_concurrently(1), [2])
+        self.assertEqual(self.post_concurrently(4), [2] * 4)
+        queries = metrics.get('graphql_operation_sql_queries', operation='RecentOrders')
+        self.assertEqual((queries.count, queries.sum), (5, 10))
+
+
+class DatasetGeneratorTests(TestCase):
+    def generate(self, **options):
+        spec = DatasetSpec(customers=50, products=20, orders=200, chunk_size=30, **options)
+        return generate(spec, stdout=StringIO())
+
+    def snapshot(self):
+        return list(Order.objects.order_by('pk').values_list('customer__email', 'total_amount', 'products__name'))
+
+    def test_generates_consistent_rows(self):
+        counts = self.generate()
+        self.assertEqual(Customer.objects.count(), 50)
+        self.assertEqual(Product.objects.count(), 20)
+        self.assertEqual(Order.objects.count(), 200)
+        self.assertEqual(counts['orders + lines'], 200 + OrderItem.objects.count())
+        order = Order.objects.prefetch_related('products').order_by('pk')[7]
+        self.assertEqual(order.total_amount, sum(product.price for product in order.products.all()))
+        self.assertTrue(DailyProductSales.objects.exists())
+        customer = Customer.objects.annotate(n=Count('orders')).order_by('-n').first()
+        self.assertEqual(customer.order_count, customer.n)
+        self.assertEqual(customer.lifetime_value, sum(order.total_amount for order in customer.orders.all()))
+
+    def test_keeps_generated_timestamps_without_touching_field_options(self):
+        spec = DatasetSpec(customers=50, products=20, orders=200, chunk_size=30)
+        bulk_update = QuerySet.bulk_update
+        auto_now_add = []
+
+        def record(queryset, objs, fields, batch_size=None):
+            auto_now_add.append(queryset.model._meta.get_field(fields[0]).auto_now_add)
+            return bulk_update(queryset, objs, fields, batch_size)
+
+        with mock.patch.object(QuerySet, 'bulk_update', record):
+            generate(spec, stdout=StringIO())
+        self.assertTrue(auto_now_add and all(auto_now_add))
+        for model, field in ((Customer, 'created_at'), (Product, 'created_at'), (Order, 'order_date')):
+            first = model.objects.aggregate(first=Min(field))['first']
+            self.assertLess(first, spec.end - timedelta(days=30))
+            self.assertLessEqual(model.objects.aggregate(last=Max(field))['last'], spec.end)
+
+    def test_same_seed_same_rows(self):
+        self.generate(seed=7)
+        first = self.snapshot()
+        Order.objects.all().delete()
+        Customer.objects.all().delete()
+        Product.objects.all().delete()
+        self.generate(seed=7)
+        self.assertEqual(self.snapshot(), first)
+
+    def test_orders_are_skewed(self):
+        self.generate(customer_skew=1.5, hot_share=0.8)
+        top = Customer.objects.annotate(n=Count('orders')).order_by('-n').first()
+        self.assertGreater(top.n, 200 / 50 * 5)
+        hot = Product.objects.annotate(n=Count('orders')).order_by('-n').first()
+        self.assertGreater(hot.n, Product.objects.annotate(n=Count('orders')).order_by('n').first().n * 5)
+
+    def test_invalid_spec(self):
+        with self.assertRaises(ValueError):
+            self.generate(avg_items=0)
+
+
+class BenchmarkSuiteTests(TestCase):
+    def test_suite_runs_every_operation(self):
+        results = run_suite({'tiny': {'customers': 20, 'products': 10, 'orders': 50}}, iterations=2, warmup=0)
+        self.assertEqual(set(results['results']['tiny']), {op.name for op in OPERATIONS})
+        stats = results['results']['tiny']['orders_customer_name']
+        self.assertLessEqual(stats['p50_ms'], stats['p99_ms'])
+        self.assertGreater(stats['sql_queries'], 0)
+        self.assertGreater(stats['peak_memory_kb'], 0)
+        # Mutations are rolled back and the dataset is cleared afterwards
+        self.assertFalse(Customer.objects.exists())
+
+    def test_regressions(self):
+        stats = {'p50_ms': 10.0, 'p95_ms': 20.0, 'sql_queries': 3, 'peak_memory_kb': 100.0}
+        baseline = {'results': {'small': {'op': stats, 'removed': stats}}}
+        same = {'results': {'small': {'op': dict(stats, p50_ms=11.0), 'new': stats}}}
+        self.assertEqual(find_regressions(same, baseline), [])
+        worse = {'results': {'small': {'op': dict(stats, p95_ms=30.0, sql_queries=4)}}}
+        self.assertEqual(find_regressions(worse, baseline), [
+            "small/op: SQL queries 3 -> 4", "small/op: p95_ms 20.0 -> 30.0",
+        ])
+        self.assertEqual(find_regressions(worse, baseline, threshold=1.0), ["small/op: SQL queries 3 -> 4"])
+
+
+class ExportTests(SchemaTestCase):
+    def stream(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_orders_csv_with_product_ids(self):
+        products = self.create_orders(3)
+        lines = self.stream('/export/orders').splitlines()
+        self.assertEqual(lines[0], 'id,customer_id,customer_name,customer_email,total_amount,order_date,product_ids')
+        self.assertEqual(len(lines), 4)
+        first = Order.objects.order_by('pk').first()
+        self.assertTrue(lines[1].startswith(f'{first.pk},{first.customer_id},Customer 0,c0@example.com,20.00,'))
+        self.assertTrue(lines[1].endswith(f',{products[0].pk} {products[1].pk}'))
+
+    def test_orders_ndjson_filtered_by_products(self):
+        products = self.create_orders(3)
+        # Every order has products[1], filtering on a name both match must not repeat orders
+        rows = [json.loads(line) for line in self.stream(
+            '/export/orders?format=ndjson&product_name=product&customer_name=customer&total_amount_gte=10'
+        ).splitlines()]
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[1]['product_ids'], [products[1].pk, products[2].pk])
+        rows = self.stream(f'/export/orders?format=ndjson&product_id={products[2].pk}').splitlines()
+        self.assertEqual(len(rows), 1)
+
+    def test_customers_export_and_errors(self):
+        self.create_orders(2)
+        lines = self.stream('/export/customers?name_icontains=customer 1').splitlines()
+        self.assertEqual(lines, ['id,name,email,phone,created_at', lines[1]])
+        self.assertIn(',Customer 1,c1@example.com,,', lines[1])
+        self.assertEqual(self.client.get('/export/customers?format=xml').status_code, 400)
+        response = self.client.get('/export/orders?total_amount_gte=abc')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('total_amount_gte', response.json()['errors'])
+        self.assertEqual(self.client.post('/export/orders').status_code, 405)
+
+
+class OrderReminderTests(SchemaTestCase):
+    def setUp(self):
+        self.products = self.create_orders(3)
+        self.customers = list(Customer.objects.order_by('pk'))
+        Order.objects.create(customer=self.customers[0], total_amount=Decimal('5.00'))
+        self.settle(Order.objects.all())
+
+    def settle(self, orders):
+        """Age orders past SETTLE_SECONDS so a run covers them"""
+        orders.update(order_date=timezone.now() - timedelta(hours=1))
+
+    def run_reminders(self, **options):
+        batches = []
+        summary = run_order_reminders(batches.append, **options)
+        return summary, batches
+
+    def test_one_reminder_per_customer_in_batches(self):
+        summary, batches = self.run_reminders(batch_size=2)
+        self.assertEqual([len(batch) for batch in batches], [2, 1])
+        first = batches[0][0]
+        self.assertEqual(first['email'], self.customers[0].email)
+        self.assertEqual(first['order_ids'], sorted(self.customers[0].orders.values_list('pk', flat=True)))
+        self.assertEqual(first['total'], '25.00')
+        self.assertEqual(summary['customers'], 3)
+
+    def test_high_water_mark(self):
+        self.run_reminders()
+        summary, batches = self.run_reminders()
+        self.assertEqual(batches, [])
+        order = Order.objects.create(customer=self.customers[2], total_amount=Decimal('7.00'))
+        self.settle(Order.objects.filter(pk=order.pk))
+        order.refresh_from_db()
+        summary, batches = self.run_reminders()
+        self.assertEqual(batches, [[{
+            'customer_id': self.customers[2].pk,
+            'email': self.customers[2].email,
+            'order_ids': [order.pk],
+            'total': '7.00',
+            'latest_order_date': order.order_date.isoformat(),
+        }]])
+        self.assertEqual(summary['up_to_id'], order.pk)
+
+    def test_orders_committed_late_with_lower_ids_are_reminded(self):
+        self.run_reminders()
+        customer = self.customers[1]
+        late = Order.objects.create(customer=customer, total_amount=Decimal('3.00'))
+        Order.objects.create(customer=customer, total_amount=Decimal('4.00'))
+        # `late` got its ID first but its transaction hasn't committed yet
+        late_id = late.pk
+        late.delete()
+        summary, batches = self.run_reminders()
+        self.assertEqual(batches, [])
+        Order.objects.create(pk=late_id, customer=customer, total_amount=Decimal('3.00'))
+        self.settle(Order.objects.filter(customer=customer, pk__gte=late_id))
+        summary, batches = self.run_reminders()
+        self.assertEqual([reminder['order_ids'] for reminder in batches[0]], [[late_id, late_id + 1]])
+
+    def test_overlapping_runs_remind_once(self):
+        overlapping = []
+
+        def dispatch(batch):
+            # A second run starting while the first is still dispatching
+            if not overlapping:
+                overlapping.append(self.run_reminders())
+
+        summary = run_order_reminders(dispatch)
+        self.assertEqual(summary['customers'], 3)
+        self.assertEqual(overlapping[0][1], [])
+        self.assertEqual(load_checkpoint(REMINDERS_CHECKPOINT), summary['up_to_id'])
+
+    def test_failed_run_is_retried_in_full(self):
+        def dispatch(batch):
+            raise RuntimeError("broker down")
+
+        with self.assertRaises(RuntimeError):
+            run_order_reminders(dispatch)
+        self.assertEqual(load_checkpoint(REMINDERS_CHECKPOINT), 0)
+        summary, batches = self.run_reminders()
+        self.assertEqual(summary['customers'], 3)
+
+    def test_lookback_window(self):
+        Order.objects.filter(customer=self.customers[1]).update(order_date=timezone.now() - timedelta(days=30))
+        since = timezone.now() - timedelta(days=7)
+        batches = list(pending_reminders(0, Order.objects.count(), since, 10))
+        self.assertEqual([r['customer_id'] for r in batches[0]], [self.customers[0].pk, self.customers[2].pk])
+
+    def test_command_sends_in_process(self):
+        with tempfile.NamedTemporaryFile('r', suffix='.log') as log_file:
+            with override_settings(CRM_ORDER_REMINDERS={'LOG_FILE': log_file.name}):
+                out = StringIO()
+                call_command('send_order_reminders', '--sync', stdout=out)
+                self.assertIn('3 customer(s) in 1 batch(es)', out.getvalue())
+                call_command('send_order_reminders', '--sync', stdout=StringIO())
+            lines = log_file.read().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertIn(f'Customer {self.customers[0].email}, 2 new order(s) totalling 25.00', lines[0])
+
+
+class InactiveCustomerCleanupTests(TestCase):
+    def setUp(self):
+        old = timezone.now() - timedelta(days=400)
+        for i in range(5):
+            Customer.objects.create(name=f"Old {i}", email=f"old{i}@example.com")
+        Customer.objects.create(name="New", email="new@example.com")
+        Customer.objects.exclude(name="New").update(created_at=old)
+        self.buyer = Customer.objects.get(name="Old 2")
+        Order.objects.create(customer=self.buyer, total_amount=Decimal('1.00'))
+
+    def test_deletes_in_batches_and_clears_checkpoint(self):
+        batches = list(clean_inactive_customers(batch_size=2))
+        self.assertEqual([batch.count for batch in batches], [2, 2])
+        self.assertEqual(set(Customer.objects.values_list('name', flat=True)), {"Old 2", "New"})
+        self.assertEqual(load_checkpoint(CLEANUP_CHECKPOINT), 0)
+
+    def test_dry_run_keeps_rows(self):
+        self.assertEqual(sum(batch.count for batch in clean_inactive_customers(dry_run=True)), 4)
+        self.assertEqual(Customer.objects.count(), 6)
+
+    def test_resumes_after_interruption(self):
+        run = clean_inactive_customers(batch_size=3)
+        first = next(run)
+        run.close()
+        self.assertEqual(load_checkpoint(CLEANUP_CHECKPOINT), first.last_id)
+        # A customer below the checkpoint that becomes inactive waits for the next full run
+        Order.objects.filter(customer=self.buyer).delete()
+        self.assertEqual(Customer.objects.count(), 3)
+        self.assertEqual([batch.count for batch in clean_inactive_customers(batch_size=3)], [1])
+        self.assertEqual(Customer.objects.count(), 2)
+
+    def test_batches_fit_the_backend_parameter_limit(self):
+        with mock.patch.object(connection.features, 'max_query_params', 3):
+            batches = list(clean_inactive_customers(batch_size=1000))
+        self.assertEqual([batch.count for batch in batches], [2, 2])
+
+    def test_delete_rechecks_customers_that_became_active(self):
+        cutoff = timezone.now() - timedelta(days=365)
+        ids = sorted(Customer.objects.values_list('pk', flat=True))
+        late_buyer = Customer.objects.get(name="Old 0")
+        Order.objects.create(customer=late_buyer, total_amount=Decimal('1.00'))
+        self.assertEqual(delete_inactive_customers(cutoff, ids), 3)
+        self.assertEqual(set(Customer.objects.values_list('name', flat=True)), {"Old 0", "Old 2", "New"})
+
+    def test_command(self):
+        with tempfile.NamedTemporaryFile('r', suffix='.log') as log_file:
+            out = StringIO()
+            call_command('clean_inactive_customers', '--batch-size', '3', '--pause', '0',
+                         '--log-file', log_file.name, stdout=out)
+            self.assertIn("Deleted 4 inactive customers", log_file.read())
+        self.assertIn("batch 2: deleted 1 customer(s)", out.getvalue())
+
+
+class GraphQLClientTests(TestCase):
+    def test_schema_client_caches_documents(self):
+        client = SchemaClient()
+        self.assertEqual(client.execute('{ hello }'), {'hello': 'Hello, GraphQL!'})
+        self.assertEqual(client.execute('{ hello }'), {'hello': 'Hello, GraphQL!'})
+        self.assertEqual((client.documents.hits, client.documents.misses), (1, 1))
+        with self.assertRaises(GraphQLClientError) as error:
+            client.execute('{ nope }')
+        self.assertIn("Cannot query field 'nope'", error.exception.errors[0])
+
+    def test_schema_client_mutation(self):
+        Product.objects.create(name="Cable", price=Decimal('5.00'), stock=2)
+        data = SchemaClient().execute(
+            'mutation($n: Int) { updateLowStockProducts(increment: $n) { success products { stock } } }', {'n': 5}
+        )
+        self.assertEqual(data['updateLowStockProducts']['products'], [{'stock': 7}])
+
+    def test_http_client_sends_persisted_queries(self):
+        client = HTTPClient('http://testserver/graphql')
+        payloads = []
+
+        def post(payload):
+            payloads.append(payload)
+            return self.client.post('/graphql', json.dumps(payload), content_type='application/json').json()
+
+        client.post = post
+        self.assertEqual(client.execute('{ hello }'), {'hello': 'Hello, GraphQL!'})
+        self.assertEqual(client.execute('{ hello }'), {'hello': 'Hello, GraphQL!'})
+        # The text is only sent once, after the server reports the hash unknown
+        self.assertEqual(['query' in payload for payload in payloads], [False, True, False])
+
+    def test_update_low_stock_runs_in_process(self):
+        Product.objects.create(name="Cable", price=Decimal('5.00'), stock=2)
+        update_low_stock()
+        self.assertEqual(Product.objects.get().stock, 12)
+
+
+@override_settings(HEALTH_CHECKS={'BROKER_URL': 'memory://'})
+class HealthCheckTests(TestCase):
+    def test_all_dependencies_up(self):
+        response = self.client.get('/health')
+        self.assertEqual(response.status_code, 200)
+        report = response.json()
+        self.assertEqual(report['status'], 'ok')
+        self.assertEqual(set(report['checks']), {'database', 'cache', 'broker'})
+        for result in report['checks'].values():
+            self.assertEqual(result['status'], 'ok')
+            self.assertGreaterEqual(result['latency_ms'], 0)
+        self.assertEqual(self.client.get('/health/live').json(), {'status': 'ok'})
+
+    @override_settings(HEALTH_CHECKS={'BROKER_URL': 'nosuchtransport://localhost'})
+    def test_failed_dependency_returns_503(self):
+        response = self.client.get('/health')
+        self.assertEqual(response.status_code, 503)
+        checks = response.json()['checks']
+        self.assertEqual(checks['broker']['status'], 'error')
+        self.assertIn('error', checks['broker'])
+        self.assertEqual(checks['database']['status'], 'ok')
+
+    def test_heartbeat_skips_graphql(self):
+        metrics.clear()
+        report = log_crm_heartbeat()
+        self.assertEqual(report['status'], 'ok')
+        self.assertIsNone(metrics.get('graphql_operation_duration_seconds', operation='anonymous'))
+
+
+class BackfillMigrationTests(TransactionTestCase):
+    before = [('crm', '0009_order_items')]
+    after = [('crm', '0010_backfill_order_aggregates')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_existing_orders_fill_the_aggregates_and_rollup(self):
+        old_apps = self.migrate(self.before)
+        customer = old_apps.get_model('crm', 'Customer').objects.create(name="Alice", email="alice@example.com")
+        product = old_apps.get_model('crm', 'Product').objects.create(name="Mouse", price=Decimal('5.00'))
+        order = old_apps.get_model('crm', 'Order').objects.create(customer=customer, total_amount=Decimal('10.00'))
+        old_apps.get_model('crm', 'OrderItem').objects.create(
+            order=order, product=product, quantity=2, unit_price=Decimal('5.00')
+        )
+
+        self.migrate(self.after)
+        customer = Customer.objects.get(pk=customer.pk)
+        self.assertEqual((customer.order_count, customer.lifetime_value), (1, Decimal('10.00')))
+        self.assertEqual(customer.last_order_at, Order.objects.get(pk=order.pk).order_date)
+        sales = DailyProductSales.objects.get()
+        self.assertEqual((sales.product_id, sales.order_count, sales.units, sales.revenue),
+                         (product.pk, 1, 2, Decimal('10.00')))
@@ -1,3 +1,34 @@
-from django.shortcuts import render
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
 
-# Create your views here.
+from .exports import EXPORT_FORMATS, customer_rows, order_rows
+from .filters import CustomerFilter, OrderFilter
+
+
+def export_response(request, name, filterset_class, rows):
+    """Stream the rows matching the filterset parameters in the query string"""
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return JsonResponse(
+            {'errors': {'format': [f"Choose one of: {', '.join(EXPORT_FORMATS)}"]}}, status=400
+        )
+    filterset = filterset_class(request.GET, queryset=filterset_class._meta.model.objects.all())
+    if not filterset.is_valid():
+        return JsonResponse({'errors': filterset.errors}, status=400)
+
+    render, content_type = EXPORT_FORMATS[export_format]
+    response = StreamingHttpResponse(render(*rows(filterset)), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{name}.{export_format}"'
+    return response
+
+
+@require_GET
+def export_orders(request):
+    """Orders matching OrderFilter as CSV or NDJSON, streamed in chunks"""
+    return export_response(request, 'orders', OrderFilter, order_rows)
+
+
+@require_GET
+def export_customers(request):
+    """Customers matching CustomerFilter as CSV or NDJSON, streamed in chunks"""
+    return export_response(request, 'customers', CustomerFilter, customer_rows)
@@ -2,7 +2,11 @@
 """
 Seed script to populate the CRM database with sample data.
 Run with: python seed_db.py
+
+Generate a large synthetic dataset instead with e.g.:
+    python seed_db.py --customers 1000000 --products 50000 --orders 5000000 --avg-items 3
 """
+import argparse
 import os
 import django
 
@@ -11,6 +15,8 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'alx_backend_graphql.settings')
 django.setup()
 
 from crm.models import Customer, Product, Order
+from crm.datagen import DatasetSpec, generate
+from crm.orders import place_order
 from decimal import Decimal
 
 
@@ -69,45 +75,23 @@ def create_orders(customers, products):
     """Create sample orders"""
     print("\nCreating orders...")
     
-    # Order 1: Alice buys Laptop and Mouse
-    order1 = Order.objects.create(
-        customer=customers[0],
-        total_amount=products[0].price + products[1].price
-    )
-    order1.products.set([products[0], products[1]])
-    print(f"  ✓ Created order for {customers[0].name}: ${order1.total_amount}")
-    
-    # Order 2: Bob buys Keyboard, Monitor, and Headphones
-    order2 = Order.objects.create(
-        customer=customers[1],
-        total_amount=products[2].price + products[3].price + products[4].price
-    )
-    order2.products.set([products[2], products[3], products[4]])
-    print(f"  ✓ Created order for {customers[1].name}: ${order2.total_amount}")
-    
-    # Order 3: Carol buys Webcam and USB Cable
-    order3 = Order.objects.create(
-        customer=customers[2],
-        total_amount=products[5].price + products[6].price
-    )
-    order3.products.set([products[5], products[6]])
-    print(f"  ✓ Created order for {customers[2].name}: ${order3.total_amount}")
-    
-    # Order 4: David buys Mouse and USB Cable
-    order4 = Order.objects.create(
-        customer=customers[3],
-        total_amount=products[1].price + products[6].price
-    )
-    order4.products.set([products[1], products[6]])
-    print(f"  ✓ Created order for {customers[3].name}: ${order4.total_amount}")
-    
-    # Order 5: Eve buys Laptop, Monitor, and Headphones
-    order5 = Order.objects.create(
-        customer=customers[4],
-        total_amount=products[0].price + products[3].price + products[4].price
-    )
-    order5.products.set([products[0], products[3], products[4]])
-    print(f"  ✓ Created order for {customers[4].name}: ${order5.total_amount}")
+    # (customer, [(product, quantity)]) - placed like CreateOrder, so stock,
+    # sales rollups and customer totals stay consistent
+    orders_data = [
+        # Alice buys Laptop and Mouse
+        (customers[0], [(products[0], 1), (products[1], 1)]),
+        # Bob buys Keyboard, Monitor, and Headphones
+        (customers[1], [(products[2], 1), (products[3], 1), (products[4], 1)]),
+        # Carol buys Webcam and two USB Cables
+        (customers[2], [(products[5], 1), (products[6], 2)]),
+        # David buys Mouse and USB Cable
+        (customers[3], [(products[1], 1), (products[6], 1)]),
+        # Eve buys Laptop, two Monitors, and Headphones
+        (customers[4], [(products[0], 1), (products[3], 2), (products[4], 1)]),
+    ]
+    for customer, items in orders_data:
+        order = place_order(customer, items=[(product.pk, quantity) for product, quantity in items])
+        print(f"  ✓ Created order for {customer.name}: ${order.total_amount}")
 
 
 def print_summary():
@@ -121,18 +105,69 @@ def print_summary():
     print("="*50)
 
 
-def main():
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Seed the CRM database with sample or generated data")
+    generator = parser.add_argument_group("synthetic dataset (any of these switches to the generator)")
+    generator.add_argument('--customers', type=int, help="Customers to generate (default 1000)")
+    generator.add_argument('--products', type=int, help="Products to generate (default 100)")
+    generator.add_argument('--orders', type=int, help="Orders to generate (default 5000)")
+    generator.add_argument('--avg-items', type=float, help="Average products per order (default 3)")
+    parser.add_argument('--seed', type=int, default=42, help="Random seed, the same seed gives the same data")
+    parser.add_argument('--days', type=int, default=365, help="Spread timestamps over this many days")
+    parser.add_argument('--hot-products', type=float, default=0.01,
+                        help="Fraction of products that are hot sellers")
+    parser.add_argument('--hot-share', type=float, default=0.5,
+                        help="Share of order lines that go to the hot products")
+    parser.add_argument('--customer-skew', type=float, default=1.1,
+                        help="Power-law exponent of orders per customer, 0 for uniform")
+    parser.add_argument('--max-quantity', type=int, default=3, help="Most units of a product on one order line")
+    parser.add_argument('--chunk-size', type=int, default=5000, help="Rows per bulk insert")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="Worker processes (on SQLite they build rows and this process inserts them)")
+    parser.add_argument('--keep', action='store_true', help="Add to the existing data instead of clearing it")
+    return parser.parse_args(argv)
+
+
+def generate_dataset(args):
+    """Bulk generate a seeded dataset of the requested size"""
+    spec = DatasetSpec(
+        customers=args.customers if args.customers is not None else 1000,
+        products=args.products if args.products is not None else 100,
+        orders=args.orders if args.orders is not None else 5000,
+        avg_items=args.avg_items if args.avg_items is not None else 3,
+        seed=args.seed,
+        days=args.days,
+        hot_products=args.hot_products,
+        hot_share=args.hot_share,
+        customer_skew=args.customer_skew,
+        max_quantity=args.max_quantity,
+        chunk_size=args.chunk_size,
+        workers=args.workers,
+    )
+    print(f"\nGenerating dataset (seed {spec.seed}, {spec.workers} worker(s))...")
+    generate(spec)
+
+
+def main(argv=None):
+    args = parse_args(argv)
     print("="*50)
     print("CRM DATABASE SEEDING SCRIPT")
     print("="*50)
     
     # Clear existing data
-    clear_data()
+    if not args.keep:
+        clear_data()
     
     # Create data
-    customers = create_customers()
-    products = create_products()
-    create_orders(customers, products)
+    if any(value is not None for value in (args.customers, args.products, args.orders, args.avg_items)):
+        try:
+            generate_dataset(args)
+        except ValueError as e:
+            raise SystemExit(f"Error: {e}")
+    else:
+        customers = create_customers()
+        products = create_products()
+        create_orders(customers, products)
     
     # Print summary
     print_summary()